@@ -0,0 +1,63 @@
+"""Audio clips for the voice part of the benchmark workload.
+
+audio/clips.json lists each clip's file, the question it asks and its
+length. Recordings of the questions can be dropped into audio/ under those
+names; missing ones are generated under .data/ as voice-like signals (a
+gliding harmonic tone with syllable-rate amplitude) of the same length, so
+speech recognition is timed on the same input size without shipping
+recordings. The benchmark answers each clip's listed question, so text and
+voice runs stay comparable either way.
+"""
+import json
+import math
+import os
+import random
+import struct
+import wave
+
+AUDIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio")
+SAMPLE_RATE = 16000
+
+
+def synthesize(path, seconds, seed=0):
+    """Write a mono 16 kHz voice-like WAV of the given length."""
+    rng = random.Random(seed)
+    samples = int(seconds * SAMPLE_RATE)
+    pitch = rng.uniform(110, 210)
+    syllable_rate = rng.uniform(3.5, 5.0)
+    frames = bytearray()
+    phase = 0.0
+    for i in range(samples):
+        t = i / SAMPLE_RATE
+        f0 = pitch * (1 + 0.15 * math.sin(2 * math.pi * 0.7 * t))
+        phase += 2 * math.pi * f0 / SAMPLE_RATE
+        voiced = sum(math.sin(k * phase) / k for k in range(1, 6))
+        envelope = max(math.sin(math.pi * syllable_rate * t), 0.0) ** 2
+        value = 0.3 * envelope * voiced + 0.01 * rng.uniform(-1, 1)
+        frames += struct.pack("<h", int(max(min(value, 1.0), -1.0) * 32767))
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(bytes(frames))
+
+
+def load_clips(cache_dir, directory=AUDIO_DIR):
+    """The clips in clips.json with their paths; missing recordings are generated in cache_dir."""
+    with open(os.path.join(directory, "clips.json")) as f:
+        clips = json.load(f)
+    for seed, clip in enumerate(clips):
+        clip["path"] = os.path.join(directory, clip["file"])
+        clip["recorded"] = os.path.exists(clip["path"])
+        if not clip["recorded"]:
+            clip["path"] = os.path.join(cache_dir, clip["file"])
+            if not os.path.exists(clip["path"]):
+                os.makedirs(cache_dir, exist_ok=True)
+                synthesize(clip["path"], clip["seconds"], seed)
+    return clips
+
+
+if __name__ == "__main__":
+    for clip in load_clips(os.path.join(os.path.dirname(AUDIO_DIR), ".data", "audio")):
+        kind = "recorded" if clip["recorded"] else "generated"
+        print(f"{clip['path']} ({kind}): {clip['question']}")
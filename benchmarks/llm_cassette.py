@@ -0,0 +1,223 @@
+"""Record real LLM interactions and replay them for deterministic benchmarks.
+
+Recording runs a proxy in front of the real API. Point an app at it and use
+it as usual; every chat completion (prompt, response, the generated code
+when the reply is PandasAI code, and how long the API took) is appended to
+a cassette, one JSON object per line:
+
+    python benchmarks/llm_cassette.py record --upstream https://api.openai.com --out benchmarks/cassettes/st.jsonl
+    OPENAI_BASE_URL=http://127.0.0.1:8901/v1 OPENAI_API_BASE=http://127.0.0.1:8901/v1 python mychat-st/app.py
+
+For Groq use --upstream https://api.groq.com and GROQ_BASE_URL=http://127.0.0.1:8901.
+
+Replaying serves the recorded responses back, with the recorded latency or
+none, so runs compare only the apps' own code:
+
+    python benchmarks/run.py mychat-st --cassette benchmarks/cassettes/st.jsonl --replay-latency zero
+
+A request matches a recording with the same model and messages. When there
+is none (PandasAI puts sample rows in its prompts, so they can differ from
+run to run), it falls back to a recording for the same question and kind
+(SQL or code). Repeated prompts get the recorded responses in order. What
+still misses is counted and answered from the canned completions, or fails
+with --strict-replay.
+
+Cassettes contain the prompts, including the sample rows the apps send;
+treat them like the data they come from.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from mock_llm import MockLLM, prompt_of, question_of
+
+CODE_BLOCK = re.compile(r"```(?:python)?\s*\n(.*?)```", re.DOTALL)
+# Headers passed on to the real API
+FORWARD_HEADERS = ("Authorization", "Content-Type", "OpenAI-Organization", "OpenAI-Project")
+
+
+def request_key(body):
+    """Exact-match key: the model and messages."""
+    data = json.dumps({"model": body.get("model"), "messages": body.get("messages")}, sort_keys=True)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def question_key(prompt):
+    """Fallback key: the normalized question and whether SQL or code is asked for."""
+    kind = "sql" if "SQL Query:" in prompt else "code"
+    return f"{kind}:{' '.join(question_of(prompt).lower().split())}"
+
+
+def completion_text(response):
+    try:
+        return response["choices"][0]["message"]["content"] or ""
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
+class Cassette:
+    """Recorded interactions in a JSONL file, indexed for replay."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+        self._by_request = defaultdict(list)
+        self._by_question = defaultdict(list)
+        self._served = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        cassette = cls(path)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    cassette._index(json.loads(line))
+        return cassette
+
+    def _index(self, entry):
+        self.entries.append(entry)
+        self._by_request[entry["key"]].append(entry)
+        self._by_question[entry["question_key"]].append(entry)
+
+    def record(self, body, response, latency_ms):
+        prompt = prompt_of(body)
+        completion = completion_text(response)
+        code = CODE_BLOCK.search(completion)
+        entry = {
+            "key": request_key(body),
+            "question_key": question_key(prompt),
+            "question": question_of(prompt),
+            "model": body.get("model"),
+            "messages": body.get("messages"),
+            "completion": completion,
+            "code": code.group(1) if code else None,
+            "latency_ms": round(latency_ms, 1),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "response": response,
+        }
+        with self._lock:
+            self._index(entry)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def lookup(self, body):
+        """The recording for a request, or None; repeated requests cycle through theirs."""
+        candidates = (
+            ("request", request_key(body), self._by_request),
+            ("question", question_key(prompt_of(body)), self._by_question),
+        )
+        with self._lock:
+            for index, key, entries in candidates:
+                if entries.get(key):
+                    served = self._served[(index, key)]
+                    self._served[(index, key)] += 1
+                    return entries[key][served % len(entries[key])]
+        return None
+
+
+class RecordingProxy(MockLLM):
+    """Forwards chat completions to the real API and records them."""
+
+    def __init__(self, upstream, cassette, host="127.0.0.1", port=8901):
+        super().__init__(host, port)
+        self.upstream = upstream.rstrip("/")
+        self.cassette = cassette
+
+    def complete(self, path, body, headers):
+        request = urllib.request.Request(
+            f"{self.upstream}{path}",
+            data=json.dumps(body).encode(),
+            headers={name: headers[name] for name in FORWARD_HEADERS if headers.get(name)},
+            method="POST",
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=300) as upstream:
+                response = json.load(upstream)
+        except urllib.error.HTTPError as e:
+            # Pass API errors through unrecorded
+            try:
+                return e.code, json.loads(e.read() or b"{}")
+            except ValueError:
+                return e.code, {"error": {"message": str(e)}}
+        self.cassette.record(body, response, (time.perf_counter() - started) * 1000)
+        return 200, response
+
+
+class ReplayLLM(MockLLM):
+    """Serves a cassette's recorded responses."""
+
+    def __init__(self, cassette, latency="recorded", strict=False, host="127.0.0.1", port=0):
+        super().__init__(host, port)
+        self.cassette = cassette
+        self.latency = latency
+        self.strict = strict
+        self.hits = 0
+        self.misses = 0
+
+    def complete(self, path, body, headers):
+        entry = self.cassette.lookup(body)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            if self.strict:
+                return 404, {"error": {"message": "No recorded completion for this request", "type": "cassette_miss"}}
+            return super().complete(path, body, headers)
+        if self.latency == "recorded":
+            time.sleep(entry["latency_ms"] / 1000)
+        return 200, entry["response"]
+
+    def stats(self):
+        return {"requests": self.requests, "replay_hits": self.hits, "replay_misses": self.misses}
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Record or replay LLM interactions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="proxy to the real API and record every completion")
+    record.add_argument("--upstream", default="https://api.openai.com", help="real API base URL")
+    record.add_argument("--out", required=True, help="cassette file to append to")
+    record.add_argument("--port", type=int, default=8901)
+    replay = commands.add_parser("replay", help="serve a cassette as an OpenAI-compatible API")
+    replay.add_argument("cassette")
+    replay.add_argument("--port", type=int, default=8901)
+    replay.add_argument("--latency", choices=("recorded", "zero"), default="recorded")
+    replay.add_argument("--strict", action="store_true", help="fail requests that have no recording")
+    show = commands.add_parser("show", help="summarize a cassette")
+    show.add_argument("cassette")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        cassette = Cassette.load(args.cassette)
+        for entry in cassette.entries:
+            kind = entry["question_key"].split(":", 1)[0]
+            print(f"{entry['latency_ms']:>9.1f} ms  {kind:<5} {entry['question'][:100]}")
+        print(f"{len(cassette.entries)} interactions, {len(cassette._by_question)} distinct questions")
+        raise SystemExit(0)
+
+    if args.command == "record":
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        cassette = Cassette.load(args.out) if os.path.exists(args.out) else Cassette(args.out)
+        server = RecordingProxy(args.upstream, cassette, port=args.port).start()
+        print(f"Recording {args.upstream} to {args.out}; point the app at {server.url}/v1 (OpenAI) or {server.url} (Groq)")
+    else:
+        server = ReplayLLM(Cassette.load(args.cassette), args.latency, args.strict, port=args.port).start()
+        print(f"Replaying {args.cassette} on {server.url}/v1 (OpenAI) or {server.url} (Groq)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
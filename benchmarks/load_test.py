@@ -0,0 +1,269 @@
+"""Concurrent-user load test for a running app, through the Gradio client API.
+
+Simulated sessions each open their own Gradio client (so each gets its own
+session, like a browser tab) and ask questions back to back with a short
+think time, drawing from a text / voice / chart mix. Voice questions make
+the same calls the browser does: transcribe the recording, then submit.
+Concurrency ramps through the given steps; for each step the report shows
+throughput, latency percentiles, error rate and the time requests spent
+waiting in the Gradio queue before a worker picked them up. For mychat-st,
+the stage queues from /api/v1/status are sampled too.
+
+    python benchmarks/run.py mychat-st --serve --llm-latency-ms 800   # or the app with real backends
+    python benchmarks/load_test.py http://localhost:7860 --app mychat-st --steps 1,4,8,16 --step-seconds 60
+
+Requires gradio_client (installed with gradio).
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+
+from gradio_client import Client, handle_file
+
+import audio_clips
+from run import DATA_DIR, ERROR_PREFIXES, TEXT_QUESTIONS, percentile
+
+CHART_WORDS = re.compile(r"\b(chart|graph|plot)\b", re.IGNORECASE)
+KINDS = ("text", "voice", "chart")
+# Replies of questions turned away by mychat-st's admission control (busy, rate limited, LLM circuit open)
+BUSY_PREFIXES = ("⏳", "⚠️ The language model")
+
+
+class Target:
+    """How one app's UI events are called: endpoint names and arguments."""
+
+    def __init__(self, submit, submit_args, chat_output, transcribe=None, transcribe_args=None, history=False):
+        self.submit = submit
+        self.submit_args = submit_args
+        self.chat_output = chat_output
+        self.transcribe = transcribe
+        self.transcribe_args = transcribe_args
+        # The chat history is an input the client has to send back each turn
+        self.history = history
+
+
+TARGETS = {
+    "mychat-st": Target(
+        "/handle_submit", lambda text, audio, history: [audio, text, False], chat_output=1,
+        transcribe="/transcribe_audio", transcribe_args=lambda audio: [audio, ""],
+    ),
+    "mychat-gemini": Target(
+        "/handle_chat_submission", lambda text, audio, history: [text, history], chat_output=0,
+        transcribe="/transcribe_audio", transcribe_args=lambda audio: [audio], history=True,
+    ),
+    "mychat": Target("/handle_submit", lambda text, audio, history: [audio, text], chat_output=1),
+}
+
+
+def last_reply(chat):
+    """Text of the last bot message in a Chatbot value (None for files and charts)."""
+    for pair in reversed(chat or []):
+        reply = pair[1] if isinstance(pair, (list, tuple)) and len(pair) > 1 else None
+        if reply:
+            return reply if isinstance(reply, str) else None
+    return None
+
+
+def timed_call(client, api_name, args):
+    """(result, seconds in the Gradio queue) of one queued event."""
+    from gradio_client.utils import Status
+
+    submitted = time.perf_counter()
+    job = client.submit(*args, api_name=api_name)
+    started = None
+    while not job.done():
+        if started is None and job.status().code in (Status.PROCESSING, Status.ITERATING, Status.PROGRESS):
+            started = time.perf_counter()
+        time.sleep(0.01)
+    if job.status().code == Status.QUEUE_FULL:
+        raise RuntimeError("queue full")
+    result = job.result()
+    # None when the job finished between two polls
+    return result, started - submitted if started else None
+
+
+class Session:
+    """One simulated user."""
+
+    def __init__(self, url, target, workload, think_seconds, rng):
+        self.client = Client(url, verbose=False)
+        self.target = target
+        self.workload = workload
+        self.think_seconds = think_seconds
+        self.rng = rng
+        self.history = []
+
+    def ask(self, question, clip):
+        queue_seconds = []
+        audio = None
+        text = question
+        if clip is not None:
+            audio = handle_file(clip["path"])
+            if self.target.transcribe:
+                transcript, queued = timed_call(self.client, self.target.transcribe, self.target.transcribe_args(audio))
+                queue_seconds.append(queued)
+                text = transcript or question
+        result, queued = timed_call(self.client, self.target.submit, self.target.submit_args(text, audio, self.history))
+        queue_seconds.append(queued)
+        chat = result[self.target.chat_output] if isinstance(result, (list, tuple)) else result
+        if self.target.history:
+            self.history = chat or []
+        reply = last_reply(chat)
+        queued = None if None in queue_seconds else sum(queue_seconds)
+        if reply and reply.startswith(BUSY_PREFIXES):
+            return "busy reply", queued
+        return ("error reply" if reply and reply.startswith(ERROR_PREFIXES) else None), queued
+
+    def run(self, deadline, record):
+        while time.perf_counter() < deadline:
+            kind = self.rng.choices(list(self.workload), weights=list(self.workload.values()))[0]
+            question, clip = self.rng.choice(kind.choices)
+            started = time.perf_counter()
+            try:
+                error, queue_seconds = self.ask(question, clip)
+            except Exception as e:
+                queue_seconds, error = None, str(e) or type(e).__name__
+            record(kind.name, time.perf_counter() - started, queue_seconds, error)
+            if self.think_seconds:
+                time.sleep(self.rng.expovariate(1 / self.think_seconds))
+
+
+class Kind:
+    def __init__(self, name, choices):
+        self.name = name
+        # (question, clip) pairs
+        self.choices = choices
+
+
+def build_workload(mix, clips):
+    """{Kind: weight} for a mix such as {"text": 6, "voice": 2, "chart": 2}."""
+    by_kind = {
+        "text": [(q, None) for q in TEXT_QUESTIONS if not CHART_WORDS.search(q)],
+        "chart": [(q, None) for q in TEXT_QUESTIONS if CHART_WORDS.search(q)],
+        "voice": [(clip["question"], clip) for clip in clips],
+    }
+    return {Kind(name, by_kind[name]): weight for name, weight in mix.items() if weight and by_kind[name]}
+
+
+def sample_stage_queues(url, stop, peaks):
+    """Track the peak queued tasks per stage from mychat-st's /api/v1/status."""
+    while not stop.is_set():
+        try:
+            with urllib.request.urlopen(f"{url}/api/v1/status", timeout=5) as response:
+                status = json.load(response)
+        except Exception:
+            return
+        for name, stage in (status.get("stages") or {}).items():
+            peaks[name] = max(peaks.get(name, 0), stage.get("queued", 0))
+        stop.wait(1.0)
+
+
+def run_step(url, target, workload, sessions, seconds, think_seconds, seed):
+    samples = []
+    lock = threading.Lock()
+
+    def record(kind, latency, queue_seconds, error):
+        with lock:
+            samples.append((kind, latency, queue_seconds, error))
+
+    users = [Session(url, target, workload, think_seconds, random.Random(seed + i)) for i in range(sessions)]
+    peaks = {}
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_stage_queues, args=(url, stop, peaks), daemon=True)
+    sampler.start()
+
+    started = time.perf_counter()
+    deadline = started + seconds
+    threads = [threading.Thread(target=user.run, args=(deadline, record), daemon=True) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+
+    latencies = [latency * 1000 for _, latency, _, _ in samples]
+    queued = [q * 1000 for _, _, q, _ in samples if q is not None]
+    errors = defaultdict(int)
+    for _, _, _, error in samples:
+        if error:
+            errors[error] += 1
+
+    def percentiles(values):
+        if not values:
+            return None
+        return {f"p{q}": round(percentile(values, q), 1) for q in (50, 95, 99)}
+
+    return {
+        "sessions": sessions,
+        "requests": len(samples),
+        "seconds": round(elapsed, 1),
+        "throughput_per_second": round(len(samples) / elapsed, 2),
+        "error_rate": round(sum(errors.values()) / len(samples), 3) if samples else 0.0,
+        "errors": dict(errors),
+        "latency_ms": percentiles(latencies),
+        "queue_ms": percentiles(queued),
+        "latency_ms_by_kind": {
+            kind: percentiles([latency * 1000 for k, latency, _, _ in samples if k == kind]) for kind in KINDS
+        },
+        "peak_stage_queues": peaks,
+    }
+
+
+def print_step(step):
+    latency = step["latency_ms"] or {}
+    queue = step["queue_ms"] or {}
+    print(
+        f"{step['sessions']:>9}{step['requests']:>10}{step['throughput_per_second']:>9}"
+        f"{step['error_rate'] * 100:>8.1f}%{latency.get('p50', '-'):>10}{latency.get('p95', '-'):>10}"
+        f"{latency.get('p99', '-'):>10}{queue.get('p50', '-'):>10}{queue.get('p95', '-'):>10}"
+    )
+    if step["errors"]:
+        print(f"{'':>9}errors: {step['errors']}")
+    if step["peak_stage_queues"]:
+        print(f"{'':>9}peak stage queues: {step['peak_stage_queues']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive simulated users against a running app")
+    parser.add_argument("url", help="app URL, e.g. http://localhost:7860")
+    parser.add_argument("--app", choices=sorted(TARGETS), default="mychat-st", help="which app is running there")
+    parser.add_argument("--steps", default="1,2,4,8", help="concurrent sessions per step, comma separated")
+    parser.add_argument("--step-seconds", type=float, default=60, help="duration of each step")
+    parser.add_argument("--think-seconds", type=float, default=1.0, help="mean pause between a session's questions")
+    parser.add_argument("--mix", default="text=6,voice=2,chart=2", help="weights of text, voice and chart questions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    mix = {kind: float(weight) for kind, weight in (part.split("=") for part in args.mix.split(","))}
+    unknown = set(mix) - set(KINDS)
+    if unknown:
+        parser.error(f"unknown kinds in --mix: {', '.join(sorted(unknown))}")
+    clips = audio_clips.load_clips(os.path.join(DATA_DIR, "audio")) if mix.get("voice") else []
+    workload = build_workload(mix, clips)
+    url = args.url.rstrip("/")
+
+    print(f"{'sessions':>9}{'requests':>10}{'req/s':>9}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'queue p50':>10}{'queue p95':>10}")
+    steps = []
+    for sessions in (int(n) for n in args.steps.split(",")):
+        step = run_step(url, TARGETS[args.app], workload, sessions, args.step_seconds, args.think_seconds, args.seed)
+        steps.append(step)
+        print_step(step)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump({"config": vars(args), "steps": steps}, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""A local stand-in for the OpenAI (and Groq) chat completions API.
+
+Answers every POST to .../chat/completions with a canned completion chosen
+from the question in the prompt:
+
+- NL-to-SQL prompts (mychat-gemini) get a SQL query for employee_skill_view
+- PandasAI prompts (mychat-st, mychat) get Python code over dfs[0], drawing
+  a bar chart when the question asks for one
+
+Each reply is delayed by the configured latency (plus jitter) so runs can
+model a slow backend, or set it to 0 to measure only the apps' own code.
+
+    python mock_llm.py --port 8900 --latency-ms 800
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHART_WORDS = re.compile(r"\b(chart|graph|plot)\b", re.IGNORECASE)
+
+# (question pattern, SQL, pandas expression producing result_df from df), first match wins
+CANNED = [
+    (
+        re.compile(r"\b(average|avg|mean)\b", re.IGNORECASE),
+        "SELECT skill_name, AVG(skill_rate) AS avg_skill_rate FROM employee_skill_view "
+        "GROUP BY skill_name ORDER BY avg_skill_rate DESC",
+        'df.groupby("skill_name", as_index=False)["skill_rate"].mean()'
+        '.rename(columns={"skill_rate": "avg_skill_rate"})'
+        '.sort_values("avg_skill_rate", ascending=False)',
+    ),
+    (
+        re.compile(r"\b(below|under|less than)\b", re.IGNORECASE),
+        "SELECT skill_name, COUNT(*) AS employees_below_3 FROM employee_skill_view "
+        "WHERE skill_rate < 3 GROUP BY skill_name ORDER BY employees_below_3 DESC",
+        'df[df["skill_rate"] < 3].groupby("skill_name", as_index=False).size()'
+        '.rename(columns={"size": "employees_below_3"})'
+        '.sort_values("employees_below_3", ascending=False)',
+    ),
+    (
+        re.compile(r"\b(count|how many|number of)\b", re.IGNORECASE),
+        "SELECT skill_name, COUNT(DISTINCT employee_id) AS employee_count FROM employee_skill_view "
+        "GROUP BY skill_name ORDER BY employee_count DESC",
+        'df.groupby("skill_name", as_index=False)["employee_id"].nunique()'
+        '.rename(columns={"employee_id": "employee_count"})'
+        '.sort_values("employee_count", ascending=False)',
+    ),
+    (
+        re.compile(r".*", re.DOTALL),
+        "SELECT employee_name, skill_name, skill_rate FROM employee_skill_view "
+        "ORDER BY skill_rate DESC LIMIT 10",
+        'df.nlargest(10, "skill_rate")[["employee_name", "skill_name", "skill_rate"]]',
+    ),
+]
+
+CHART_PATH = "exports/charts/temp_chart.png"
+
+TABLE_CODE = """import pandas as pd
+df = dfs[0]
+result_df = {frame}
+result = {{"type": "dataframe", "value": result_df}}
+"""
+
+CHART_CODE = """import pandas as pd
+import matplotlib.pyplot as plt
+df = dfs[0]
+result_df = {frame}
+plt.figure(figsize=(10, 6))
+plt.bar(result_df.iloc[:, 0].astype(str), result_df.iloc[:, -1])
+plt.xticks(rotation=45, ha="right")
+plt.tight_layout()
+plt.savefig("{path}")
+plt.close()
+result = {{"type": "plot", "value": "{path}"}}
+"""
+
+QUESTION_PATTERNS = [
+    re.compile(r'User Question:\s*"(.*?)"', re.DOTALL),
+    re.compile(r"### QUERY\s*\n\s*(.+)"),
+]
+
+
+def question_of(prompt):
+    """The user's question inside a SQL or PandasAI prompt (the whole prompt if not found)."""
+    for pattern in QUESTION_PATTERNS:
+        found = pattern.findall(prompt)
+        if found:
+            return found[-1].strip()
+    return prompt
+
+
+def prompt_of(body):
+    """The user messages of a chat completions request, as one string."""
+    return "\n".join(str(m.get("content", "")) for m in body.get("messages", []) if m.get("role") == "user")
+
+
+def completion_response(model, prompt, content):
+    """A chat completions response body with `content` as the reply."""
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model or "mock",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        },
+    }
+
+
+def completion_for(prompt):
+    """The canned reply for a prompt: SQL for SQL prompts, fenced Python code otherwise."""
+    question = question_of(prompt)
+    _, sql, frame = next(entry for entry in CANNED if entry[0].search(question))
+    if "SQL Query:" in prompt:
+        return sql
+    if CHART_WORDS.search(question):
+        code = CHART_CODE.format(frame=frame, path=CHART_PATH)
+    else:
+        code = TABLE_CODE.format(frame=frame)
+    return f"```python\n{code}```"
+
+
+class MockLLM:
+    """The mock server, running in a background thread."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def complete(self, path, body, headers):
+        """(HTTP status, JSON body) for one chat completions request."""
+        prompt = prompt_of(body)
+        content = completion_for(prompt)
+        time.sleep(self.delay())
+        return 200, completion_response(body.get("model"), prompt, content)
+
+    def stats(self):
+        return {"requests": self.requests}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with mock._lock:
+                    mock.requests += 1
+                status, payload = mock.complete(self.path, body, self.headers)
+                self._send_json(payload, status)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json({"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                else:
+                    self.send_error(404)
+
+            def _send_json(self, payload, status=200):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve canned OpenAI-compatible chat completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before each reply")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random +/- added to the delay")
+    args = parser.parse_args()
+
+    mock = MockLLM(args.host, args.port, args.latency_ms, args.jitter_ms).start()
+    print(f"Mock LLM on {mock.url}/v1 (OPENAI_BASE_URL) and {mock.url} (GROQ_BASE_URL)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
@@ -0,0 +1,376 @@
+"""Offline end-to-end benchmark of the three chat pipelines.
+
+Runs a fixed workload of typed and spoken questions through mychat-st,
+mychat-gemini and mychat without OpenAI/Groq keys or a MariaDB server: the
+LLM is the canned local server in mock_llm.py, the database a seeded SQLite
+employee_skill_view (seed_db.py) of the requested size, and the voice
+questions the clips in audio/ (audio_clips.py). Whisper still runs for real,
+from the local Hugging Face cache.
+
+Each app runs in its own process, imported from its directory with its own
+settings, and reports p50/p95/p99 per pipeline stage: the tracing spans of
+mychat-st and mychat-gemini (asr, db, duckdb, fast_path, llm, code_exec,
+chart, ...) and, for mychat, asr, db and pandasai (LLM plus generated code).
+
+    python benchmarks/run.py --rows 100000 --repeat 5
+    python benchmarks/run.py mychat-gemini --env SQL_ENGINE=duckdb --llm-latency-ms 800
+    python benchmarks/run.py mychat-st --no-audio --out benchmarks/results/before.json
+    python benchmarks/run.py mychat-st --serve --llm-latency-ms 800   # for load_test.py
+
+With --cassette, the LLM replays interactions recorded by llm_cassette.py
+instead, and --baseline turns a run into a regression gate against the
+saved results of an earlier one.
+
+The first --warmup passes load models, snapshots and caches and are not
+counted. Later passes hit whatever the apps cache between questions (view
+snapshots, generated code), as they would in production.
+"""
+import argparse
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+DATA_DIR = os.path.join(BENCHMARK_DIR, ".data")
+APPS = ("mychat-st", "mychat-gemini", "mychat")
+
+# Typed questions, on top of the spoken clips' questions asked as text
+TEXT_QUESTIONS = [
+    "List top 10 employees by their skill rate",
+    "show top 10 employees by their skill rate in a bar chart",
+    "How many employees have each skill?",
+    "Show employees with Sewing skill",
+    "What is the average skill rate for each skill?",
+    "Which skills have the most employees rated below 3?",
+    "Plot the average skill rate for each skill",
+]
+
+# Replies that mean the question failed
+ERROR_PREFIXES = ("Error", "I understand you're asking", "Chart could not be generated")
+
+
+def percentile(values, q):
+    """Linearly interpolated q-th percentile of a non-empty list."""
+    values = sorted(values)
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize(samples):
+    return {
+        stage: {
+            "n": len(values),
+            "p50": round(percentile(values, 50), 1),
+            "p95": round(percentile(values, 95), 1),
+            "p99": round(percentile(values, 99), 1),
+            "mean": round(sum(values) / len(values), 1),
+        }
+        for stage, values in samples.items()
+    }
+
+
+# --- Per-app drivers: each returns ask(question, clip) -> (spans, ok) ---
+
+def traced_driver(answer, transcribe, failed):
+    """Driver for the apps with tracing.py: the request's spans are the stages."""
+    import tracing
+
+    def ask(question, clip=None):
+        with tracing.request("benchmark") as trace:
+            if clip is not None:
+                transcribe(clip["path"])
+            response = answer(question)
+        return list(trace.spans), not failed(response)
+
+    return ask
+
+
+def mychat_st_driver(audio):
+    import app
+    import stages
+    from session_store import SessionState
+
+    if app.code_sandbox:
+        # Fork the sandbox workers before any stage starts its threads
+        app.code_sandbox.start()
+    if audio:
+        stages.start()
+
+    def failed(response):
+        return response.get("type") == "text" and response.get("content", "").startswith(ERROR_PREFIXES)
+
+    # A new session per question, so follow-up matching never kicks in
+    return traced_driver(lambda question: app.process_query(question, SessionState()), app.transcribe, failed)
+
+
+def mychat_gemini_driver():
+    import app
+
+    return traced_driver(app.answer_query, app.transcribe_audio, lambda answer: answer["text"].startswith("Error"))
+
+
+def mychat_driver(db_queries):
+    import app
+
+    spans = []
+
+    class TimedSmartDataframe(app.SmartDataframe):
+        def chat(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().chat(*args, **kwargs)
+            finally:
+                spans.append(("pandasai", round((time.perf_counter() - started) * 1000, 1)))
+
+    app.SmartDataframe = TimedSmartDataframe
+
+    def ask(question, clip=None):
+        spans.clear()
+        db_queries.clear()
+        if clip is not None:
+            started = time.perf_counter()
+            app.speech_pipe(clip["path"])
+            spans.append(("asr", round((time.perf_counter() - started) * 1000, 1)))
+        response = app.process_query(question, [])
+        if db_queries:
+            spans.append(("db", round(sum(db_queries), 1)))
+        return list(spans), not response.startswith(ERROR_PREFIXES)
+
+    return ask
+
+
+def prepare(name, args, db_queries=None):
+    """Start the stand-ins and set up this process to import the app; returns the mock LLM."""
+    import seed_db
+    from mock_llm import MockLLM
+
+    if args.cassette:
+        from llm_cassette import Cassette, ReplayLLM
+        mock = ReplayLLM(Cassette.load(args.cassette), args.replay_latency, args.strict_replay).start()
+    else:
+        mock = MockLLM(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms, seed=args.seed).start()
+    db_path = seed_db.ensure(DATA_DIR, args.rows, args.seed)
+    seed_db.install(db_path, args.db_latency_ms, on_query=db_queries.append if db_queries is not None else None)
+
+    os.environ.update({
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"{mock.url}/v1",
+        "OPENAI_API_BASE": f"{mock.url}/v1",
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_BASE_URL": mock.url,
+        "GROQ_API_BASE": mock.url,
+        "DB_HOST": "benchmark",
+        "DB_USER": "benchmark",
+        "DB_PASSWORD": "benchmark",
+        "DB_NAME": "benchmark",
+    })
+    os.environ.update(dict(setting.split("=", 1) for setting in args.env))
+
+    # Charts and exports go to a scratch directory, not the app's tree
+    workdir = tempfile.mkdtemp(prefix=f"benchmark-{name}-")
+    os.makedirs(os.path.join(workdir, "exports", "charts"))
+    os.chdir(workdir)
+    sys.path.insert(0, os.path.join(REPO_DIR, name))
+    return mock
+
+
+def run_app(name, args):
+    """Benchmark one app in this process; returns its result dict."""
+    import audio_clips
+
+    os.environ["API_ENABLED"] = "0"
+    # mychat has no tracing spans; its DB time is summed from the queries
+    db_queries = []
+    mock = prepare(name, args, db_queries if name == "mychat" else None)
+    clips = [] if args.no_audio else audio_clips.load_clips(os.path.join(DATA_DIR, "audio"))
+
+    if name == "mychat":
+        ask = mychat_driver(db_queries)
+    elif name == "mychat-gemini":
+        ask = mychat_gemini_driver()
+    else:
+        ask = mychat_st_driver(bool(clips))
+
+    workload = [(question, None) for question in TEXT_QUESTIONS] + [(clip["question"], clip) for clip in clips]
+    samples = defaultdict(list)
+    requests = errors = 0
+    started = time.perf_counter()
+    llm_before = mock.stats()
+    for run in range(args.warmup + args.repeat):
+        counted = run >= args.warmup
+        if run == args.warmup:
+            started = time.perf_counter()
+            llm_before = mock.stats()
+        for question, clip in workload:
+            request_started = time.perf_counter()
+            try:
+                spans, ok = ask(question, clip)
+            except Exception as e:
+                print(f"{name}: {question!r} raised {e!r}", file=sys.stderr)
+                spans, ok = [], False
+            total = (time.perf_counter() - request_started) * 1000
+            if not counted:
+                continue
+            requests += 1
+            errors += not ok
+            samples["total (voice)" if clip else "total (text)"].append(total)
+            for stage, ms in spans:
+                samples[stage].append(ms)
+    wall = time.perf_counter() - started
+    mock.stop()
+    # LLM counters of the measured passes only
+    llm = {key: value - llm_before[key] for key, value in mock.stats().items()}
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "llm_requests": llm.pop("requests"),
+        "llm": llm,
+        "recorded_audio": all(clip["recorded"] for clip in clips) if clips else None,
+        "wall_seconds": round(wall, 2),
+        "stages": summarize(samples),
+    }
+
+
+def print_report(results):
+    for name, result in results["apps"].items():
+        if "error" in result:
+            print(f"\n{name}: failed ({result['error']})")
+            continue
+        print(
+            f"\n{name}: {result['requests']} requests, {result['errors']} errors, "
+            f"{result['llm_requests']} LLM calls, {result['wall_seconds']}s"
+        )
+        if result.get("llm"):
+            print(f"  replay: {result['llm']['replay_hits']} recorded, {result['llm']['replay_misses']} missed")
+        print(f"  {'stage':<16}{'n':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'mean ms':>11}")
+        for stage, row in sorted(result["stages"].items()):
+            print(f"  {stage:<16}{row['n']:>6}{row['p50']:>11}{row['p95']:>11}{row['p99']:>11}{row['mean']:>11}")
+
+
+def compare(baseline, results, max_regression, min_delta_ms):
+    """Stages whose p50 or p95 grew by more than max_regression percent and min_delta_ms."""
+    regressions = []
+    for name, result in results["apps"].items():
+        before = baseline.get("apps", {}).get(name, {}).get("stages", {})
+        if "error" in result:
+            regressions.append(f"{name}: failed ({result['error']})")
+            continue
+        if result["errors"] > baseline["apps"].get(name, {}).get("errors", 0):
+            regressions.append(f"{name}: {result['errors']} errors")
+        for stage, row in sorted(result.get("stages", {}).items()):
+            if stage not in before:
+                continue
+            for q in ("p50", "p95"):
+                old, new = before[stage][q], row[q]
+                if new - old > min_delta_ms and new > old * (1 + max_regression / 100):
+                    regressions.append(f"{name} {stage} {q}: {old} -> {new} ms")
+    return regressions
+
+
+def option_args(args):
+    """args as command line options, for the per-app processes."""
+    options = [
+        "--rows", str(args.rows), "--seed", str(args.seed),
+        "--repeat", str(args.repeat), "--warmup", str(args.warmup),
+        "--llm-latency-ms", str(args.llm_latency_ms), "--llm-jitter-ms", str(args.llm_jitter_ms),
+        "--db-latency-ms", str(args.db_latency_ms),
+    ]
+    if args.no_audio:
+        options.append("--no-audio")
+    if args.cassette:
+        options += ["--cassette", os.path.abspath(args.cassette), "--replay-latency", args.replay_latency]
+        if args.strict_replay:
+            options.append("--strict-replay")
+    for setting in args.env:
+        options += ["--env", setting]
+    return options
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the chat pipelines against local stand-ins")
+    parser.add_argument("apps", nargs="*", choices=APPS, default=list(APPS), metavar="app",
+                        help=f"apps to benchmark ({', '.join(APPS)}; default all)")
+    parser.add_argument("--rows", type=int, default=10000, help="rows in the seeded employee_skill_view")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="measured passes over the workload")
+    parser.add_argument("--warmup", type=int, default=1, help="passes before measuring")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="mock LLM delay per completion")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0, help="random +/- on the LLM delay")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="delay added to every query")
+    parser.add_argument("--no-audio", action="store_true", help="skip the spoken questions (and Whisper)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="app setting for the run, e.g. SQL_ENGINE=duckdb (repeatable)")
+    parser.add_argument("--cassette", help="replay recorded LLM interactions (llm_cassette.py) instead of canned ones")
+    parser.add_argument("--replay-latency", choices=("zero", "recorded"), default="zero",
+                        help="replay with no LLM delay or with the recorded one")
+    parser.add_argument("--strict-replay", action="store_true", help="fail LLM requests that have no recording")
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="results JSON of an earlier run; exit with status 1 on regressions")
+    parser.add_argument("--max-regression", type=float, default=10.0,
+                        help="allowed p50/p95 growth per stage against --baseline, in percent")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="ignore growth smaller than this, however large in percent")
+    parser.add_argument("--serve", action="store_true",
+                        help="instead of benchmarking, run the app's server against the stand-ins (for load_test.py)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        if len(args.apps) != 1:
+            parser.error("--serve takes exactly one app")
+        mock = prepare(args.apps[0], args)
+        print(f"Serving {args.apps[0]} with the mock LLM on {mock.url} and {args.rows} seeded rows")
+        runpy.run_path(os.path.join(REPO_DIR, args.apps[0], "app.py"), run_name="__main__")
+        return
+
+    if args.worker:
+        result = run_app(args.apps[0], args)
+        with open(args.out, "w") as f:
+            json.dump(result, f)
+        return
+
+    config = {key: value for key, value in vars(args).items() if key not in ("out", "baseline", "serve", "worker")}
+    results = {"config": config, "apps": {}}
+    for name in args.apps:
+        print(f"Benchmarking {name}...", flush=True)
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            out = f.name
+        try:
+            command = [sys.executable, os.path.abspath(__file__), name, "--worker", "--out", out, *option_args(args)]
+            completed = subprocess.run(command, cwd=BENCHMARK_DIR)
+            if completed.returncode == 0:
+                with open(out) as f:
+                    results["apps"][name] = json.load(f)
+            else:
+                results["apps"][name] = {"error": f"exit code {completed.returncode}"}
+        finally:
+            os.remove(out)
+
+    print_report(results)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.max_regression, args.min_delta_ms)
+        print(f"\nCompared with {args.baseline}: {len(regressions) or 'no'} regressions")
+        for line in regressions:
+            print(f"  {line}")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""A seeded SQLite stand-in for the MariaDB employee_skill_view.
+
+`build(path, rows)` creates employee_skill_view with the same columns as the
+real view (employee_id, employee_name, skill_id, skill_name, skill_rate,
+about 5% NULL rates), deterministically from a seed. `install(path)` then
+replaces mysql.connector.connect, so the apps' own connection code reads
+from the file instead of a server. Queries are translated from MariaDB
+where the dialects differ (%s placeholders, GROUP_CONCAT ... SEPARATOR),
+and can be delayed to model network round trips.
+
+    python seed_db.py --rows 100000 --out employee_skills.sqlite
+"""
+import os
+import random
+import re
+import sqlite3
+import time
+
+VIEW = "employee_skill_view"
+SKILLS = [
+    "Sewing", "Cutting", "Ironing", "Packing", "Quality Check", "Button Attaching",
+    "Embroidery", "Finishing", "Overlock", "Hemming", "Zipper Setting", "Labeling",
+]
+FIRST_NAMES = [
+    "Nimal", "Kamal", "Sunil", "Ruwan", "Saman", "Chathura", "Dilani", "Sanduni", "Tharushi",
+    "Kasun", "Nadeesha", "Ishara", "Priyanka", "Mahesh", "Anusha", "Lahiru", "Gayani", "Ayesha",
+    "Dinesh", "Shanika", "Pradeep", "Harsha", "Malsha", "Roshan",
+]
+LAST_NAMES = [
+    "Perera", "Fernando", "Silva", "Jayasinghe", "Bandara", "Wijesinghe", "Gunawardena",
+    "Rathnayake", "Dissanayake", "Herath", "Karunaratne", "Senanayake", "Wickramasinghe",
+    "Kumara", "Ranasinghe", "Samarasinghe",
+]
+NULL_RATE_SHARE = 0.05
+
+GROUP_CONCAT_SEPARATOR = re.compile(r"GROUP_CONCAT\((.+?)\s+SEPARATOR\s+('[^']*')\s*\)", re.IGNORECASE)
+
+
+def build(path, rows, seed=0):
+    """Create the SQLite file with `rows` employee/skill rows (several skills per employee)."""
+    rng = random.Random(seed)
+    skills_per_employee = min(len(SKILLS), 4)
+    employees = max(rows // skills_per_employee, 1)
+    data = []
+    for employee_id in range(1, employees + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        for skill_id in rng.sample(range(1, len(SKILLS) + 1), skills_per_employee):
+            if len(data) == rows:
+                break
+            rate = None if rng.random() < NULL_RATE_SHARE else rng.randint(1, 5)
+            data.append((employee_id, name, skill_id, SKILLS[skill_id - 1], rate))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    con = sqlite3.connect(tmp)
+    try:
+        con.execute(
+            f"CREATE TABLE {VIEW} (employee_id INTEGER, employee_name TEXT, "
+            "skill_id INTEGER, skill_name TEXT, skill_rate INTEGER)"
+        )
+        con.executemany(f"INSERT INTO {VIEW} VALUES (?, ?, ?, ?, ?)", data)
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, path)
+    return path
+
+
+def ensure(directory, rows, seed=0):
+    """Path of the seeded database for (rows, seed), building it on first use."""
+    path = os.path.join(directory, f"{VIEW}_{rows}_{seed}.sqlite")
+    if not os.path.exists(path):
+        build(path, rows, seed)
+    return path
+
+
+def translate(sql, params):
+    """MariaDB query and parameters in SQLite form."""
+    sql = GROUP_CONCAT_SEPARATOR.sub(r"GROUP_CONCAT(\1, \2)", sql)
+    if params:
+        sql = sql.replace("%s", "?").replace("%%", "%")
+    return sql
+
+
+class Cursor:
+    def __init__(self, cursor, connection):
+        self._cursor = cursor
+        self._connection = connection
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, sql, params=None):
+        started = time.perf_counter()
+        if self._connection.latency:
+            time.sleep(self._connection.latency)
+        if params:
+            self._cursor.execute(translate(sql, params), tuple(params))
+        else:
+            self._cursor.execute(translate(sql, params))
+        self._connection.record(started)
+        return self
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._connection.record(started)
+        return rows
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class Connection:
+    """The subset of a mysql.connector connection the apps and pandas use."""
+
+    def __init__(self, path, latency=0.0, on_query=None):
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self.latency = latency
+        self.on_query = on_query
+        self._open = True
+
+    def record(self, started):
+        if self.on_query is not None:
+            self.on_query((time.perf_counter() - started) * 1000)
+
+    def cursor(self, *args, **kwargs):
+        return Cursor(self._con.cursor(), self)
+
+    def is_connected(self):
+        return self._open
+
+    def commit(self):
+        self._con.commit()
+
+    def rollback(self):
+        self._con.rollback()
+
+    def close(self):
+        if self._open:
+            self._con.close()
+            self._open = False
+
+
+def install(path, latency_ms=0.0, on_query=None):
+    """Point mysql.connector.connect at the seeded file.
+
+    latency_ms is added to every query; on_query(ms) is called with the time
+    spent in each execute and fetch.
+    """
+    import mysql.connector
+
+    def connect(*args, **kwargs):
+        return Connection(path, latency_ms / 1000, on_query)
+
+    mysql.connector.connect = connect
+    return connect
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a seeded SQLite employee_skill_view")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=f"{VIEW}.sqlite")
+    args = parser.parse_args()
+
+    build(args.out, args.rows, args.seed)
+    print(f"Wrote {args.rows} rows of {VIEW} to {args.out}")
@@ -0,0 +1,171 @@
+"""Admission control: per-user rate limits and an LLM circuit breaker.
+
+Under bursts, questions are turned away early with a "busy, try again"
+answer instead of waiting indefinitely behind slow NL-to-SQL calls:
+
+- the Gradio queue holds at most QUEUE_MAX_SIZE events and runs
+  QUERY_CONCURRENCY questions at a time (see app.py)
+- each user (browser session or API client address) may ask
+  RATE_LIMIT_PER_MINUTE questions, with bursts of up to RATE_LIMIT_BURST
+- when recent OpenAI calls fail or are slow, the circuit breaker opens: for
+  CIRCUIT_COOLDOWN_SECONDS only questions the fast path can answer get an
+  answer, then a single trial call decides whether it closes
+
+Rejections and the breaker state are exported on /metrics.
+"""
+import os
+import statistics
+import threading
+import time
+from collections import OrderedDict, deque
+
+from prometheus_client import Counter, Gauge
+
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", 30))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 10))
+# Users whose buckets are kept; the least recently seen are dropped first
+RATE_LIMIT_MAX_USERS = 10000
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", 20))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", 5))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", 0.5))
+CIRCUIT_LATENCY_SECONDS = float(os.getenv("CIRCUIT_LATENCY_SECONDS", 30))
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("CIRCUIT_COOLDOWN_SECONDS", 30))
+# Suggested wait when no better estimate is known
+BUSY_RETRY_SECONDS = 5
+
+REJECTED = Counter("assistant_rejected_requests_total", "Questions turned away by admission control", ["reason"])
+CIRCUIT_STATE = Gauge("assistant_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ["name"])
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+MESSAGES = {
+    "rate_limited": "⏳ You're asking faster than I can answer. Please try again in {seconds} seconds.",
+    "circuit_open": (
+        "⚠️ The language model is slow or failing right now, so I can only answer common questions "
+        "(top employees by skill rate, employees with a skill, counts by skill). "
+        "Please try again in {seconds} seconds."
+    ),
+}
+BUSY_MESSAGE = "⏳ The assistant is busy right now. Please try again in {seconds} seconds."
+
+
+class Busy(Exception):
+    """A question turned away; reason is e.g. "rate_limited" or "circuit_open"."""
+
+    def __init__(self, reason, retry_after=BUSY_RETRY_SECONDS):
+        self.reason = reason
+        self.retry_after = max(int(retry_after + 0.999), 1)
+        super().__init__(self.message)
+        REJECTED.labels(reason).inc()
+
+    @property
+    def message(self):
+        return MESSAGES.get(self.reason, BUSY_MESSAGE).format(seconds=self.retry_after)
+
+
+class RateLimiter:
+    """Token bucket per user: `per_minute` questions, bursts of up to `burst`."""
+
+    def __init__(self, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST, max_users=RATE_LIMIT_MAX_USERS):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, user):
+        """Take a token for user, or raise Busy("rate_limited"). No-op when disabled."""
+        if self.rate <= 0 or user is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(user, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[user] = (tokens, now)
+            while len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        if not allowed:
+            raise Busy("rate_limited", (1 - tokens) / self.rate)
+
+    def stats(self):
+        with self._lock:
+            return {"per_minute": self.rate * 60, "burst": self.burst, "users": len(self._buckets)}
+
+
+class CircuitBreaker:
+    """Opens when recent calls fail or are slow; half-opens for one trial after a cooldown."""
+
+    def __init__(self, name, window=CIRCUIT_WINDOW, min_calls=CIRCUIT_MIN_CALLS, error_rate=CIRCUIT_ERROR_RATE,
+                 latency_seconds=CIRCUIT_LATENCY_SECONDS, cooldown_seconds=CIRCUIT_COOLDOWN_SECONDS):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.latency_seconds = latency_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._calls = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial = False
+        self.opened = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.labels(name).set(0)
+
+    def _set_state(self, state):
+        self._state = state
+        CIRCUIT_STATE.labels(self.name).set(STATE_VALUES[state])
+
+    def _trip(self):
+        self._set_state(OPEN)
+        self._opened_at = time.monotonic()
+        self._trial = False
+        self.opened += 1
+
+    def check(self):
+        """Raise Busy("circuit_open") unless a call may go through now."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self._set_state(HALF_OPEN)
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return
+            remaining = self.cooldown_seconds - (time.monotonic() - self._opened_at)
+        raise Busy("circuit_open", max(remaining, 1))
+
+    def record(self, seconds, ok):
+        """Outcome of a call that check() let through."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if ok and not (self.latency_seconds and seconds >= self.latency_seconds):
+                    self._calls.clear()
+                    self._set_state(CLOSED)
+                else:
+                    self._trip()
+                return
+            self._calls.append((seconds, ok))
+            if self._state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for _, ok in self._calls if not ok)
+                slow = self.latency_seconds and statistics.median(s for s, _ in self._calls) >= self.latency_seconds
+                if failures / len(self._calls) >= self.error_rate or slow:
+                    self._trip()
+
+    def cancel(self):
+        """A call that check() let through never ran (e.g. its queue was full)."""
+        with self._lock:
+            self._trial = False
+
+    def stats(self):
+        with self._lock:
+            calls = list(self._calls)
+            return {
+                "state": self._state,
+                "times_opened": self.opened,
+                "recent_calls": len(calls),
+                "recent_failures": sum(1 for _, ok in calls if not ok),
+                "recent_median_seconds": round(statistics.median(s for s, _ in calls), 2) if calls else None,
+            }
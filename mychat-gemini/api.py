@@ -0,0 +1,167 @@
+"""JSON and WebSocket API over the same NL-to-SQL pipeline as the Gradio UI.
+
+The routes are mounted on the FastAPI app that serves the UI, so they share
+its Whisper pipeline, OpenAI client, fast path and local SQL engine:
+
+- POST /api/v1/query          {"question": "..."}
+- POST /api/v1/query/audio    multipart form with an audio file
+- WS   /api/v1/ws             send {"question": ...} or audio bytes; receives
+                              "transcript", "started" and "result" events
+- GET  /api/v1/coverage       fast path coverage
+- GET  /metrics               Prometheus metrics (see tracing.py)
+
+Results carry the SQL that ran, the rows (up to API_MAX_ROWS) and, for
+chart questions, the x/y columns to plot.
+
+Questions turned away by admission control (admission.py) get 429 when the
+client is over its rate limit and 503 when the LLM circuit breaker is open,
+both with a Retry-After header.
+"""
+import json
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+import admission
+import tracing
+
+API_MAX_ROWS = int(os.getenv("API_MAX_ROWS", 1000))
+
+
+class Query(BaseModel):
+    question: str
+
+
+def to_json(question, answer, started):
+    """JSON body for an answer_query result."""
+    body = {
+        "question": question,
+        "text": answer["text"],
+        "sql": answer.get("sql"),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    data = answer.get("data")
+    if data is not None:
+        table = json.loads(data.head(API_MAX_ROWS).to_json(orient="split", index=False, date_format="iso"))
+        body["table"] = {"columns": table["columns"], "rows": table["data"], "total_rows": len(data)}
+    if answer.get("chart"):
+        body["chart"] = {"x": answer["chart"][0], "y": answer["chart"][1]}
+    return body
+
+
+def busy_error(busy):
+    """HTTP error for a question turned away by admission control."""
+    return HTTPException(
+        status_code=429 if busy.reason == "rate_limited" else 503,
+        detail=busy.message,
+        headers={"Retry-After": str(busy.retry_after)},
+    )
+
+
+def _retry_after(error):
+    """{"retry_after": seconds} for a busy error, for WebSocket error events."""
+    seconds = (error.headers or {}).get("Retry-After")
+    return {"retry_after": int(seconds)} if seconds else {}
+
+
+def create_api(answer_query, transcribe, coverage, admit=lambda client: None):
+    """FastAPI app for answer_query(question), transcribe(audio_path) and coverage().
+
+    answer_query may raise admission.Busy. admit(client) raises admission.Busy
+    when the caller is over its rate limit; it runs before any transcription.
+    """
+    api = FastAPI(title="KingslakeBlue Assistant API")
+
+    def check_admission(client):
+        try:
+            admit(client)
+        except admission.Busy as busy:
+            raise busy_error(busy)
+
+    def transcribe_bytes(data, filename=None):
+        suffix = os.path.splitext(filename or "")[1] or ".wav"
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+            f.write(data)
+        try:
+            return transcribe(f.name)
+        finally:
+            os.remove(f.name)
+
+    def run(question, client=None, admitted=False):
+        if not question or not question.strip():
+            raise HTTPException(status_code=400, detail="Empty question")
+        if not admitted:
+            check_admission(client)
+        started = time.perf_counter()
+        try:
+            answer = answer_query(question.strip())
+        except admission.Busy as busy:
+            raise busy_error(busy)
+        return to_json(question, answer, started)
+
+    @api.post("/api/v1/query")
+    def query(body: Query, request: Request):
+        return run(body.question, request.client.host if request.client else None)
+
+    @api.post("/api/v1/query/audio")
+    def query_audio(request: Request, audio: UploadFile = File(...)):
+        client = request.client.host if request.client else None
+        check_admission(client)
+        question = transcribe_bytes(audio.file.read(), audio.filename)
+        body = run(question, client, admitted=True)
+        body["transcript"] = question
+        return body
+
+    @api.get("/api/v1/coverage")
+    def fast_path_coverage():
+        return coverage()
+
+    @api.get("/metrics")
+    def metrics():
+        body, content_type = tracing.metrics()
+        return Response(content=body, media_type=content_type)
+
+    @api.websocket("/api/v1/ws")
+    async def stream(websocket: WebSocket):
+        await websocket.accept()
+        client = websocket.client.host if websocket.client else None
+        try:
+            while True:
+                message = await websocket.receive()
+                if message.get("type") == "websocket.disconnect":
+                    break
+                admitted = False
+                if message.get("bytes") is not None:
+                    try:
+                        check_admission(client)
+                    except HTTPException as e:
+                        await websocket.send_json({"event": "error", "detail": e.detail, **_retry_after(e)})
+                        continue
+                    admitted = True
+                    question = await run_in_threadpool(transcribe_bytes, message["bytes"])
+                    await websocket.send_json({"event": "transcript", "text": question})
+                else:
+                    try:
+                        payload = json.loads(message.get("text") or "{}")
+                    except json.JSONDecodeError:
+                        payload = None
+                    if not isinstance(payload, dict):
+                        # A bad frame fails on its own; the connection stays open
+                        await websocket.send_json({"event": "error", "detail": 'Expected a JSON object like {"question": "..."}'})
+                        continue
+                    question = payload.get("question", "")
+                await websocket.send_json({"event": "started", "question": question})
+                try:
+                    body = await run_in_threadpool(run, question, client, admitted)
+                    await websocket.send_json({"event": "result", **body})
+                except HTTPException as e:
+                    await websocket.send_json({"event": "error", "detail": e.detail, **_retry_after(e)})
+        except WebSocketDisconnect:
+            pass
+
+    return api
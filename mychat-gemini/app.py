@@ -1,13 +1,22 @@
+import logging
 import os
+import re
+import time
 import gradio as gr
 import openai
 from dotenv import load_dotenv
 import mysql.connector
 import pandas as pd
 from transformers import pipeline
+import admission
+import fast_path
+import tracing
+from single_flight import SingleFlight
 
 # Load environment variables from .env file
 load_dotenv()
+tracing.configure_logging()
+logger = logging.getLogger(__name__)
 
 # --- Configuration ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -15,6 +24,15 @@ DB_HOST = os.getenv("DB_HOST")
 DB_NAME = os.getenv("DB_NAME")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
+# "duckdb" runs generated SQL on an in-process snapshot, "mariadb" on the server
+SQL_ENGINE = os.getenv("SQL_ENGINE", "mariadb").lower()
+# Mount the JSON/WebSocket API (api.py) next to the UI
+API_ENABLED = os.getenv("API_ENABLED", "1") == "1"
+# Port for /metrics when the API (which also serves it) is disabled
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+# Questions answered at once, and events the Gradio queue holds before turning users away
+QUERY_CONCURRENCY = int(os.getenv("QUERY_CONCURRENCY", 4))
+QUEUE_MAX_SIZE = int(os.getenv("QUEUE_MAX_SIZE", 100))
 
 # Initialize OpenAI client
 client = None
@@ -32,24 +50,55 @@ except Exception as e:
 
 # --- Database Schema ---
 # This schema definition helps the LLM generate accurate SQL queries.
-# It's designed to be extensible for future views like 'line_efficiency_view'.
-DATABASE_SCHEMA = """
--- The database contains information about production line balancing.
--- We have the following views available:
--- 1. employee_skill_view: Contains details about employee skills.
-
+# Each view has its own entry so a question's prompt only carries the views it needs;
+# add future views like 'line_efficiency_view' here.
+VIEW_SCHEMAS = {
+    "employee_skill_view": {
+        "description": "Contains details about employee skills.",
+        "keywords": ("employee", "skill", "rate", "rating", "proficiency"),
+        "columns": """
 -- Columns in employee_skill_view:
 -- employee_id (INT): The unique identifier for an employee.
 -- employee_name (VARCHAR): The name of the employee.
 -- skill_id (INT): The unique identifier for a skill.
 -- skill_name (VARCHAR): The name of the skill (e.g., 'Sewing', 'Cutting').
 -- skill_rate (INT): A rating of the employee's proficiency in that skill.
+""",
+    },
+}
+DEFAULT_VIEWS = ("employee_skill_view",)
 
+SCHEMA_EXAMPLES = """
 -- Example queries:
 -- "List top 10 employees by their skill rate. show employee name, skill name and skill rate"
 -- "show top 10 employees by their skill rate in a bar chart"
 """
 
+def views_for_question(user_query):
+    """Picks the views a question refers to, falling back to the default views."""
+    words = set(re.findall(r"[a-z]+", user_query.lower()))
+    words |= {w.rstrip("s") for w in words}
+    needed = [name for name, view in VIEW_SCHEMAS.items() if words & set(view["keywords"])]
+    return needed or list(DEFAULT_VIEWS)
+
+def build_schema(view_names):
+    """Builds the schema prompt for the given views."""
+    listing = "\n".join(
+        f"-- {i}. {name}: {VIEW_SCHEMAS[name]['description']}" for i, name in enumerate(view_names, 1)
+    )
+    columns = "".join(VIEW_SCHEMAS[name]["columns"] for name in view_names)
+    return f"""
+-- The database contains information about production line balancing.
+-- We have the following views available:
+{listing}
+{columns}{SCHEMA_EXAMPLES}"""
+
+DATABASE_SCHEMA = build_schema(list(VIEW_SCHEMAS))
+
+# Per-user rate limits and the circuit breaker around SQL generation, see admission.py
+rate_limiter = admission.RateLimiter()
+llm_breaker = admission.CircuitBreaker("llm")
+
 # --- Core Functions ---
 
 def get_db_connection():
@@ -66,14 +115,19 @@ def get_db_connection():
         print(f"Error connecting to database: {err}")
         return None
 
+@tracing.span("llm")
 def generate_sql_from_text(user_query):
-    """Uses OpenAI GPT-3.5 to convert a natural language query into a SQL query."""
+    """Uses OpenAI GPT-3.5 to convert a natural language query into a SQL query.
+
+    Raises admission.Busy while the circuit breaker is open.
+    """
     if not client:
         return None, "OpenAI API key is not configured."
+    llm_breaker.check()
 
     prompt = f"""
     Given the following database schema:
-    {DATABASE_SCHEMA}
+    {build_schema(views_for_question(user_query))}
 
     Convert the following user's question into a valid SQL query for MariaDB.
     Only return the SQL query and nothing else.
@@ -81,6 +135,7 @@ def generate_sql_from_text(user_query):
     User Question: "{user_query}"
     SQL Query:
     """
+    started = time.perf_counter()
     try:
         response = client.chat.completions.create(
             model="gpt-3.5-turbo",
@@ -90,19 +145,21 @@ def generate_sql_from_text(user_query):
             ],
             temperature=0.0
         )
-        sql_query = response.choices[0].message.content.strip()
-        return sql_query, None
     except Exception as e:
+        llm_breaker.record(time.perf_counter() - started, ok=False)
         return None, f"Error generating SQL: {e}"
+    llm_breaker.record(time.perf_counter() - started, ok=True)
+    sql_query = response.choices[0].message.content.strip()
+    return sql_query, None
 
-def execute_sql_query(sql_query):
+def execute_sql_query(sql_query, params=None):
     """Executes a SQL query and returns the result as a pandas DataFrame."""
     conn = get_db_connection()
     if conn is None:
         return None, "Failed to connect to the database."
     
     try:
-        df = pd.read_sql(sql_query, conn)
+        df = pd.read_sql(sql_query, conn, params=params or None)
         return df, None
     except Exception as e:
         return None, f"Error executing query: {e}"
@@ -110,61 +167,157 @@ def execute_sql_query(sql_query):
         if conn.is_connected():
             conn.close()
 
+local_engine = None
+if SQL_ENGINE == "duckdb":
+    from local_engine import LocalEngine, UnsupportedSQL
+
+    def load_view(name):
+        df, error = execute_sql_query(f"SELECT * FROM {name}")
+        if error:
+            raise RuntimeError(error)
+        return df
+
+    local_engine = LocalEngine(load_view, views=tuple(VIEW_SCHEMAS))
+
+def run_query(sql_query, params=None):
+    """Runs a query on the local DuckDB snapshot when enabled, falling back to MariaDB."""
+    if local_engine is not None:
+        try:
+            with tracing.span("duckdb"):
+                return local_engine.execute(sql_query, params), None
+        except UnsupportedSQL as e:
+            logger.info("Running query on MariaDB instead of DuckDB: %s", e)
+        except Exception as e:
+            logger.warning("Local snapshot unavailable, using MariaDB: %s", e)
+    with tracing.span("db"):
+        return execute_sql_query(sql_query, params)
+
+def load_entity_names():
+    """Loads the distinct employee and skill names used by the fast path."""
+    df, error = run_query("SELECT DISTINCT employee_name, skill_name FROM employee_skill_view")
+    if error:
+        logger.warning("Fast path vocabulary unavailable: %s", error)
+        return None
+    return df
+
+# Answers common question shapes with prebuilt SQL instead of the LLM
+router = fast_path.FastPathRouter(load_entity_names)
+
 def transcribe_audio(audio_input):
     """Transcribes audio input to text using the speech-to-text pipeline."""
     if transcriber is None or audio_input is None:
         return ""
     try:
-        text = transcriber(audio_input)["text"]
+        with tracing.span("asr"):
+            text = transcriber(audio_input)["text"]
         return text
     except Exception as e:
-        print(f"Error during transcription: {e}")
+        logger.error("Error during transcription: %s", e)
         return ""
 
-def handle_chat_submission(user_message, history):
-    """Main function to handle user queries, generate SQL, execute it, and return results."""
-    history.append([user_message, None])
-    
-    # 1. Generate SQL from the user's text query
-    sql_query, error = generate_sql_from_text(user_message)
-    if error:
-        history[-1][1] = f"Error: {error}"
-        return history, gr.update(visible=False), gr.update(visible=False)
+def answer_question(user_message):
+    """Runs the pipeline for one question; see answer_query."""
+    # 1. Use a prebuilt query for common question shapes, else generate SQL
+    with tracing.span("fast_path"):
+        intent = router.route(user_message)
+    chart_columns = None
+    if intent is not None:
+        sql_query, params, chart_columns = fast_path.build_sql(intent)
+    else:
+        params = None
+        sql_query, error = generate_sql_from_text(user_message)
+        if error:
+            return {"text": f"Error: {error}"}
 
     # 2. Execute the SQL query
-    result_df, error = execute_sql_query(sql_query)
+    result_df, error = run_query(sql_query, params)
     if error:
-        history[-1][1] = f"Error: {error}"
-        return history, gr.update(visible=False), gr.update(visible=False)
+        return {"text": f"Error: {error}", "sql": sql_query}
 
     # 3. Determine the output format (table, chart, or text)
     if "chart" in user_message.lower() and result_df is not None and not result_df.empty:
-        # Generate a bar chart
         try:
-            # Heuristic to find good columns for a bar chart
-            x_col = result_df.columns[1]  # Often a name or category
-            y_col = result_df.columns[-1]  # Often a numeric value
-            history[-1][1] = "Here is the chart you requested:"
+            if chart_columns:
+                x_col, y_col = chart_columns
+            else:
+                # Heuristic to find good columns for a bar chart
+                x_col = result_df.columns[1]  # Often a name or category
+                y_col = result_df.columns[-1]  # Often a numeric value
+            return {"text": "Here is the chart you requested:", "sql": sql_query, "data": result_df, "chart": (x_col, y_col)}
+        except Exception as e:
+            return {
+                "text": f"Could not generate a chart. Displaying data as a table instead. Error: {e}",
+                "sql": sql_query,
+                "data": result_df,
+            }
+
+    elif result_df is not None and not result_df.empty:
+        return {"text": "Here is the data you requested:", "sql": sql_query, "data": result_df}
+
+    else:
+        # Handle cases with no data or other issues
+        return {"text": "I couldn't retrieve any data for that query. Please try rephrasing your question.", "sql": sql_query}
+
+# Identical questions in flight at once run the pipeline once, see single_flight.py
+in_flight = SingleFlight("query")
+
+def answer_query(user_message):
+    """Answers a question without touching the UI.
+
+    Returns a dict with the reply "text" and, when there is data, the "sql",
+    the result "data" and, for charts, the "chart" (x, y) columns. Used by
+    the chat and by the JSON API; concurrent identical questions share one
+    answer. Raises admission.Busy when the question needs the LLM and the
+    circuit breaker is open.
+    """
+    answer, _ = in_flight.do(fast_path.normalize(user_message), answer_question, user_message)
+    return dict(answer)
+
+def admit_api(client=None):
+    """Take a rate-limit token for an API caller's address; raises admission.Busy when it is over its limit."""
+    rate_limiter.check(f"client:{client}" if client else None)
+
+def pipeline_status():
+    """Fast path coverage, coalesced questions and admission control for the coverage panel."""
+    return {
+        **router.coverage(),
+        "coalesced": in_flight.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "llm_circuit": llm_breaker.stats(),
+    }
+
+@tracing.traced("ui")
+def handle_chat_submission(user_message, history, request: gr.Request = None):
+    """Main function to handle user queries, generate SQL, execute it, and return results."""
+    history.append([user_message, None])
+    try:
+        rate_limiter.check(request.session_hash if request else None)
+        answer = answer_query(user_message)
+    except admission.Busy as busy:
+        answer = {"text": busy.message}
+    history[-1][1] = answer["text"]
+    result_df = answer.get("data")
+
+    if answer.get("chart"):
+        x_col, y_col = answer["chart"]
+        try:
             # Return a new BarPlot object to update the UI
-            return history, gr.update(visible=False), gr.BarPlot(
-                value=result_df,
-                x=x_col,
-                y=y_col,
-                title=f"Chart for: {user_message}",
-                visible=True
-            )
+            with tracing.span("chart"):
+                plot = gr.BarPlot(
+                    value=result_df,
+                    x=x_col,
+                    y=y_col,
+                    title=f"Chart for: {user_message}",
+                    visible=True
+                )
+            return history, gr.update(visible=False), plot
         except Exception as e:
             history[-1][1] = f"Could not generate a chart. Displaying data as a table instead. Error: {e}"
             return history, gr.update(value=result_df, visible=True), gr.update(visible=False)
-
-    elif result_df is not None and not result_df.empty:
+    elif result_df is not None:
         # Display results in a table
-        history[-1][1] = "Here is the data you requested:"
         return history, gr.update(value=result_df, visible=True), gr.update(visible=False)
-    
     else:
-        # Handle cases with no data or other issues
-        history[-1][1] = "I couldn't retrieve any data for that query. Please try rephrasing your question."
         return history, gr.update(visible=False), gr.update(visible=False)
 
 
@@ -197,11 +350,15 @@ with gr.Blocks(theme=gr.themes.Soft(), title="KingslakeBlue Assistant") as app:
         send_button = gr.Button("Send", variant="primary")
         clear_button = gr.Button("Clear")
 
+    with gr.Accordion("Fast path coverage", open=False):
+        coverage_output = gr.JSON(label="Questions answered without the LLM")
+        coverage_button = gr.Button("Refresh")
+
     # --- Event Listeners ---
 
     # When audio is recorded, transcribe it and put the text in the textbox
     audio_input.change(
-        fn=transcribe_audio,
+        fn=tracing.traced("transcribe")(transcribe_audio),
         inputs=audio_input,
         outputs=text_input
     )
@@ -210,12 +367,22 @@ with gr.Blocks(theme=gr.themes.Soft(), title="KingslakeBlue Assistant") as app:
     send_button.click(
         fn=handle_chat_submission,
         inputs=[text_input, chatbot],
-        outputs=[chatbot, data_output, plot_output]
+        outputs=[chatbot, data_output, plot_output],
+        concurrency_limit=QUERY_CONCURRENCY,
+        concurrency_id="query"
     )
     text_input.submit(
         fn=handle_chat_submission,
         inputs=[text_input, chatbot],
-        outputs=[chatbot, data_output, plot_output]
+        outputs=[chatbot, data_output, plot_output],
+        concurrency_limit=QUERY_CONCURRENCY,
+        concurrency_id="query"
+    )
+
+    coverage_button.click(
+        fn=pipeline_status,
+        inputs=[],
+        outputs=coverage_output
     )
 
     # When the clear button is clicked
@@ -226,4 +393,19 @@ with gr.Blocks(theme=gr.themes.Soft(), title="KingslakeBlue Assistant") as app:
     )
 
 if __name__ == "__main__":
-    app.launch(server_name="0.0.0.0", server_port=7860)
+    # A bounded queue turns users away instead of growing behind slow questions
+    app.queue(default_concurrency_limit=QUERY_CONCURRENCY, max_size=QUEUE_MAX_SIZE)
+    if API_ENABLED:
+        # Serve the JSON API and the UI from one server, sharing models and caches
+        import uvicorn
+        from api import create_api
+
+        api = create_api(tracing.traced("api")(answer_query), transcribe_audio, router.coverage, admit=admit_api)
+        api = gr.mount_gradio_app(api, app, path="/")
+        uvicorn.run(api, host="0.0.0.0", port=7860)
+    else:
+        if METRICS_PORT:
+            # Without the API server, /metrics gets its own port
+            from prometheus_client import start_http_server
+            start_http_server(METRICS_PORT)
+        app.launch(server_name="0.0.0.0", server_port=7860)
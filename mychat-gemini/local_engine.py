@@ -0,0 +1,308 @@
+"""In-process DuckDB engine over cached Arrow snapshots of the views.
+
+The whole employee_skill_view fits comfortably in memory, so generated SQL
+can run locally instead of making a MariaDB round-trip per question. Queries
+are translated from MariaDB to DuckDB syntax and validated first; anything
+the translator can't vouch for raises UnsupportedSQL so the caller can fall
+back to MariaDB.
+
+Run `python local_engine.py --benchmark` to compare local and remote timings.
+"""
+import os
+import re
+import threading
+import time
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+LOCAL_SNAPSHOT_TTL_SECONDS = float(os.getenv("LOCAL_SNAPSHOT_TTL_SECONDS", 300))
+LOCAL_VIEWS = ("employee_skill_view",)
+
+# MariaDB constructs with no safe DuckDB equivalent; these go to MariaDB
+UNSUPPORTED_PATTERNS = [
+    (re.compile(r"\binto\s+(?:out|dump)file\b", re.I), "INTO OUTFILE"),
+    (re.compile(r"\bfor\s+update\b|\block\s+in\s+share\s+mode\b", re.I), "locking clause"),
+    (re.compile(r"\bsql_calc_found_rows\b|\bfound_rows\s*\(", re.I), "FOUND_ROWS"),
+    (re.compile(r"@@?\w+"), "session variable"),
+    (re.compile(r"\b(?:date_format|str_to_date|from_unixtime|unix_timestamp|timestampdiff|field|find_in_set)\s*\(", re.I), "MariaDB-only function"),
+    (re.compile(r"\bregexp\b|\brlike\b", re.I), "REGEXP operator"),
+    (re.compile(r"\bwith\s+rollup\b", re.I), "WITH ROLLUP"),
+]
+
+# Straight function renames (MariaDB name -> DuckDB name)
+FUNCTION_RENAMES = {
+    "rand": "random",
+    "ucase": "upper",
+    "lcase": "lower",
+}
+
+TABLE_REFERENCE = re.compile(r"\b(?:from|join)\s+([\"\w.]+)", re.I)
+CTE_NAME = re.compile(r"(?:\bwith|,)\s*(\w+)\s+as\s*\(", re.I)
+# Stands in for a string literal or quoted identifier while the code is rewritten
+QUOTED_MARKER = re.compile(r"\x00(\d+)\x00")
+
+
+class UnsupportedSQL(Exception):
+    """The query can't be run safely on the local engine."""
+
+
+def _strip_fences(sql):
+    sql = sql.strip()
+    fenced = re.match(r"^```(?:sql)?\s*(.*?)\s*```$", sql, re.S | re.I)
+    if fenced:
+        sql = fenced.group(1)
+    return sql.strip().rstrip(";").strip()
+
+
+def _convert_quotes(sql):
+    """Rewrite quoting and %s placeholders outside of string literals.
+
+    MariaDB treats "..." as a string and `...` as an identifier; DuckDB
+    uses '...' and "..." for those. Returns (code, quoted): code has every
+    literal and quoted identifier replaced by a marker, and quoted holds
+    their DuckDB spelling, so rewrites of the code never touch their text.
+    """
+    out, quoted, i, n = [], [], 0, len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch in ("'", '"', "`"):
+            j = i + 1
+            buf = []
+            while j < n:
+                if sql[j] == "\\" and j + 1 < n and ch != "`":
+                    buf.append(sql[j + 1])
+                    j += 2
+                    continue
+                if sql[j] == ch:
+                    if j + 1 < n and sql[j + 1] == ch:
+                        buf.append(ch)
+                        j += 2
+                        continue
+                    break
+                buf.append(sql[j])
+                j += 1
+            else:
+                raise UnsupportedSQL("Unterminated quoted string")
+            text = "".join(buf)
+            if ch == "`":
+                quoted.append('"' + text.replace('"', '""') + '"')
+            else:
+                quoted.append("'" + text.replace("'", "''") + "'")
+            out.append(f"\x00{len(quoted) - 1}\x00")
+            i = j + 1
+        elif ch == "\x00":
+            raise UnsupportedSQL("NUL character in query")
+        elif sql.startswith("%s", i):
+            out.append("?")
+            i += 2
+        elif ch == ";":
+            raise UnsupportedSQL("Multiple statements")
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out), quoted
+
+
+def _restore_quotes(code, quoted):
+    sql = QUOTED_MARKER.sub(lambda m: quoted[int(m.group(1))], code)
+    if "\x00" in sql or QUOTED_MARKER.findall(code) != [str(i) for i in range(len(quoted))]:
+        # A rewrite moved, dropped or duplicated a literal
+        raise UnsupportedSQL("Literals changed during translation")
+    return sql
+
+
+def _rewrite_group_concat(sql):
+    pattern = re.compile(
+        r"\bgroup_concat\s*\(\s*(distinct\s+)?(.+?)(?:\s+order\s+by\s+(.+?))?(?:\s+separator\s+(\x00\d+\x00))?\s*\)",
+        re.I,
+    )
+
+    def replace(m):
+        distinct, expr, order, separator = m.groups()
+        args = f"{distinct or ''}{expr}, {separator or chr(39) + ',' + chr(39)}"
+        if order:
+            args += f" ORDER BY {order}"
+        return f"string_agg({args})"
+
+    return pattern.sub(replace, sql)
+
+
+def _swap_limit(m):
+    offset, count = m.groups()
+    if "?" in (offset, count):
+        # Swapping placeholders would swap their parameters too
+        raise UnsupportedSQL("Parameterized LIMIT offset, count")
+    return f"LIMIT {count} OFFSET {offset}"
+
+
+def translate(sql):
+    """Translate a MariaDB SELECT into DuckDB SQL, or raise UnsupportedSQL."""
+    sql = _strip_fences(sql)
+    if not re.match(r"^(select|with)\b", sql, re.I):
+        raise UnsupportedSQL("Only SELECT queries run locally")
+
+    # Rewrites apply to the code only, never to text inside literals
+    code, quoted = _convert_quotes(sql)
+    for pattern, reason in UNSUPPORTED_PATTERNS:
+        if pattern.search(code):
+            raise UnsupportedSQL(f"Unsupported construct: {reason}")
+    # LIMIT offset, count -> LIMIT count OFFSET offset
+    code = re.sub(r"\blimit\s+(\d+|\?)\s*,\s*(\d+|\?)", _swap_limit, code, flags=re.I)
+    # MariaDB's default collation makes LIKE case-insensitive
+    code = re.sub(r"\b(not\s+)?like\b", lambda m: f"{m.group(1) or ''}ILIKE", code, flags=re.I)
+    code = _rewrite_group_concat(code)
+    code = re.sub(r"\bcurdate\s*\(\s*\)", "current_date", code, flags=re.I)
+    for old, new in FUNCTION_RENAMES.items():
+        code = re.sub(rf"\b{old}\s*\(", f"{new}(", code, flags=re.I)
+
+    return _restore_quotes(code, quoted)
+
+
+def referenced_views(sql, views=LOCAL_VIEWS):
+    """Views a translated query reads; raises UnsupportedSQL for any other table."""
+    ctes = {name.lower() for name in CTE_NAME.findall(sql)}
+    needed = []
+    for table in TABLE_REFERENCE.findall(sql):
+        name = table.strip('"').split(".")[-1].lower()
+        if name in ctes:
+            continue
+        if name not in views:
+            raise UnsupportedSQL(f"Table {name!r} is not in the local snapshot")
+        if name not in needed:
+            needed.append(name)
+    return needed
+
+
+class LocalEngine:
+    """DuckDB over Arrow snapshots of the views.
+
+    Views are loaded lazily, the first time a query reads them, and each is
+    reloaded once older than the TTL. `load_view(name)` returns the view as a
+    pandas DataFrame.
+    """
+
+    def __init__(self, load_view, views=LOCAL_VIEWS, ttl=LOCAL_SNAPSHOT_TTL_SECONDS):
+        self._load_view = load_view
+        self.views = views
+        self.ttl = ttl
+        self._con = duckdb.connect(database=":memory:")
+        # Match MariaDB defaults: case-insensitive string comparison, and
+        # NULLs sorting as the smallest value
+        self._con.execute("SET default_collation = 'nocase'")
+        self._con.execute("SET default_null_order = 'nulls_first_on_asc_last_on_desc'")
+        self._tables = {}  # name -> (Arrow table, loaded_at)
+        self._lock = threading.Lock()
+
+    def _table(self, name):
+        entry = self._tables.get(name)
+        if entry and time.time() - entry[1] < self.ttl:
+            return entry[0]
+        with self._lock:
+            entry = self._tables.get(name)
+            if not entry or time.time() - entry[1] >= self.ttl:
+                # Swap in a whole new table so in-flight queries keep theirs
+                table = pa.Table.from_pandas(self._load_view(name), preserve_index=False)
+                entry = (table, time.time())
+                self._tables[name] = entry
+            return entry[0]
+
+    def execute(self, sql, params=None):
+        """Run MariaDB-flavoured SQL locally and return a DataFrame.
+
+        Raises UnsupportedSQL when the query can't be translated, DuckDB
+        rejects it or it returns no rows.
+        """
+        local_sql = translate(sql)
+        tables = {name: self._table(name) for name in referenced_views(local_sql, self.views)}
+        # A cursor is a separate connection to the same in-memory database,
+        # so concurrent requests don't share one; registering an Arrow table
+        # on it is zero-copy
+        cursor = self._con.cursor()
+        try:
+            for name, table in tables.items():
+                cursor.register(name, table)
+            result = cursor.execute(local_sql, list(params or [])).df()
+        except duckdb.Error as e:
+            raise UnsupportedSQL(f"DuckDB could not run the query: {e}") from e
+        finally:
+            cursor.close()
+        if result.empty:
+            # A translation slip usually shows up as an empty answer, which
+            # nobody would question; let MariaDB confirm it
+            raise UnsupportedSQL("No rows locally, confirming on MariaDB")
+        return result
+
+    def memory_bytes(self):
+        return sum(table.nbytes for table, _ in self._tables.values())
+
+
+def benchmark(engine, remote_execute, queries, runs=20):
+    """Time each query on the local engine and on MariaDB.
+
+    `remote_execute(sql)` runs a query against MariaDB. Returns one dict per
+    query with the median latency of each path in milliseconds.
+    """
+    def median_ms(fn):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return round(timings[len(timings) // 2], 2)
+
+    engine.execute(queries[0])  # load the snapshot outside the timings
+    results = []
+    for sql in queries:
+        row = {"query": sql, "remote_ms": median_ms(lambda: remote_execute(sql))}
+        try:
+            row["local_ms"] = median_ms(lambda: engine.execute(sql))
+        except UnsupportedSQL as e:
+            row["local_ms"] = None
+            row["fallback"] = str(e)
+        results.append(row)
+    return results
+
+
+BENCHMARK_QUERIES = [
+    "SELECT employee_name, skill_name, skill_rate FROM employee_skill_view ORDER BY skill_rate DESC LIMIT 10",
+    "SELECT skill_name, COUNT(DISTINCT employee_id) AS employee_count FROM employee_skill_view GROUP BY skill_name",
+    "SELECT skill_name, AVG(skill_rate) AS avg_rate FROM `employee_skill_view` WHERE skill_name LIKE \"%sew%\" GROUP BY skill_name",
+    "SELECT employee_name, GROUP_CONCAT(skill_name SEPARATOR ', ') AS skills FROM employee_skill_view GROUP BY employee_name LIMIT 0, 20",
+]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import mysql.connector
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Benchmark the local DuckDB engine against MariaDB")
+    parser.add_argument("--benchmark", action="store_true", help="run the benchmark queries")
+    parser.add_argument("--runs", type=int, default=20, help="repetitions per query")
+    args = parser.parse_args()
+    if not args.benchmark:
+        parser.print_help()
+        raise SystemExit(0)
+
+    load_dotenv()
+
+    def remote(sql):
+        conn = mysql.connector.connect(
+            host=os.getenv("DB_HOST"),
+            database=os.getenv("DB_NAME"),
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASSWORD"),
+        )
+        try:
+            return pd.read_sql(sql, conn)
+        finally:
+            conn.close()
+
+    engine = LocalEngine(lambda name: remote(f"SELECT * FROM {name}"))
+    for row in benchmark(engine, remote, BENCHMARK_QUERIES, runs=args.runs):
+        print(row)
+    print(f"Local snapshot size: {engine.memory_bytes() / 1024:.1f} KiB")
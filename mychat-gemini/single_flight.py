@@ -0,0 +1,76 @@
+"""Coalescing of identical questions that are in flight at the same time.
+
+When several people ask the same question at once (a team lead shares it,
+everyone types it), only the first runs the pipeline; the others wait for
+that call and get its result, instead of each doing the same database
+read and LLM call. Only concurrent calls are shared: a question asked
+after the first one finished runs again (and hits the usual caches).
+"""
+import threading
+
+from prometheus_client import Counter
+
+import tracing
+
+COALESCED = Counter(
+    "assistant_coalesced_requests_total", "Requests that shared the result of an identical in-flight one", ["name"]
+)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its outcome."""
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """fn(*args, **kwargs), or the result of the identical call in flight; returns (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            COALESCED.labels(self.name).inc()
+            with tracing.span("coalesced_wait"):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "waiting": sum(call.waiters for call in self._calls.values()),
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+            }
@@ -0,0 +1,87 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import fast_path
+
+NAMES = pd.DataFrame({
+    "employee_name": ["John Smith", "Mary Jones", "Peter Brown"],
+    "skill_name": ["Sewing", "Overlock", "Cutting"],
+})
+VOCABULARY = fast_path.Vocabulary(NAMES)
+
+
+def match(question):
+    return fast_path.match(question, VOCABULARY)
+
+
+@pytest.mark.parametrize("question, name", [
+    ("Show the top 5 employees by skill rate", "top_by_skill_rate"),
+    ("Count employees by skill", "count_by_skill"),
+    ("Show employees with Sewing skill", "list_rows"),
+    ("Which employees have no skill rate", "null_skill_rates"),
+])
+def test_match(question, name):
+    assert match(question).name == name
+
+
+@pytest.mark.parametrize("question", [
+    "show employees with no sewing skill",
+    "show me Sewing employees with rate 5",
+    "how many skills does John have",
+    "compare John and Mary",
+    "top 5 employees by skill rate excluding cutting",
+    "top 5 employees by skill rate for John",
+    "show employees with sewing skill and overlock skill",
+    "count employees by skill for sewing",
+    "top 5 employees by skill rate in 2023",
+    "show sewing employees hired last year",
+    "show only women with sewing skill",
+    "top 5 employees by skill rate ascending",
+])
+def test_partly_understood_questions_go_to_the_llm(question):
+    assert match(question) is None
+
+
+def test_router_counts_coverage():
+    router = fast_path.FastPathRouter(lambda: NAMES)
+    router.route("count employees by skill")
+    router.route("what is the weather today")
+    assert router.coverage()["fast_path"] == 1
+    assert router.coverage()["llm"] == 1
+
+
+def test_build_sql_ignores_padding_around_names():
+    sql, params, _ = fast_path.build_sql(match("show employees with sewing skill"))
+    assert "LOWER(TRIM(skill_name)) = %s" in sql
+    assert params == ("sewing",)
+    sql, params, _ = fast_path.build_sql(match("top 3 sewing employees by skill rate"))
+    assert "LOWER(TRIM(skill_name)) = %s" in sql
+    assert params == ("sewing", 3)
+
+
+def test_count_by_skill_skips_null_skills():
+    sql, _, _ = fast_path.build_sql(match("count employees by skill"))
+    assert "WHERE skill_name IS NOT NULL" in sql
+
+
+def test_vocabulary_loads_outside_the_lock():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_names():
+        started.set()
+        release.wait(5)
+        return NAMES
+
+    router = fast_path.FastPathRouter(slow_names, ttl=0)
+    router._vocabulary, router._loaded_at = VOCABULARY, 0.0
+    loader = threading.Thread(target=router.vocabulary)
+    loader.start()
+    started.wait(5)
+    # A second caller gets the previous vocabulary instead of waiting
+    assert router.vocabulary() is VOCABULARY
+    assert router.coverage()["questions"] == 0
+    release.set()
+    loader.join(5)
+    assert router.vocabulary() is not None
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+
+from local_engine import LocalEngine, UnsupportedSQL, referenced_views, translate  # noqa: E402
+
+VIEW = pd.DataFrame({
+    "employee_id": [1, 1, 2, 3],
+    "employee_name": ["John Smith", "John Smith", "Mary Jones", "Peter Brown"],
+    "skill_name": ["Sewing", "Overlock", "sewing like pro", "Cutting"],
+    "skill_rate": [5.0, 3.0, 4.0, None],
+})
+
+
+@pytest.mark.parametrize("mariadb, duckdb", [
+    ("SELECT * FROM `employee_skill_view` WHERE skill_name = \"Sewing\"",
+     "SELECT * FROM \"employee_skill_view\" WHERE skill_name = 'Sewing'"),
+    ("SELECT * FROM employee_skill_view WHERE skill_name LIKE '%sew%' LIMIT 5, 10",
+     "SELECT * FROM employee_skill_view WHERE skill_name ILIKE '%sew%' LIMIT 10 OFFSET 5"),
+    ("SELECT GROUP_CONCAT(skill_name SEPARATOR '; ') FROM employee_skill_view WHERE skill_rate = %s",
+     "SELECT string_agg(skill_name, '; ') FROM employee_skill_view WHERE skill_rate = ?"),
+    ("```sql\nSELECT UCASE(employee_name), RAND() FROM employee_skill_view;\n```",
+     "SELECT upper(employee_name), random() FROM employee_skill_view"),
+])
+def test_translate(mariadb, duckdb):
+    assert translate(mariadb) == duckdb
+
+
+@pytest.mark.parametrize("literal", [
+    "'sewing like pro'",
+    "'curdate() rand( ucase('",
+    "'group_concat(x separator '',''), limit 1, 2'",
+    "'it''s @home'",
+])
+def test_translate_leaves_literals_alone(literal):
+    assert translate(f"SELECT * FROM employee_skill_view WHERE skill_name = {literal}").endswith(f"= {literal}")
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM employee_skill_view",
+    "SELECT 1; DROP TABLE employee_skill_view",
+    "SELECT * FROM employee_skill_view WHERE skill_name REGEXP 'sew'",
+    "SELECT @@version",
+    "SELECT * FROM employee_skill_view LIMIT %s, %s",
+    "SELECT 'unterminated FROM employee_skill_view",
+])
+def test_translate_rejects(sql):
+    with pytest.raises(UnsupportedSQL):
+        translate(sql)
+
+
+def test_referenced_views_only_allows_local_views():
+    assert referenced_views(translate(
+        "WITH s AS (SELECT * FROM employee_skill_view) SELECT * FROM s"
+    )) == ["employee_skill_view"]
+    with pytest.raises(UnsupportedSQL):
+        referenced_views("SELECT * FROM users")
+
+
+def test_engine_runs_translated_queries():
+    engine = LocalEngine(lambda name: VIEW)
+    result = engine.execute("SELECT employee_name FROM employee_skill_view WHERE skill_name = 'sewing like pro'")
+    assert list(result["employee_name"]) == ["Mary Jones"]
+    # MariaDB's default collation is case-insensitive
+    result = engine.execute("SELECT COUNT(*) AS n FROM employee_skill_view WHERE skill_name = %s", ("SEWING",))
+    assert result["n"][0] == 1
+
+
+def test_engine_falls_back_on_failures_and_empty_results():
+    engine = LocalEngine(lambda name: VIEW)
+    with pytest.raises(UnsupportedSQL):
+        engine.execute("SELECT no_such_column FROM employee_skill_view")
+    with pytest.raises(UnsupportedSQL):
+        engine.execute("SELECT * FROM employee_skill_view WHERE skill_name = 'Knitting'")
@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import admission  # noqa: E402
+from api import create_api  # noqa: E402
+
+
+def make_client(answer_query=None, admit=lambda client: None):
+    transcribed = []
+
+    def transcribe(path):
+        transcribed.append(path)
+        return "transcribed question"
+
+    answer_query = answer_query or (lambda question: {"text": f"answer to {question}"})
+    api = create_api(answer_query, transcribe, lambda: {}, admit=admit)
+    return TestClient(api), transcribed
+
+
+def test_rate_limit_sheds_load_before_transcription():
+    limiter = admission.RateLimiter(per_minute=1, burst=2)
+    client, transcribed = make_client(admit=limiter.check)
+    assert client.post("/api/v1/query", json={"question": "count by skill"}).status_code == 200
+    assert client.post("/api/v1/query", json={"question": "count by skill"}).status_code == 200
+
+    response = client.post("/api/v1/query", json={"question": "count by skill"})
+    assert response.status_code == 429 and int(response.headers["Retry-After"]) > 0
+    response = client.post("/api/v1/query/audio", files={"audio": ("q.wav", b"RIFF", "audio/wav")})
+    assert response.status_code == 429 and transcribed == []
+
+
+def test_open_circuit_sheds_llm_questions():
+    breaker = admission.CircuitBreaker("test", window=2, min_calls=2, cooldown_seconds=60)
+    for _ in range(2):
+        breaker.record(1, ok=False)
+
+    def answer_query(question):
+        breaker.check()
+        return {"text": "generated"}
+
+    client, _ = make_client(answer_query)
+    response = client.post("/api/v1/query", json={"question": "average rate per line"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "60"
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_json({"question": "average rate per line"})
+        assert ws.receive_json()["event"] == "started"
+        error = ws.receive_json()
+        assert error["event"] == "error" and error["retry_after"] == 60
@@ -0,0 +1,122 @@
+"""Per-request stage timings, Prometheus metrics and request IDs in logs.
+
+Each chat turn or API call runs inside `request(...)`, which assigns a
+request ID; every `span(stage)` inside it (speech recognition, the fast
+path, SQL generation, the query, chart rendering) is recorded in a
+Prometheus histogram and in the request's trace. When the request ends its
+spans are logged as one JSON line, and every log record made while it runs
+carries its request ID.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+STAGE_SECONDS = Histogram(
+    "assistant_stage_seconds", "Time spent in each pipeline stage", ["stage"], buckets=BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "assistant_request_seconds", "End-to-end time per request", ["entrypoint"], buckets=BUCKETS
+)
+REQUEST_ERRORS = Counter(
+    "assistant_request_errors_total", "Requests that raised an error", ["entrypoint"]
+)
+
+logger = logging.getLogger("assistant.trace")
+_current = contextvars.ContextVar("trace", default=None)
+
+
+@dataclass
+class Trace:
+    request_id: str
+    entrypoint: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: list = field(default_factory=list)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request ID to every log record."""
+
+    def filter(self, record):
+        trace = _current.get()
+        record.request_id = trace.request_id if trace else "-"
+        return True
+
+
+def configure_logging(level=LOG_LEVEL):
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def current():
+    """The trace of the request running in this context, or None."""
+    return _current.get()
+
+
+@contextmanager
+def request(entrypoint, request_id=None):
+    """Trace one request; yields its Trace."""
+    trace = Trace(request_id=request_id or uuid.uuid4().hex[:12], entrypoint=entrypoint)
+    token = _current.set(trace)
+    failed = False
+    try:
+        yield trace
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - trace.started
+        REQUEST_SECONDS.labels(entrypoint).observe(elapsed)
+        if failed:
+            REQUEST_ERRORS.labels(entrypoint).inc()
+        logger.info(json.dumps({
+            "entrypoint": entrypoint,
+            "total_ms": round(elapsed * 1000, 1),
+            "spans": [{"stage": stage, "ms": ms} for stage, ms in trace.spans],
+            "error": failed,
+        }))
+        _current.reset(token)
+
+
+def traced(entrypoint):
+    """Decorator running each call of a handler as one traced request."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with request(entrypoint):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def span(stage):
+    """Time a stage of the current request (or of background work, outside one)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        trace = _current.get()
+        if trace is not None:
+            trace.spans.append((stage, round(elapsed * 1000, 1)))
+
+
+def metrics():
+    """Prometheus exposition of all metrics: (body, content type)."""
+    return generate_latest(), CONTENT_TYPE_LATEST
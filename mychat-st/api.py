@@ -0,0 +1,242 @@
+"""JSON and WebSocket API over the same query pipeline as the Gradio UI.
+
+The routes are mounted on the FastAPI app that serves the UI, so they share
+its Whisper workers, stage pools, snapshots and caches:
+
+- POST /api/v1/query          {"question": "...", "session_id": "...", "profile": false}
+- POST /api/v1/query/audio    multipart form: audio file, optional session_id
+- WS   /api/v1/ws             send {"question": ...} or audio bytes; receives
+                              "transcript", "started" and "result" events
+- GET  /api/v1/status         the status panel's pipeline statistics
+- GET  /api/v1/files/{name}   charts and table downloads named in results
+- GET  /api/v1/profiles/{id}  top functions of a profiled request (see profiling.py)
+- POST /api/v1/views/refresh  {"view": "..."} or {} for all views; reloads cached
+                              view data (needs ADMIN_TOKEN, sent as a bearer token)
+- GET  /metrics               Prometheus metrics (see tracing.py)
+
+A session_id keeps follow-up questions ("only the Sewing ones") working
+between calls, like a browser session does in the UI.
+
+Questions turned away by admission control (admission.py) get 429 when the
+session or client is over its rate limit and 503 when the pipeline is
+saturated or the LLM circuit breaker is open, both with a Retry-After header.
+"""
+import hmac
+import json
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+from pydantic import BaseModel
+
+import admission
+import profiling
+import tracing
+
+# Rows of a table answer included inline; the full table is a download
+API_MAX_ROWS = int(os.getenv("API_MAX_ROWS", 1000))
+# Bearer token for the admin routes; they are disabled without one
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+class Query(BaseModel):
+    question: str
+    session_id: str = None
+    profile: bool = False
+
+
+class ViewRefresh(BaseModel):
+    view: str = None
+
+
+def to_json(question, response, started):
+    """JSON body for a pipeline response dict."""
+    body = {
+        "question": question,
+        "type": response.get("type", "text"),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        "request_id": response.get("request_id"),
+        "profiled": response.get("profiled", False),
+    }
+    if body["type"] == "image":
+        body["chart_url"] = f"/api/v1/files/{os.path.basename(response['path'])}"
+        body["text"] = response.get("diagnostic", "").strip()
+    else:
+        body["text"] = response.get("content", "")
+    data = response.get("data")
+    if data is not None:
+        table = json.loads(data.head(API_MAX_ROWS).to_json(orient="split", index=False, date_format="iso"))
+        body["table"] = {"columns": table["columns"], "rows": table["data"], "total_rows": len(data)}
+    if response.get("downloads"):
+        body["downloads"] = [f"/api/v1/files/{os.path.basename(p)}" for p in response["downloads"]]
+    return body
+
+
+def busy_error(busy):
+    """HTTP error for a question turned away by admission control."""
+    return HTTPException(
+        status_code=429 if busy.reason == "rate_limited" else 503,
+        detail=busy.message,
+        headers={"Retry-After": str(busy.retry_after)},
+    )
+
+
+def _retry_after(error):
+    """{"retry_after": seconds} for a busy error, for WebSocket error events."""
+    seconds = (error.headers or {}).get("Retry-After")
+    return {"retry_after": int(seconds)} if seconds else {}
+
+
+def _save_upload(data, filename):
+    suffix = os.path.splitext(filename or "")[1] or ".wav"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        f.write(data)
+        return f.name
+
+
+def check_admin(request):
+    """Raise unless the request carries the admin bearer token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Set ADMIN_TOKEN to enable admin routes")
+    sent = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(sent.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+
+def create_api(answer, transcribe, status, file_dirs, admit=lambda session_id, client: None, refresh=None):
+    """FastAPI app for the pipeline.
+
+    answer(question, session_id, profile, client) returns a response dict as used
+    by the UI or raises admission.Busy, transcribe(audio_path) returns text, status() the pipeline statistics,
+    and file_dirs are the directories result files may be served from. admit(session_id, client)
+    raises admission.Busy when the caller is over its rate limit; it runs before any
+    transcription, so rejected callers never reach the ASR stage. refresh(view) reloads
+    one view's data (all with None), returns the names refreshed and raises KeyError
+    for an unknown view.
+    """
+    api = FastAPI(title="KingslakeBlue Assistant API")
+
+    def check_admission(session_id, client):
+        try:
+            admit(session_id, client)
+        except admission.Busy as busy:
+            raise busy_error(busy)
+
+    def transcribe_bytes(data, filename=None):
+        path = _save_upload(data, filename)
+        try:
+            return transcribe(path)
+        except admission.Busy as busy:
+            raise busy_error(busy)
+        finally:
+            os.remove(path)
+
+    def run(question, session_id, profile=False, client=None, admitted=False):
+        if not question or not question.strip():
+            raise HTTPException(status_code=400, detail="Empty question")
+        if not admitted:
+            check_admission(session_id, client)
+        started = time.perf_counter()
+        try:
+            response = answer(question.strip(), session_id, profile, client)
+        except admission.Busy as busy:
+            raise busy_error(busy)
+        return to_json(question, response, started)
+
+    @api.post("/api/v1/query")
+    def query(body: Query, request: Request):
+        return run(body.question, body.session_id, body.profile, request.client.host if request.client else None)
+
+    @api.post("/api/v1/query/audio")
+    def query_audio(request: Request, audio: UploadFile = File(...), session_id: str = Form(None),
+                    profile: bool = Form(False)):
+        client = request.client.host if request.client else None
+        check_admission(session_id, client)
+        question = transcribe_bytes(audio.file.read(), audio.filename)
+        body = run(question, session_id, profile, client, admitted=True)
+        body["transcript"] = question
+        return body
+
+    @api.get("/api/v1/status")
+    def pipeline_status():
+        return json.loads(json.dumps(status(), default=str))
+
+    @api.get("/api/v1/files/{name}")
+    def result_file(name: str):
+        if name != os.path.basename(name):
+            raise HTTPException(status_code=404)
+        for directory in file_dirs:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                return FileResponse(path)
+        raise HTTPException(status_code=404)
+
+    @api.get("/api/v1/profiles/{request_id}")
+    def profile_summary(request_id: str):
+        text = profiling.summary(request_id)
+        if text is None:
+            raise HTTPException(status_code=404)
+        return Response(content=text, media_type="text/plain")
+
+    @api.post("/api/v1/views/refresh")
+    def refresh_views(request: Request, body: ViewRefresh = None):
+        check_admin(request)
+        if refresh is None:
+            raise HTTPException(status_code=404)
+        view = body.view if body else None
+        try:
+            return {"refreshed": refresh(view)}
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Unknown view: {view}")
+
+    @api.get("/metrics")
+    def metrics():
+        body, content_type = tracing.metrics()
+        return Response(content=body, media_type=content_type)
+
+    @api.websocket("/api/v1/ws")
+    async def stream(websocket: WebSocket):
+        await websocket.accept()
+        client = websocket.client.host if websocket.client else None
+        try:
+            while True:
+                message = await websocket.receive()
+                if message.get("type") == "websocket.disconnect":
+                    break
+                session_id = websocket.query_params.get("session_id")
+                profile = websocket.query_params.get("profile") == "1"
+                admitted = False
+                if message.get("bytes") is not None:
+                    try:
+                        check_admission(session_id, client)
+                        admitted = True
+                        question = await run_in_threadpool(transcribe_bytes, message["bytes"])
+                    except HTTPException as e:
+                        await websocket.send_json({"event": "error", "detail": e.detail, **_retry_after(e)})
+                        continue
+                    await websocket.send_json({"event": "transcript", "text": question})
+                else:
+                    try:
+                        payload = json.loads(message.get("text") or "{}")
+                    except json.JSONDecodeError:
+                        payload = None
+                    if not isinstance(payload, dict):
+                        # A bad frame fails on its own; the connection stays open
+                        await websocket.send_json({"event": "error", "detail": 'Expected a JSON object like {"question": "..."}'})
+                        continue
+                    question = payload.get("question", "")
+                    session_id = payload.get("session_id", session_id)
+                    profile = bool(payload.get("profile"))
+                await websocket.send_json({"event": "started", "question": question})
+                try:
+                    body = await run_in_threadpool(run, question, session_id, profile, client, admitted)
+                    await websocket.send_json({"event": "result", **body})
+                except HTTPException as e:
+                    await websocket.send_json({"event": "error", "detail": e.detail, **_retry_after(e)})
+        except WebSocketDisconnect:
+            pass
+
+    return api
@@ -1,23 +1,93 @@
 import gradio as gr
 import pandas as pd
-from pandasai import SmartDataframe
+from pandasai import SmartDataframe, SmartDatalake
 # from langchain_groq.chat_models import ChatGroq  # Commented out Groq
 from langchain_openai import ChatOpenAI  # Added OpenAI
+from langchain_core.callbacks import BaseCallbackHandler
 import os
-from transformers import pipeline
 import mysql.connector
 from dotenv import load_dotenv
 import time
+import threading
 import mimetypes
+import logging
 import uuid
+import admission
+import chat_history
+import entities
+import followups
+import intents
+from planner import Planner
+import result_pages
+from code_cache import CodeCache, CodeExecutionError, capture_code, execute_code, run_code
+import profiling
+import sandbox
+import stages
+import tracing
+import warmup
+from views import ViewRegistry
+from shared_snapshot import SHARED_SNAPSHOT_DIR, SharedSnapshots
+from session_store import SessionState, SessionStore
+from single_flight import SingleFlight
 
 # Load environment variables
 load_dotenv()
+tracing.configure_logging()
+logger = logging.getLogger(__name__)
+
+class LLMCallOutcomes(BaseCallbackHandler):
+    """Feeds the LLM circuit breaker with the outcome of each client call.
+
+    PandasAI turns every failure into a polite reply, so its response can't
+    tell a backend outage from a question it couldn't answer. Only errors
+    and latency of the LLM client itself count towards opening the breaker.
+    """
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+        self._started = {}
+        self._local = threading.local()
+
+    def reset(self):
+        """Start counting the calls made on this thread."""
+        self._local.calls = 0
+
+    def calls(self):
+        return getattr(self._local, "calls", 0)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, ok=True)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, ok=False)
+
+    def _finish(self, run_id, ok):
+        started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        self.breaker.record(time.perf_counter() - started, ok=ok)
+        self._local.calls = self.calls() + 1
+
+# Per-user rate limits and the LLM circuit breaker, see admission.py
+rate_limiter = admission.RateLimiter()
+llm_breaker = admission.CircuitBreaker("llm")
+llm_outcomes = LLMCallOutcomes(llm_breaker)
 
 # Initialize components
 # llm = ChatGroq(model_name="llama3-70b-8192", api_key=os.environ["GROQ_API_KEY"])  # Commented out Groq
-llm = ChatOpenAI(model_name="gpt-3.5-turbo", api_key=os.environ["OPENAI_API_KEY"])  # Use OpenAI
-speech_pipe = pipeline("automatic-speech-recognition", "openai/whisper-base")
+llm = ChatOpenAI(
+    model_name="gpt-3.5-turbo", api_key=os.environ["OPENAI_API_KEY"], callbacks=[llm_outcomes]
+)  # Use OpenAI
+# Whisper runs in the ASR stage's worker processes, see stages.py
+QUERY_CONCURRENCY = int(os.getenv("QUERY_CONCURRENCY", stages.LLM_WORKERS))
+QUEUE_MAX_SIZE = int(os.getenv("QUEUE_MAX_SIZE", 100))
+# Mount the JSON/WebSocket API (api.py) next to the UI
+API_ENABLED = os.getenv("API_ENABLED", "1") == "1"
+# Port for /metrics when the API (which also serves it) is disabled
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
 
 def is_image_file(filepath):
     if not isinstance(filepath, str):
@@ -25,131 +95,494 @@ def is_image_file(filepath):
     mime, _ = mimetypes.guess_type(filepath)
     return mime is not None and mime.startswith("image/")
 
-def process_query(message, history):
-    """Process user query and return response (text or image)"""
-    if isinstance(message, dict):  # Audio input
-        audio_path = message["mic"]
-        message = speech_pipe(audio_path)["text"]
-    
-    mydb = mysql.connector.connect(
+def get_db_connection():
+    """Open a connection to the MariaDB database"""
+    return mysql.connector.connect(
         host=os.environ["DB_HOST"],
         user=os.environ["DB_USER"],
         password=os.environ["DB_PASSWORD"],
         database=os.environ["DB_NAME"],
     )
-    
+
+def read_view(query, params=None):
+    """Read a view (or a query's result) into a DataFrame (runs on the DB stage)"""
+    mydb = get_db_connection()
     try:
-        df = pd.read_sql("SELECT * FROM employee_skill_view", mydb)
-        # Configure PandasAI with better settings to avoid concatenation errors
-        config = {
-            "llm": llm,
-            "verbose": False,
-            "enforce_privacy": False,
-            "max_retries": 3,
-            "enable_logging": False
-        }
-        smart_df = SmartDataframe(df, config=config)
-
-        # Generate a unique filename for the chart
-        chart_dir = os.path.join(os.getcwd(), "exports", "charts")
-        os.makedirs(chart_dir, exist_ok=True)
-        unique_chart_path = os.path.join(chart_dir, f"chart_{uuid.uuid4().hex}.png")
-        os.environ["PANDASAI_CHART_PATH"] = unique_chart_path  # PandasAI uses this if set
-
-        # First, let's check the data quality
-        total_employees = len(df)
-        employees_with_skill_rate = len(df.dropna(subset=['skill_rate']))
-        null_skill_rates = df['skill_rate'].isnull().sum()
-
-        response = smart_df.chat(message)
-
-        # Handle chart/image file responses
+        return pd.read_sql(query, mydb, params=params or None)
+    finally:
+        mydb.close()
+
+def read_query(query, params=()):
+    with tracing.span("db"):
+        return stages.DB.run(read_view, query, params)
+
+# Views are loaded per their policy, only when a question needs them;
+# summary statistics are computed once per load
+FAST_PATH_VIEW = "employee_skill_view"
+# With SHARED_SNAPSHOT_DIR set, worker processes share one published copy
+shared_snapshots = SharedSnapshots(SHARED_SNAPSHOT_DIR) if SHARED_SNAPSHOT_DIR else None
+
+def load_view(spec):
+    return read_query(spec.query)
+
+view_registry = ViewRegistry(load_view, shared=shared_snapshots)
+
+def format_data_summary(stats):
+    """Format the precomputed snapshot statistics for the chat"""
+    if "rows_with_skill_rate" not in stats:
+        return f"\n\n📊 **Data Summary:**\n- Total rows: {stats['total_rows']}"
+    return (
+        f"\n\n📊 **Data Summary:**\n- Total employees: {stats['total_rows']}"
+        f"\n- Employees with skill rates: {stats['rows_with_skill_rate']}"
+        f"\n- Employees with NULL skill rates: {stats['null_skill_rates']}"
+    )
+
+fast_path = intents.FastPathRouter()
+# Recognized questions on large views that aren't in memory run as SQL, see planner.py
+planner = Planner(view_registry, fast_path, read_query)
+# Generated code runs in sandboxed worker processes (SANDBOX_WORKERS=0: in-process), see sandbox.py
+code_sandbox = sandbox.SandboxPool() if sandbox.SANDBOX_WORKERS else None
+execute_generated = code_sandbox.execute if code_sandbox else execute_code
+generated_code = CodeCache(execute=execute_generated)
+# History, charts and the last table answer per session, see session_store.py
+sessions = SessionStore()
+ui_payload = chat_history.PayloadStats()
+page_reader = result_pages.PageReader()
+# Identical questions in flight at once run the pipeline once, see single_flight.py
+in_flight = SingleFlight("query")
+# PandasAI returns (rather than raises) this when every retry failed
+PANDASAI_FAILURE = "Unfortunately, I was not able to"
+
+def new_chart_path():
+    """Unique PNG path under exports/charts"""
+    chart_dir = os.path.join(os.getcwd(), "exports", "charts")
+    os.makedirs(chart_dir, exist_ok=True)
+    return os.path.join(chart_dir, f"chart_{uuid.uuid4().hex}.png")
+
+# Table downloads expire with the sessions that link to them
+table_exports = result_pages.ExportDirectory(os.path.join(os.getcwd(), "exports", "tables"), ttl=sessions.ttl)
+
+def new_table_path():
+    """Unique path (without extension) for table downloads under exports/tables"""
+    return table_exports.new_path()
+
+def draw_chart(result, message):
+    """Render a fast-path or follow-up result as a chart"""
+    with tracing.span("chart"):
+        return intents.render_chart(result, message, new_chart_path())
+
+@tracing.span("render")
+def format_response(response):
+    """Convert a PandasAI or fast-path result into a chat response"""
+    if isinstance(response, pd.DataFrame):
+        if response.empty:
+            return {"type": "text", "content": "No data found matching your query."}
+        if result_pages.is_large(response):
+            # Never render a large table as markdown: preview it, page it, offer downloads
+            downloads = result_pages.export(response, new_table_path())
+            return {
+                "type": "text",
+                "content": result_pages.preview_markdown(response),
+                "downloads": downloads,
+                "table": downloads[-1],
+                "data": response,
+            }
+        return {"type": "text", "content": response.to_markdown(), "data": response}
+    elif isinstance(response, pd.Series):
+        return {"type": "text", "content": response.to_string(), "data": response.reset_index()}
+    elif isinstance(response, str):
+        return {"type": "text", "content": response}
+    else:
+        return {"type": "text", "content": str(response)}
+
+def remember_result(session, result):
+    """Keep a table answer in the session for follow-up questions"""
+    session.last_result = followups.result_to_keep(result, session.last_result)
+
+@tracing.span("fast_path")
+def answer_from_template(intent, snapshot, message):
+    """Answer a recognized question shape from the snapshot without the LLM"""
+    result = intents.execute(intent, snapshot.df)
+    if intent.chart and not result.empty:
+        path = draw_chart(result, message)
+        return {"type": "image", "path": path, "diagnostic": format_data_summary(snapshot.stats)}, result
+    return format_response(result), result
+
+@tracing.span("pushdown")
+def answer_pushdown(plan, message):
+    """Answer a recognized question with SQL in MariaDB, reading only its result"""
+    result = read_query(plan.sql, plan.params)
+    if plan.intent.chart and not result.empty:
+        return {"type": "image", "path": draw_chart(result, message)}, result
+    return format_response(result), result
+
+@tracing.span("followup")
+def answer_followup(followup, message, session):
+    """Refine the session's previous result locally, without the DB or LLM"""
+    result = followups.apply(followup, session.last_result)
+    remember_result(session, result)
+    if followup.args.get("chart") and not result.empty:
+        path = draw_chart(result, message)
+        return {"type": "image", "path": path}
+    return format_response(result)
+
+def pipeline_status():
+    """Stage queue depths and fast-path coverage for the status panel"""
+    return {
+        "stages": stages.stage_stats(),
+        "fast_path": fast_path.coverage(),
+        "planner": planner.stats(),
+        "code_cache": generated_code.stats(),
+        "sandbox": code_sandbox.stats() if code_sandbox else None,
+        "views": view_registry.stats(),
+        "shared_snapshots": shared_snapshots.stats() if shared_snapshots else None,
+        "ui_payload": ui_payload.stats(),
+        "profiles": profiling.recent(),
+        "coalesced": in_flight.stats(),
+        "llm_circuit": llm_breaker.stats(),
+        "warmup": warmer.stats() if warmer else None,
+        "entities": entity_corrector.stats() if entity_corrector else None,
+        "rate_limits": rate_limiter.stats(),
+    }
+
+def latest_profile_summary():
+    """Top functions of the most recent request profile"""
+    recent = profiling.recent()
+    if not recent:
+        return "No profiles yet. Tick 'Profile my questions' or set PROFILE_SAMPLE_RATE."
+    return f"Request {recent[0]['request_id']}\n\n" + (profiling.summary(recent[0]["request_id"]) or "")
+
+def chat_counting_calls(smart_df, message):
+    """smart_df.chat and the number of LLM client calls it made (runs on the LLM stage)"""
+    llm_outcomes.reset()
+    try:
+        return smart_df.chat(message), llm_outcomes.calls()
+    except Exception as e:
+        e.llm_calls = llm_outcomes.calls()
+        raise
+
+def ask_llm(smart_df, message):
+    """smart_df.chat on the LLM stage, through the circuit breaker
+
+    The breaker hears about each LLM client call from llm_outcomes; a chat
+    that made none (a full queue, PandasAI's own cache) gives its trial back.
+    """
+    llm_breaker.check()
+    try:
+        with tracing.span("llm"):
+            response, calls = stages.LLM.run(chat_counting_calls, smart_df, message)
+    except Exception as e:
+        if not getattr(e, "llm_calls", 0):
+            llm_breaker.cancel()
+        raise
+    if not calls:
+        llm_breaker.cancel()
+    return response
+
+def new_smart_df(dfs, chart_path):
+    """A PandasAI SmartDataframe (or SmartDatalake) that saves its charts next to chart_path"""
+    # Configure PandasAI with better settings to avoid concatenation errors
+    config = {
+        "llm": llm,
+        "verbose": False,
+        "enforce_privacy": False,
+        "max_retries": 3,
+        "enable_logging": False,
+        # Charts are saved as <prompt id>.png here instead of a shared temp file
+        "save_charts": True,
+        "save_charts_path": os.path.dirname(chart_path),
+    }
+    if len(dfs) == 1:
+        smart_df = SmartDataframe(dfs[0], config=config)
+    else:
+        smart_df = SmartDatalake(dfs, config=config)
+    if code_sandbox:
+        # The sandbox points the generated code's savefig at chart_path itself
+        sandbox.route_pandasai(smart_df, code_sandbox, dfs, chart_path)
+    return smart_df
+
+def usable_answer(response):
+    """Whether a PandasAI response is a real answer, so its code is worth reusing"""
+    if response is None or (isinstance(response, str) and response.startswith(PANDASAI_FAILURE)):
+        return False
+    return not is_image_file(response) or os.path.exists(response)
+
+def answer_question(message):
+    """Answer a question from the views, without session state.
+
+    Returns (response, result), the result being what a session keeps for
+    follow-up questions. While the LLM circuit breaker is open, questions the
+    fast path and generated code can't answer raise admission.Busy.
+    """
+    # Load only the views this question needs
+    view_names = view_registry.views_for(message)
+    # ...or none, when the view is large and the question has a SQL template
+    if view_names == [FAST_PATH_VIEW]:
+        plan = planner.plan(message, FAST_PATH_VIEW)
+        if plan is not None:
+            return answer_pushdown(plan, message)
+    snapshots = [view_registry.get(name) for name in view_names]
+    snapshot = snapshots[0]
+    dfs = [s.df for s in snapshots]
+
+    # Common question shapes are answered without the LLM
+    if view_names == [FAST_PATH_VIEW]:
+        intent = fast_path.route(message, snapshot)
+        if intent is not None:
+            return answer_from_template(intent, snapshot, message)
+
+    # Repeated questions re-run the code PandasAI generated last time
+    with tracing.span("code_exec"):
+        response = generated_code.run(message, dfs, new_chart_path())
+    if response is not None:
         if is_image_file(response):
-            if os.path.exists(response):
-                diagnostic_info = f"\n\n📊 **Data Summary:**\n- Total employees: {total_employees}\n- Employees with skill rates: {employees_with_skill_rate}\n- Employees with NULL skill rates: {null_skill_rates}"
-                return {"type": "image", "path": response, "diagnostic": diagnostic_info}
-            else:
-                # Try again with a new filename
-                unique_chart_path = os.path.join(chart_dir, f"chart_{uuid.uuid4().hex}.png")
-                os.environ["PANDASAI_CHART_PATH"] = unique_chart_path
-                response = smart_df.chat(message)
-                if os.path.exists(response):
-                    diagnostic_info = f"\n\n📊 **Data Summary:**\n- Total employees: {total_employees}\n- Employees with skill rates: {employees_with_skill_rate}\n- Employees with NULL skill rates: {null_skill_rates}"
-                    return {"type": "image", "path": response, "diagnostic": diagnostic_info}
-                else:
-                    return {"type": "text", "content": "Chart could not be generated. Please try again."}
-        # Handle different response types
-        if isinstance(response, pd.DataFrame):
-            if response.empty:
-                return {"type": "text", "content": "No data found matching your query."}
-            return {"type": "text", "content": response.to_markdown()}
-        elif isinstance(response, pd.Series):
-            return {"type": "text", "content": response.to_string()}
-        elif isinstance(response, str):
-            return {"type": "text", "content": response}
+            return {"type": "image", "path": response, "diagnostic": format_data_summary(snapshot.stats)}, None
+        return format_response(response), response
+
+    # Every call gets its own chart path; several chats run at once, so
+    # nothing process-wide (like an environment variable) may carry it
+    chart_path = new_chart_path()
+    smart_df = new_smart_df(dfs, chart_path)
+
+    response = ask_llm(smart_df, message)
+    code = capture_code(smart_df)
+    if usable_answer(response):
+        generated_code.put(message, code)
+
+    # Handle chart/image file responses
+    if is_image_file(response):
+        if os.path.exists(response):
+            diagnostic_info = format_data_summary(snapshot.stats)
+            return {"type": "image", "path": response, "diagnostic": diagnostic_info}, None
         else:
-            return {"type": "text", "content": str(response)}
+            # Re-run the generated code against a new filename before asking the LLM again
+            chart_path = new_chart_path()
+            try:
+                with tracing.span("code_exec"):
+                    response = run_code(code, dfs, chart_path, execute_generated) if code else None
+            except CodeExecutionError:
+                response = None
+            if is_image_file(response) and os.path.exists(response):
+                generated_code.put(message, code)
+            else:
+                chart_path = new_chart_path()
+                smart_df = new_smart_df(dfs, chart_path)
+                response = ask_llm(smart_df, message)
+                if usable_answer(response):
+                    generated_code.put(message, capture_code(smart_df))
+            if is_image_file(response) and os.path.exists(response):
+                diagnostic_info = format_data_summary(snapshot.stats)
+                return {"type": "image", "path": response, "diagnostic": diagnostic_info}, None
+            else:
+                return {"type": "text", "content": "Chart could not be generated. Please try again."}, None
+    # Handle different response types
+    return format_response(response), response
+
+def needs_llm(message):
+    """Whether answering message now would call the LLM (for warmup's budget)"""
+    if view_registry.views_for(message) == [FAST_PATH_VIEW]:
+        snapshot = view_registry.loaded(FAST_PATH_VIEW)
+        if snapshot is not None:
+            if intents.match(message, fast_path.vocabulary(snapshot)) is not None:
+                return False
+        elif planner.pushdown(FAST_PATH_VIEW):
+            # Answered in MariaDB, as answer_question would
+            if planner.match(message, FAST_PATH_VIEW) is not None:
+                return False
+    return message not in generated_code
+
+@tracing.traced("warmup")
+def warm_question(message):
+    in_flight.do(intents.normalize(message), answer_question, message)
+
+# Frequent questions are logged and re-asked in the background at startup and
+# after every view reload, see warmup.py. Both are set up when serving only,
+# so importing this module (batch runs, benchmarks) leaves no log file behind
+question_log = None
+warmer = None
+
+# Employee and skill names misheard by Whisper are fixed before the question
+# goes any further, see entities.py
+entity_corrector = entities.EntityCorrector() if entities.ENTITY_CORRECTION else None
+
+def correct_names(text):
+    """text with names close to the view's employee and skill names replaced by them"""
+    if entity_corrector is None or not text:
+        return text
+    try:
+        snapshot = view_registry.loaded(FAST_PATH_VIEW)
+        if snapshot is None and planner.pushdown(FAST_PATH_VIEW):
+            # Large view answered in MariaDB: use the names the planner reads
+            names, loaded_at = planner.names(FAST_PATH_VIEW)
+            return entity_corrector.correct(text, ("database", loaded_at), names)
+        if snapshot is None:
+            snapshot = view_registry.get(FAST_PATH_VIEW)
+        return entity_corrector.correct(text, ("snapshot", snapshot.version), snapshot.df)
+    except admission.Busy:
+        raise
+    except Exception as e:
+        # The transcript as heard is still worth answering
+        logger.warning("Transcript not corrected: %s", e)
+        return text
+
+def transcribe(audio_path):
+    """Speech to text on the ASR stage, with names corrected"""
+    return correct_names(stages.transcribe(audio_path))
 
+def process_query(message, session=None):
+    """Process user query and return response (text or image)"""
+    if session is None:
+        session = SessionState()
+    if isinstance(message, dict):  # Audio input
+        audio_path = message["mic"]
+        message = transcribe(audio_path)
+    
+    try:
+        # Refinements of the previous answer ("only the Sewing ones") reuse it directly
+        previous = session.last_result
+        followup = followups.match(message, previous) if previous is not None else None
+        if followup is not None:
+            return answer_followup(followup, message, session)
+
+        if question_log:
+            question_log.record(intents.normalize(message), message)
+        # Identical questions asked at the same time share one answer
+        (response, result), _ = in_flight.do(intents.normalize(message), answer_question, message)
+        remember_result(session, result)
+        # Callers add their own keys (request IDs) to the response
+        return dict(response)
+
+    except admission.Busy:
+        # Turned away, not failed: each front end answers with "try again later"
+        raise
     except Exception as pandasai_error:
         error_msg = str(pandasai_error)
         if "concatenate" in error_msg.lower() or "series" in error_msg.lower():
             return {"type": "text", "content": f"I understand you're asking about employee skills. Let me help you with that. Could you please rephrase your question to be more specific? For example:\n\n- 'Show me all employees with Python skills'\n- 'List employees by department'\n- 'Count employees by skill level'\n\nError details: {error_msg}"}
         else:
             return {"type": "text", "content": f"Error processing your query: {error_msg}"}
-    finally:
-        mydb.close()
 
-def handle_submit(audio, text, history, chart_paths):
-    query = text.strip()
-    if audio is not None:
-        query = speech_pipe(audio)["text"]
-    if not query:
-        return "", history, history, chart_paths, chart_paths
-    response = process_query(query, history)
-    new_chart_paths = list(chart_paths) if chart_paths else []
+def show_result_page(session, number):
+    """Updates for the result table, its page number and page label"""
+    if not session.result_path or not os.path.exists(session.result_path):
+        return None, 1, ""
+    table_exports.touch(session.result_path)
+    rows, number, pages = page_reader.page(session.result_path, number)
+    return rows, number, f"Page {number} of {pages}"
+
+def goto_result_page(number, request: gr.Request = None):
+    session = sessions.load(request.session_hash if request else None)
+    return show_result_page(session, number or 1)
+
+def previous_result_page(number, request: gr.Request = None):
+    return goto_result_page((number or 1) - 1, request)
+
+def next_result_page(number, request: gr.Request = None):
+    return goto_result_page((number or 1) + 1, request)
+
+@tracing.traced("ui")
+def handle_submit(audio, text, profile=False, request: gr.Request = None):
+    # Conversation state lives in the session store, so any replica can serve this turn
+    session_id = request.session_hash if request else None
+    with tracing.span("session"):
+        session = sessions.load(session_id)
+    history = session.history
+    # The result table keeps showing the last large table unless a new one arrives
+    result_page = (gr.update(), gr.update(), gr.update())
+    with profiling.profile(tracing.current().request_id, profiling.should_profile(profile)):
+        query = text.strip()
+        if audio is None and not query:
+            return ("", history, session.chart_paths) + result_page
+        try:
+            rate_limiter.check(session_id)
+            if audio is not None:
+                query = transcribe(audio)
+            if not query:
+                return ("", history, session.chart_paths) + result_page
+            response = process_query(query, session)
+        except admission.Busy as busy:
+            response = {"type": "text", "content": busy.message}
     if isinstance(response, dict) and response.get("type") == "image":
         diagnostic = response.get("diagnostic", "")
+        sessions.save_file(response["path"])
         # Insert latest chart at the beginning (latest on top)
-        new_chart_paths = [response["path"]] + [p for p in new_chart_paths if p != response["path"]]
+        session.chart_paths = [response["path"]] + [p for p in session.chart_paths if p != response["path"]]
+        session.chart_paths = session.chart_paths[:chat_history.HISTORY_MAX_CHARTS]
         if diagnostic:
             history.append((query, (None, response["path"])))
             history.append(("", diagnostic))
         else:
             history.append((query, (None, response["path"])))
-        return "", history, history, new_chart_paths, new_chart_paths
     elif isinstance(response, dict) and response.get("type") == "text":
         history.append((query, response["content"]))
-        return "", history, history, new_chart_paths, new_chart_paths
+        for path in response.get("downloads", []):
+            sessions.save_file(path)
+            history.append(("", (path,)))
+        if response.get("table"):
+            session.result_path = response["table"]
+            result_page = show_result_page(session, 1)
     else:
         history.append((query, str(response)))
-        return "", history, history, new_chart_paths, new_chart_paths
+    # Keep the last turns in full and collapse older ones, so the payload
+    # sent back every turn stays bounded
+    session.history, session.collapsed = chat_history.compact(history, session.collapsed)
+    with tracing.span("session"):
+        sessions.save(session_id, session)
+    ui_payload.record(chat_history.payload_bytes(session.history, session.chart_paths))
+    return ("", session.history, session.chart_paths) + result_page
+
+def admit_api(session_id=None, client=None):
+    """Take a rate-limit token for an API caller: its session, or without one its address
+
+    Raises admission.Busy when the caller is over its rate limit. The API
+    calls this before transcribing audio, so turned-away callers cost no ASR.
+    """
+    rate_limiter.check(f"api:{session_id}" if session_id else (f"client:{client}" if client else None))
+
+@tracing.traced("api")
+def answer_api(question, session_id=None, profile=False, client=None):
+    """Answer a question for the JSON API, keeping follow-up state per API session
+
+    The caller has been admitted (see admit_api). Raises admission.Busy when
+    the pipeline is saturated.
+    """
+    session_id = f"api:{session_id}" if session_id else None
+    session = sessions.load(session_id)
+    request_id = tracing.current().request_id
+    with profiling.profile(request_id, profiling.should_profile(profile)) as request_profile:
+        response = process_query(question, session)
+    if isinstance(response, dict) and response.get("type") == "image":
+        sessions.save_file(response["path"])
+    sessions.save(session_id, session)
+    response["request_id"] = request_id
+    response["profiled"] = request_profile is not None
+    return response
 
 def clear_chat(history):
     """Clear the chat history"""
     return []
 
+def clear_session(request: gr.Request = None):
+    """Clear the chat history, charts and the remembered last result"""
+    if request:
+        sessions.clear(request.session_hash)
+    return [], [], None, 1, ""
+
 def get_data_info():
     """Get information about the data to help with debugging"""
-    mydb = mysql.connector.connect(
-        host=os.environ["DB_HOST"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-        database=os.environ["DB_NAME"],
-    )
-    
     try:
-        df = pd.read_sql("SELECT * FROM employee_skill_view", mydb)
+        stats = view_registry.get(FAST_PATH_VIEW).stats
         
         info = f"""
 📊 **Database Information:**
-- Total employees: {len(df)}
-- Employees with skill rates: {len(df.dropna(subset=['skill_rate']))}
-- Employees with NULL skill rates: {df['skill_rate'].isnull().sum()}
-- Unique skill rates: {df['skill_rate'].nunique()}
-- Skill rate range: {df['skill_rate'].min()} to {df['skill_rate'].max()}
+- Total employees: {stats['total_rows']}
+- Employees with skill rates: {stats['rows_with_skill_rate']}
+- Employees with NULL skill rates: {stats['null_skill_rates']}
+- Unique skill rates: {stats['unique_skill_rates']}
+- Skill rate range: {stats['skill_rate_min']} to {stats['skill_rate_max']}
 
 🔍 **Sample skill rates:**
-{df['skill_rate'].value_counts().head(10).to_string()}
+{stats['skill_rate_counts']}
 
 💡 **Suggested queries:**
 - "Show all employees with their skill rates"
@@ -161,8 +594,6 @@ def get_data_info():
         
     except Exception as e:
         return f"Error getting data info: {str(e)}"
-    finally:
-        mydb.close()
 
 # Custom CSS for better styling
 custom_css = """
@@ -399,47 +830,133 @@ with gr.Blocks(css=custom_css, theme=gr.themes.Soft()) as demo:
             object_fit="contain"
         )
 
-    # State to maintain conversation history and chart paths
-    history_state = gr.State([])
-    chart_paths_state = gr.State([])
+    # Large table answers, one page at a time (the chat only shows a preview)
+    with gr.Accordion("📋 Result table", open=False):
+        result_table = gr.DataFrame(interactive=False, wrap=True)
+        with gr.Row():
+            prev_page_btn = gr.Button("◀ Previous", elem_classes="clear-btn")
+            page_number = gr.Number(value=1, precision=0, label="Page", minimum=1)
+            next_page_btn = gr.Button("Next ▶", elem_classes="clear-btn")
+        page_info = gr.Markdown()
+
+    # Per-stage queue depth and request profiles for operators
+    with gr.Accordion("⚙️ Pipeline status", open=False):
+        stage_status = gr.JSON(label="Stage queues and fast-path coverage")
+        profile_checkbox = gr.Checkbox(label="🔬 Profile my questions", value=False)
+        profile_summary = gr.Textbox(label="Latest profile (top functions by cumulative time)", lines=12)
+        refresh_status_btn = gr.Button("Refresh", elem_classes="clear-btn")
 
     # When audio is recorded, transcribe and insert into textbox
+    @tracing.traced("transcribe")
     def transcribe_audio(audio, text):
         if audio is not None:
-            transcribed = speech_pipe(audio)["text"]
-            return transcribed
+            try:
+                return transcribe(audio)
+            except admission.Busy as busy:
+                gr.Warning(busy.message)
         return text
 
     mic_input.change(
         transcribe_audio,
         inputs=[mic_input, text_input],
-        outputs=[text_input]
+        outputs=[text_input],
+        concurrency_limit=stages.ASR_WORKERS,
+        concurrency_id="asr"
     )
 
     # Modified handle_submit to update chart gallery
     submit_btn.click(
         handle_submit,
-        inputs=[mic_input, text_input, history_state, chart_paths_state],
-        outputs=[text_input, chat_output, history_state, chart_gallery, chart_paths_state]
+        inputs=[mic_input, text_input, profile_checkbox],
+        outputs=[text_input, chat_output, chart_gallery, result_table, page_number, page_info],
+        concurrency_limit=QUERY_CONCURRENCY,
+        concurrency_id="query"
     )
     
     text_input.submit(
         handle_submit,
-        inputs=[mic_input, text_input, history_state, chart_paths_state],
-        outputs=[text_input, chat_output, history_state, chart_gallery, chart_paths_state]
+        inputs=[mic_input, text_input, profile_checkbox],
+        outputs=[text_input, chat_output, chart_gallery, result_table, page_number, page_info],
+        concurrency_limit=QUERY_CONCURRENCY,
+        concurrency_id="query"
     )
     
     clear_btn.click(
-        lambda history, chart_paths: ([], []),
-        inputs=[history_state, chart_paths_state],
-        outputs=[history_state, chart_gallery, chart_paths_state]
+        clear_session,
+        inputs=[],
+        outputs=[chat_output, chart_gallery, result_table, page_number, page_info]
+    )
+
+    for trigger, handler in (
+        (prev_page_btn.click, previous_result_page),
+        (next_page_btn.click, next_result_page),
+        (page_number.submit, goto_result_page),
+    ):
+        trigger(
+            handler,
+            inputs=[page_number],
+            outputs=[result_table, page_number, page_info],
+            queue=False
+        )
+
+    refresh_status_btn.click(
+        pipeline_status,
+        inputs=[],
+        outputs=[stage_status],
+        queue=False
+    )
+    refresh_status_btn.click(
+        latest_profile_summary,
+        inputs=[],
+        outputs=[profile_summary],
+        queue=False
     )
 
 # Launch the app
 if __name__ == "__main__":
-    demo.launch(
-        server_name=os.getenv("GRADIO_SERVER_NAME", "0.0.0.0"),
-        server_port=int(os.getenv("GRADIO_SERVER_PORT", 7860)),
-        share=False,
-        show_error=True
-    ) 
\ No newline at end of file
+    if code_sandbox:
+        # Fork the sandbox workers before any stage starts its threads
+        sandbox.check_pandasai()
+        code_sandbox.start()
+    stages.start()
+    view_registry.load_eager()
+    if warmup.QUESTION_LOG:
+        question_log = warmup.QuestionLog()
+        warmer = warmup.Warmer(question_log, warm_question, needs_llm, stop_on=(admission.Busy,))
+        view_registry.on_load(lambda name, snapshot: warmer.trigger(f"{name} reloaded"))
+        warmer.trigger("startup")
+    demo.queue(
+        default_concurrency_limit=QUERY_CONCURRENCY,
+        max_size=QUEUE_MAX_SIZE
+    )
+    if API_ENABLED:
+        # Serve the JSON API and the UI from one server, sharing every pool and cache
+        import uvicorn
+        from api import create_api
+
+        exports = os.path.join(os.getcwd(), "exports")
+        api = create_api(
+            answer_api,
+            transcribe,
+            pipeline_status,
+            [os.path.join(exports, "charts"), os.path.join(exports, "tables")],
+            admit=admit_api,
+            refresh=view_registry.refresh,
+        )
+        api = gr.mount_gradio_app(api, demo, path="/")
+        uvicorn.run(
+            api,
+            host=os.getenv("GRADIO_SERVER_NAME", "0.0.0.0"),
+            port=int(os.getenv("GRADIO_SERVER_PORT", 7860))
+        )
+    else:
+        if METRICS_PORT:
+            # Without the API server, /metrics gets its own port
+            from prometheus_client import start_http_server
+            start_http_server(METRICS_PORT)
+        demo.launch(
+            server_name=os.getenv("GRADIO_SERVER_NAME", "0.0.0.0"),
+            server_port=int(os.getenv("GRADIO_SERVER_PORT", 7860)),
+            share=False,
+            show_error=True
+        ) 
\ No newline at end of file
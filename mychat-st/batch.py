@@ -0,0 +1,163 @@
+"""Run a file of questions through the assistant without the UI.
+
+Each line of the input file is a question, or the path of an audio file
+(.wav, .mp3, ...) relative to the input file. Audio is transcribed first,
+identical questions are answered once, and the rest run in parallel through
+the same pipeline as the chat, against one pinned snapshot of the views.
+
+    python batch.py weekly_questions.txt --out reports/2024-w12 --concurrency 4
+
+The output directory gets one file per answer (NNN.md, NNN.csv for tables,
+NNN.png for charts) and results.jsonl / results.csv with the question, the
+files written and the timings of every line.
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".webm")
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+
+
+def read_questions(path):
+    """(line number, text or audio path) for every non-empty, non-comment line."""
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.lower().endswith(AUDIO_EXTENSIONS):
+                entries.append({"line": number, "audio": os.path.join(base, line)})
+            else:
+                entries.append({"line": number, "question": line})
+    return entries
+
+
+def write_answer(response, out_dir, name):
+    """Write one answer's files; returns (type, list of file names)."""
+    files = []
+    if response.get("type") == "image":
+        chart = f"{name}.png"
+        shutil.copyfile(response["path"], os.path.join(out_dir, chart))
+        files.append(chart)
+        text = response.get("diagnostic", "").strip()
+    else:
+        text = response.get("content", "")
+    data = response.get("data")
+    if data is not None:
+        table = f"{name}.csv"
+        data.to_csv(os.path.join(out_dir, table), index=False)
+        files.append(table)
+    if text:
+        with open(os.path.join(out_dir, f"{name}.md"), "w", encoding="utf-8") as f:
+            f.write(text)
+        files.append(f"{name}.md")
+    return response.get("type", "text"), files
+
+
+def run_batch(entries, out_dir, concurrency=BATCH_CONCURRENCY):
+    # Imported here so `--help` doesn't load the models
+    import app
+    import profiling
+    import stages
+    import tracing
+    from intents import normalize
+    from session_store import SessionState
+
+    os.makedirs(out_dir, exist_ok=True)
+    if app.code_sandbox:
+        # Fork the sandbox workers before any stage starts its threads
+        app.code_sandbox.start()
+    stages.start()
+
+    # Speech first; the ASR stage's worker processes bound the parallelism
+    def transcribe(entry):
+        started = time.perf_counter()
+        try:
+            entry["question"] = app.transcribe(entry["audio"])
+        except Exception as e:
+            entry["question"] = ""
+            entry["error"] = f"Transcription failed: {e}"
+        entry["transcribe_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    audio = [entry for entry in entries if "audio" in entry]
+    if audio:
+        with ThreadPoolExecutor(max_workers=stages.ASR_WORKERS, thread_name_prefix="batch-asr") as pool:
+            list(pool.map(transcribe, audio))
+
+    # One answer per distinct question, from the first line that asks it
+    first = {}
+    for entry in entries:
+        if entry.get("question") and "error" not in entry:
+            first.setdefault(normalize(entry["question"]), entry)
+    print(f"{len(entries)} lines, {len(first)} distinct questions")
+
+    app.view_registry.pin()
+
+    def answer(question):
+        started = time.perf_counter()
+        try:
+            with tracing.request("batch") as trace, \
+                    profiling.profile(trace.request_id, profiling.should_profile()):
+                response = app.process_query(question, SessionState())
+        except Exception as e:
+            response = {"type": "text", "content": f"Error processing your query: {e}"}
+        return response, round((time.perf_counter() - started) * 1000, 1)
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+            futures = {key: pool.submit(answer, entry["question"]) for key, entry in first.items()}
+            answers = {key: future.result() for key, future in futures.items()}
+    finally:
+        app.view_registry.unpin()
+
+    results = []
+    for index, entry in enumerate(entries, 1):
+        name = f"{index:03d}"
+        row = {
+            "line": entry["line"],
+            "audio": entry.get("audio"),
+            "question": entry.get("question", ""),
+            "transcribe_ms": entry.get("transcribe_ms"),
+        }
+        key = normalize(row["question"]) if row["question"] else None
+        if key in answers:
+            response, elapsed_ms = answers[key]
+            row["type"], row["files"] = write_answer(response, out_dir, name)
+            row["answer_ms"] = elapsed_ms
+            # Repeats reuse the first line's answer and report its timing
+            row["deduplicated"] = first[key] is not entry
+        else:
+            row.update({"type": "error", "files": [], "error": entry.get("error", "Empty question")})
+        results.append(row)
+
+    with open(os.path.join(out_dir, "results.jsonl"), "w", encoding="utf-8") as f:
+        for row in results:
+            f.write(json.dumps(row) + "\n")
+    with open(os.path.join(out_dir, "results.csv"), "w", newline="", encoding="utf-8") as f:
+        columns = ["line", "question", "audio", "type", "files", "transcribe_ms", "answer_ms", "deduplicated", "error"]
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        for row in results:
+            writer.writerow({**row, "files": " ".join(row["files"])})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a file of questions (text or audio paths, one per line)")
+    parser.add_argument("questions", help="file with one question or audio file path per line")
+    parser.add_argument("--out", default=os.path.join("exports", "batch", time.strftime("%Y%m%d-%H%M%S")),
+                        help="output directory")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="questions answered at once")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = run_batch(read_questions(args.questions), args.out, args.concurrency)
+    errors = sum(1 for row in results if row["type"] == "error")
+    print(f"Answered {len(results) - errors} of {len(results)} lines in {time.perf_counter() - started:.1f}s; results in {args.out}")
@@ -0,0 +1,107 @@
+"""Bounded conversation history for the chat UI.
+
+Every turn sends the whole history back to the browser, so it is kept to a
+window: the last HISTORY_MAX_TURNS turns are shown, older ones collapse into
+a single note listing their questions, and long messages (markdown tables)
+outside the last HISTORY_FULL_TURNS turns are cut down to a preview. Large
+tables come with CSV and Parquet downloads in the history (see
+result_pages.py), so nothing is lost.
+"""
+import json
+import os
+import threading
+
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", 20))
+HISTORY_FULL_TURNS = int(os.getenv("HISTORY_FULL_TURNS", 3))
+# Messages longer than this are previewed once they leave the full window
+HISTORY_MESSAGE_MAX_CHARS = int(os.getenv("HISTORY_MESSAGE_MAX_CHARS", 2000))
+HISTORY_PREVIEW_LINES = int(os.getenv("HISTORY_PREVIEW_LINES", 8))
+# Charts listed in the session gallery (latest first)
+HISTORY_MAX_CHARTS = int(os.getenv("HISTORY_MAX_CHARTS", 20))
+
+COLLAPSED_QUESTIONS_SHOWN = 5
+
+
+def split_turns(history):
+    """Group history entries into turns: a question and its follow-on messages."""
+    turns = []
+    for entry in history:
+        user = entry[0]
+        if user or not turns:
+            turns.append([entry])
+        else:
+            # "" continues the previous turn (e.g. a chart's diagnostic);
+            # None is the collapsed-history note, which starts the list
+            turns[-1].append(entry)
+    return turns
+
+
+def preview(text, lines=HISTORY_PREVIEW_LINES):
+    """First lines of a long message with a note about what was cut."""
+    kept = text.splitlines()
+    if len(kept) <= lines:
+        return text[:HISTORY_MESSAGE_MAX_CHARS] + "…"
+    return "\n".join(kept[:lines]) + f"\n\n_… {len(kept) - lines} more lines hidden to keep the chat light._"
+
+
+def _collapsed_note(count, questions):
+    shown = ", ".join(f"“{q}”" for q in questions[-COLLAPSED_QUESTIONS_SHOWN:])
+    return (None, f"🗂️ {count} earlier question{'s' if count != 1 else ''} collapsed (most recent: {shown})")
+
+
+def compact(history, collapsed=0, max_turns=HISTORY_MAX_TURNS, full_turns=HISTORY_FULL_TURNS):
+    """Window a history to its last max_turns turns.
+
+    Returns (history, collapsed) where collapsed is the running count of
+    questions folded into the leading note.
+    """
+    turns = split_turns(history)
+    note = None
+    if turns and turns[0][0][0] is None:
+        note = turns.pop(0)[0]
+    max_turns = max(max_turns, 1)
+    old, kept = turns[:-max_turns], turns[-max_turns:]
+    if old:
+        collapsed += len(old)
+        note = _collapsed_note(collapsed, [turn[0][0] for turn in old])
+
+    compacted = [note] if note else []
+    for i, turn in enumerate(kept):
+        full = i >= len(kept) - full_turns
+        for user, bot in turn:
+            if not full and isinstance(bot, str) and len(bot) > HISTORY_MESSAGE_MAX_CHARS:
+                bot = preview(bot)
+            compacted.append((user, bot))
+    return compacted, collapsed
+
+
+def payload_bytes(*outputs):
+    """Approximate size of what a turn sends to the browser."""
+    return len(json.dumps(outputs, default=str).encode())
+
+
+class PayloadStats:
+    """Bytes sent to the browser per turn."""
+
+    def __init__(self):
+        self.turns = 0
+        self.total_bytes = 0
+        self.max_bytes = 0
+        self.last_bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, size):
+        with self._lock:
+            self.turns += 1
+            self.total_bytes += size
+            self.max_bytes = max(self.max_bytes, size)
+            self.last_bytes = size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "avg_bytes": self.total_bytes // self.turns if self.turns else 0,
+                "max_bytes": self.max_bytes,
+                "last_bytes": self.last_bytes,
+            }
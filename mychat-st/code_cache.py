@@ -0,0 +1,157 @@
+"""Reuse of PandasAI-generated code across retries and repeated questions.
+
+After a successful `SmartDataframe.chat` the code PandasAI generated is kept
+per normalized question. A retry or repeat re-executes that code locally
+against the current DataFrame, and only goes back to the LLM if it fails.
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from intents import normalize
+
+CODE_CACHE_SIZE = int(os.getenv("CODE_CACHE_SIZE", 256))
+
+logger = logging.getLogger(__name__)
+
+SAVEFIG_PATH = re.compile(r"""savefig\(\s*(?:fname\s*=\s*)?(['"])(.+?)\1""")
+
+
+class CodeExecutionError(Exception):
+    """Stored code failed or produced no usable result."""
+
+
+def capture_code(smart_df):
+    """Code from the last `chat` call, if PandasAI exposes it."""
+    try:
+        code = smart_df.last_code_executed
+    except Exception:
+        return None
+    return code if isinstance(code, str) and code.strip() else None
+
+
+def retarget_chart(code, chart_path):
+    """Point every savefig call (and the returned path) at chart_path."""
+    for _, old_path in set(SAVEFIG_PATH.findall(code)):
+        code = code.replace(old_path, chart_path)
+    return code
+
+
+def execute_code(code, dfs, chart_path=None):
+    """Execute PandasAI-style code against dfs and return its `result` dict.
+
+    The code sees the DataFrames as `dfs` (a single DataFrame becomes
+    `dfs[0]`) and reports through a `result` dict ({"type": ..., "value":
+    ...}); older PandasAI versions wrap this in an `analyze_data(dfs)`
+    function instead.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    if chart_path:
+        code = retarget_chart(code, chart_path)
+    if isinstance(dfs, pd.DataFrame):
+        dfs = [dfs]
+    # Copy so generated code can't modify the shared snapshots in place
+    dfs = [df.copy() for df in dfs]
+    env = {"pd": pd, "np": np, "plt": plt, "dfs": dfs, "df": dfs[0]}
+    try:
+        exec(code, env)
+        result = env.get("result")
+        if result is None and callable(env.get("analyze_data")):
+            result = env["analyze_data"](dfs)
+    except Exception as e:
+        raise CodeExecutionError(str(e)) from e
+    finally:
+        plt.close("all")
+    return result
+
+
+def result_value(result):
+    """The value of a `result` dict, checked to be usable as an answer."""
+    if not isinstance(result, dict) or "value" not in result:
+        raise CodeExecutionError("Generated code did not produce a result")
+    value = result["value"]
+    if result.get("type") == "plot" and not (isinstance(value, str) and os.path.exists(value)):
+        raise CodeExecutionError("Generated code did not save a chart")
+    return value
+
+
+def run_code(code, dfs, chart_path=None, execute=execute_code):
+    """Execute PandasAI-style code against dfs and return its result value.
+
+    execute runs the code, in this process by default (see sandbox.py for
+    running it in worker processes with resource limits).
+    """
+    return result_value(execute(code, dfs, chart_path))
+
+
+class CodeCache:
+    """Bounded LRU of generated code keyed by normalized question."""
+
+    def __init__(self, max_size=CODE_CACHE_SIZE, execute=execute_code):
+        self.max_size = max_size
+        self.execute = execute
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def get(self, question):
+        key = normalize(question)
+        with self._lock:
+            code = self._entries.get(key)
+            if code is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return code
+
+    def __contains__(self, question):
+        """Whether code is kept for a question (without counting a hit or miss)."""
+        with self._lock:
+            return normalize(question) in self._entries
+
+    def put(self, question, code):
+        if not code:
+            return
+        key = normalize(question)
+        with self._lock:
+            self._entries[key] = code
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, question):
+        with self._lock:
+            self._entries.pop(normalize(question), None)
+            self.failures += 1
+
+    def run(self, question, dfs, chart_path=None):
+        """Re-execute cached code for a question; None when there is none or it fails."""
+        code = self.get(question)
+        if code is None:
+            return None
+        try:
+            return run_code(code, dfs, chart_path, self.execute)
+        except CodeExecutionError as e:
+            logger.warning("Cached code failed, falling back to the LLM: %s", e)
+            self.discard(question)
+            return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "failures": self.failures,
+            }
@@ -0,0 +1,254 @@
+"""Fuzzy correction of employee and skill names in speech transcripts.
+
+Whisper often mangles names ("Jon Smyth", "over lock"), which sends PandasAI
+and the fast path looking for people and skills that don't exist. The
+EntityIndex holds every employee_name and skill_name of the current
+snapshot with two keys:
+
+- a phonetic key per word (Soundex), so "Smyth" finds "Smith"
+- character trigrams of the name without spaces, so "over lock" finds
+  "Overlock" and one wrong letter still leaves most trigrams in place
+
+A transcript is scanned for runs of one to four words (longest first). A
+run close enough to a name is replaced with that name before the question
+goes any further; runs that are question words ("show", "top", "skills")
+are never touched. The index is rebuilt when the snapshot changes.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter as Tally
+from dataclasses import dataclass
+
+from prometheus_client import Counter
+
+import tracing
+
+# Set to 0 to pass transcripts through unchanged
+ENTITY_CORRECTION = os.getenv("ENTITY_CORRECTION", "1") == "1"
+# Trigram similarity (Dice) at which a run is corrected on spelling alone
+ENTITY_MIN_SIMILARITY = float(os.getenv("ENTITY_MIN_SIMILARITY", 0.7))
+# Lower similarity accepted when the run also sounds like the name
+ENTITY_PHONETIC_SIMILARITY = float(os.getenv("ENTITY_PHONETIC_SIMILARITY", 0.45))
+# Similarity enough when every word of a multi-word name sounds alike ("Jon Smyth")
+WORDWISE_PHONETIC_SIMILARITY = 0.3
+MAX_WORDS = 4
+MIN_LETTERS = 4
+# Candidates scored per lookup, by shared trigrams
+MAX_CANDIDATES = 20
+
+# Words of the questions themselves, never corrected into names
+QUESTION_WORDS = frozenset("""
+a all an and any are as at average be best by chart count counts display distribution do does each
+employee employees every for from get graph have how in is list many me most much my name names
+number of on operator operators or people per plot rate rates rating ratings show skill skills staff
+than that the their them these this those to top total what which who whose with worker workers
+""".split())
+
+CORRECTIONS = Counter("assistant_entity_corrections_total", "Names corrected in transcripts", ["kind"])
+
+SOUNDEX_CODES = {
+    letter: digit
+    for digit, letters in {"1": "bfpv", "2": "cgjkqsxz", "3": "dt", "4": "l", "5": "mn", "6": "r"}.items()
+    for letter in letters
+}
+WORD = re.compile(r"[A-Za-z][A-Za-z'\-]*")
+
+logger = logging.getLogger(__name__)
+
+
+def soundex(word):
+    """American Soundex code of a word ("" if it has no letters)."""
+    word = re.sub(r"[^a-z]", "", word.lower())
+    if not word:
+        return ""
+    digits = []
+    previous = SOUNDEX_CODES.get(word[0], "")
+    for letter in word[1:]:
+        code = SOUNDEX_CODES.get(letter, "")
+        if code and code != previous:
+            digits.append(code)
+        if letter not in "hw":
+            previous = code
+    return (word[0].upper() + "".join(digits) + "000")[:4]
+
+
+def phonetic_key(phrase):
+    return " ".join(soundex(word) for word in phrase.split())
+
+
+def _compact(phrase):
+    return re.sub(r"[^a-z0-9]", "", phrase.lower())
+
+
+def trigrams(phrase):
+    text = f" {_compact(phrase)} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(a, b):
+    """Dice coefficient of two trigram sets."""
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+@dataclass
+class Entry:
+    name: str
+    kind: str
+    trigrams: set
+    phonetic: str
+    compact_phonetic: str
+
+
+@dataclass
+class Correction:
+    heard: str
+    name: str
+    kind: str
+    score: float
+
+
+class EntityIndex:
+    """Employee and skill names of one snapshot, for fuzzy lookups."""
+
+    def __init__(self, names):
+        """names: iterable of (name, kind) pairs, kind "employee" or "skill"."""
+        self.entries = []
+        self._exact = {}
+        self._by_trigram = {}
+        self._by_phonetic = {}
+        for name, kind in names:
+            if _compact(name) in self._exact:
+                continue
+            self._add(name, kind)
+            if kind == "employee" and " " in name:
+                # Users often say only the first name
+                first = name.split(" ")[0]
+                if len(first) >= MIN_LETTERS and _compact(first) not in self._exact:
+                    self._add(first, "employee")
+        self.max_words = min(MAX_WORDS, max((len(e.name.split()) for e in self.entries), default=1))
+
+    @classmethod
+    def from_frame(cls, df):
+        names = []
+        for column, kind in (("employee_name", "employee"), ("skill_name", "skill")):
+            if column in df.columns:
+                values = {str(v).strip() for v in df[column].dropna().unique()}
+                names += [(v, kind) for v in sorted(values) if v]
+        return cls(names)
+
+    def _add(self, name, kind):
+        entry = Entry(name, kind, trigrams(name), phonetic_key(name), soundex(_compact(name)))
+        index = len(self.entries)
+        self.entries.append(entry)
+        self._exact[_compact(name)] = entry
+        for gram in entry.trigrams:
+            self._by_trigram.setdefault(gram, []).append(index)
+        for key in (entry.phonetic, entry.compact_phonetic):
+            self._by_phonetic.setdefault(key, []).append(index)
+
+    def lookup(self, phrase):
+        """The closest entry to phrase and its score, or None."""
+        exact = self._exact.get(_compact(phrase))
+        if exact is not None:
+            return exact, 1.0
+        grams = trigrams(phrase)
+        shared = Tally(i for gram in grams for i in self._by_trigram.get(gram, ()))
+        candidates = {i for i, _ in shared.most_common(MAX_CANDIDATES)}
+        key = phonetic_key(phrase)
+        wordwise = set(self._by_phonetic.get(key, ())) if " " in key else set()
+        sounding = wordwise | set(self._by_phonetic.get(soundex(_compact(phrase)), ()))
+        best, best_score = None, 0.0
+        for i in candidates | sounding:
+            entry = self.entries[i]
+            score = similarity(grams, entry.trigrams)
+            if i in wordwise and entry.phonetic == key:
+                needed = WORDWISE_PHONETIC_SIMILARITY
+            elif i in sounding:
+                needed = ENTITY_PHONETIC_SIMILARITY
+            else:
+                needed = ENTITY_MIN_SIMILARITY
+            if score >= needed and score > best_score:
+                best, best_score = entry, score
+        return (best, best_score) if best is not None else None
+
+    def correct(self, text):
+        """Replace word runs that are close to a name; returns (text, corrections)."""
+        words = list(WORD.finditer(text))
+        used = [False] * len(words)
+        replacements = []
+        for size in range(self.max_words, 0, -1):
+            for start in range(len(words) - size + 1):
+                span = words[start:start + size]
+                if any(used[start:start + size]):
+                    continue
+                lowered = [w.group().lower() for w in span]
+                if lowered[0] in QUESTION_WORDS or lowered[-1] in QUESTION_WORDS:
+                    continue
+                heard = text[span[0].start():span[-1].end()]
+                if len(_compact(heard)) < MIN_LETTERS:
+                    continue
+                found = self.lookup(heard)
+                if found is None:
+                    continue
+                entry, score = found
+                for i in range(start, start + size):
+                    used[i] = True
+                if heard.lower() != entry.name.lower():
+                    replacements.append((span[0].start(), span[-1].end(), Correction(heard, entry.name, entry.kind, round(score, 2))))
+        corrections = []
+        for begin, end, correction in sorted(replacements, key=lambda r: r[0], reverse=True):
+            text = text[:begin] + correction.name + text[end:]
+            corrections.append(correction)
+        return text, corrections[::-1]
+
+
+class EntityCorrector:
+    """Keeps an EntityIndex for the current snapshot and corrects transcripts with it."""
+
+    def __init__(self):
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+        self.build_ms = None
+        self.transcripts = 0
+        self.corrected = 0
+        self.lookup_ms_total = 0.0
+
+    def index(self, version, df):
+        """The index for a snapshot version, rebuilt when the version changes."""
+        with self._lock:
+            if self._version != version:
+                started = time.perf_counter()
+                self._index = EntityIndex.from_frame(df)
+                self._version = version
+                self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+                logger.info("Entity index: %d names in %.1f ms", len(self._index.entries), self.build_ms)
+            return self._index
+
+    def correct(self, text, version, df):
+        """text with mangled names replaced by the snapshot's names."""
+        started = time.perf_counter()
+        with tracing.span("entities"):
+            corrected, corrections = self.index(version, df).correct(text)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for correction in corrections:
+            CORRECTIONS.labels(correction.kind).inc()
+            logger.info("Transcript correction: %r -> %r (%.2f)", correction.heard, correction.name, correction.score)
+        with self._lock:
+            self.transcripts += 1
+            self.corrected += bool(corrections)
+            self.lookup_ms_total += elapsed_ms
+        return corrected
+
+    def stats(self):
+        with self._lock:
+            return {
+                "names": len(self._index.entries) if self._index else 0,
+                "build_ms": self.build_ms,
+                "transcripts": self.transcripts,
+                "corrected": self.corrected,
+                "avg_lookup_ms": round(self.lookup_ms_total / self.transcripts, 2) if self.transcripts else None,
+            }
@@ -0,0 +1,137 @@
+"""Follow-up questions answered from the previous result set.
+
+The last DataFrame answer of each session is kept in its session state
+(bounded by row count), and refinements such as "now only the Sewing ones", "sort
+that by rate" or "top 5 of those" are applied to it locally instead of
+reloading the view and calling the LLM.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from intents import CHART_WORDS, NUMBER_WORDS, normalize
+
+FOLLOWUP_MAX_ROWS = int(os.getenv("FOLLOWUP_MAX_ROWS", 10000))
+
+NUMBER = rf"(\d+|{'|'.join(NUMBER_WORDS)})"
+# Words that tie a question to the previous answer
+REFERENCE = re.compile(r"\b(that|those|these|them|it|this|the same|previous|above|results?)\b")
+# Filler before a refinement ("now only the Sewing ones"); not a reference by itself
+LEADING = re.compile(r"^(?:(?:now|and|then|ok|okay|so)\s+)*")
+
+FILTER = re.compile(r"^(?:only|just|keep)(?: show)?(?: the)? (.+?)(?: ones?| rows?| employees?| people)?$")
+EXCLUDE = re.compile(r"^(?:without|exclude|excluding|remove|drop|hide)(?: the)? (.+?)(?: ones?| rows?| employees?| people)?$")
+SORT = re.compile(
+    r"^(?:sort|order|rank)(?: (?:that|those|these|them|it|the results?|the list))?"
+    r"(?: by)?(?: (?:their|the))? (.+?)(?: in)?(?: (asc|ascending|desc|descending|highest first|lowest first))?(?: order)?$"
+)
+TOP = re.compile(rf"^(?:(?:show|give|list)(?: me)? )?(?:the )?(top|first|bottom|last) {NUMBER}\b")
+CHART = re.compile(r"^(?:show|plot|draw|make|display|put)\b")
+
+RANK_COLUMN = "skill_rate"
+DESCENDING = {"desc", "descending", "highest first"}
+COLUMN_ALIASES = {
+    "rate": "skill_rate", "rating": "skill_rate", "score": "skill_rate",
+    "name": "employee_name", "employee": "employee_name",
+    "skill": "skill_name",
+}
+
+
+@dataclass
+class FollowUp:
+    action: str
+    args: dict = field(default_factory=dict)
+
+
+def _column_for(words, df):
+    words = words.replace(" ", "_")
+    for column in df.columns:
+        if column.lower() == words:
+            return column
+    for word, column in COLUMN_ALIASES.items():
+        if word in words and column in df.columns:
+            return column
+    for column in df.columns:
+        if words in column.lower() or column.lower() in words:
+            return column
+    return None
+
+
+def _value_mask(df, value):
+    """Rows where any text column equals value (case-insensitive)."""
+    mask = pd.Series(False, index=df.index)
+    for column in df.columns:
+        # pandas 3 reads text as StringDtype rather than object
+        if pd.api.types.is_string_dtype(df[column]) or isinstance(df[column].dtype, pd.CategoricalDtype):
+            mask |= df[column].astype(str).str.strip().str.lower() == value
+    return mask
+
+
+def match(question, df):
+    """Return the FollowUp a question asks of df, or None if it is a new question."""
+    text = normalize(question)
+    chart = bool(CHART_WORDS.search(text))
+    refers = bool(REFERENCE.search(text))
+    text = LEADING.sub("", text)
+
+    top = TOP.search(text)
+    if top and refers:
+        n = NUMBER_WORDS.get(top.group(2)) or int(top.group(2))
+        # "top"/"bottom" rank by rate; "first"/"last" keep the current order
+        rank = RANK_COLUMN if top.group(1) in ("top", "bottom") and RANK_COLUMN in df.columns else None
+        action = "head" if top.group(1) in ("top", "first") else "tail"
+        return FollowUp(action, {"n": n, "rank": rank, "chart": chart})
+
+    sort = SORT.search(re.sub(r"\b(?:in a|as a|bar)\b", " ", CHART_WORDS.sub(" ", text)).strip())
+    # "sort by rate" is a refinement; "sort employees by skill rate" is a new question
+    if sort and (refers or len(sort.group(1).split()) <= 2):
+        column = _column_for(sort.group(1), df)
+        if column is not None:
+            return FollowUp("sort", {"column": column, "descending": sort.group(2) in DESCENDING, "chart": chart})
+
+    for pattern, action in ((FILTER, "filter"), (EXCLUDE, "exclude")):
+        found = pattern.search(text)
+        if found:
+            value = found.group(1)
+            if _value_mask(df, value).any():
+                return FollowUp(action, {"value": value, "chart": chart})
+
+    if chart and refers and CHART.search(text):
+        return FollowUp("chart", {"chart": True})
+    return None
+
+
+def apply(followup, df):
+    """Apply a follow-up to the previous result and return the new result."""
+    args = followup.args
+    if followup.action == "filter":
+        return df[_value_mask(df, args["value"])].reset_index(drop=True)
+    if followup.action == "exclude":
+        return df[~_value_mask(df, args["value"])].reset_index(drop=True)
+    if followup.action == "sort":
+        return df.sort_values(args["column"], ascending=not args["descending"]).reset_index(drop=True)
+    if followup.action in ("head", "tail"):
+        if args.get("rank") in df.columns:
+            df = df.sort_values(args["rank"], ascending=False, kind="stable", na_position="last")
+            if followup.action == "tail":
+                df = df.dropna(subset=[args["rank"]])
+        rows = df.head(args["n"]) if followup.action == "head" else df.tail(args["n"])
+        return rows.reset_index(drop=True)
+    if followup.action == "chart":
+        return df
+    raise ValueError(f"Unknown follow-up: {followup.action}")
+
+
+def result_to_keep(result, previous, max_rows=FOLLOWUP_MAX_ROWS):
+    """What a session remembers after an answer.
+
+    DataFrame answers replace the previous result (empty or oversized ones
+    clear it); other answer types leave the previous one in place.
+    """
+    if not isinstance(result, pd.DataFrame):
+        return previous
+    if result.empty or len(result) > max_rows:
+        return None
+    return result
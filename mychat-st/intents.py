@@ -0,0 +1,348 @@
+"""Template fast path for common question shapes.
+
+Recognizes a handful of frequent questions ("top N employees by skill rate",
+"employees with skill X", "count by skill", ...) and answers them with
+prebuilt pandas queries over the cached snapshot, or with the equivalent SQL
+when the planner pushes them down to MariaDB (see planner.py). Anything that
+doesn't match a template exactly is left to PandasAI.
+"""
+import re
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "fifteen": 15,
+    "twenty": 20, "fifty": 50, "hundred": 100,
+}
+DEFAULT_TOP_N = 10
+
+CHART_WORDS = re.compile(r"\b(chart|graph|plot)\b")
+PEOPLE = r"(?:employees?|people|workers?|operators?|staff)"
+RATE = r"(?:skill )?(?:rates?|ratings?)"
+
+TOP_N = re.compile(rf"\btop(?: (\d+|{'|'.join(NUMBER_WORDS)}))?(?: {PEOPLE})?\b.*\b{RATE}\b")
+COUNT_BY_SKILL = re.compile(
+    rf"\b(?:count|how many|number of)\b.*\b{PEOPLE}\b.*\b(?:by|per|for each|in each|each)\b(?: \w+)? skills?\b"
+    r"|\bcount by skills?\b"
+)
+NULL_RATES = re.compile(rf"\b{PEOPLE}\b.*\b(?:null|missing|no|without) {RATE}\b")
+RATE_DISTRIBUTION = re.compile(rf"\b{RATE} distribution\b|\bdistribution of {RATE}\b")
+ALL_ROWS = re.compile(rf"^(?:show|list|display|get)(?: me)? all {PEOPLE} with their {RATE}$")
+LIST_ROWS = re.compile(rf"\b(?:{PEOPLE}|who|skills?|list|show)\b")
+
+# Words that make a question more than a template can answer
+UNSUPPORTED = re.compile(
+    r"\b(average|avg|mean|median|sum|total|compare|comparison|percent|percentage|ratio"
+    r"|more|less|greater|fewer|below|above|between|over|under|except|not|without"
+    r"|lowest|bottom|least|highest|best|worst|trend|per cent"
+    r"|no|none|never|nobody|don't|dont|doesn't)\b"
+)
+# Anything after these is a filter no template applies
+EXCLUSION = re.compile(r"\b(?:excluding|exclude|except|without|other than|apart from|besides|but not)\b")
+
+# Words any template question may contain around its content words
+FILLER_WORDS = frozenset("""
+a an the me us please can could you i show list display get give find tell draw what which who whose
+is are was were be do does did have has there their them they of with for all s
+""".split())
+PEOPLE_WORDS = frozenset("employee employees people person worker workers operator operators staff".split())
+RATE_WORDS = frozenset("skill skills rate rates rating ratings".split())
+# Content words each template understands. A question with any other word
+# left over (a date, "only women", "ascending", an employee the template
+# can't filter on) goes to the LLM instead of being answered without it.
+TEMPLATE_WORDS = {
+    "skill_rate_distribution": RATE_WORDS | {"distribution"},
+    "null_skill_rates": PEOPLE_WORDS | RATE_WORDS | {"null", "missing", "no", "without"},
+    "top_by_skill_rate": PEOPLE_WORDS | RATE_WORDS | {"top", "by", "rated"},
+    "count_by_skill": PEOPLE_WORDS | RATE_WORDS | {"count", "how", "many", "number", "by", "per", "each", "in"},
+    "list_rows": PEOPLE_WORDS | {"skill", "skills", "has", "having", "skilled", "in", "at", "on", "know", "knows",
+                                 "work", "works"},
+}
+
+RESULT_COLUMNS = ["employee_name", "skill_name", "skill_rate"]
+
+
+@dataclass
+class Intent:
+    name: str
+    slots: dict = field(default_factory=dict)
+    chart: bool = False
+
+
+def normalize(question):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = re.sub(r"[^\w\s']", " ", question.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _find_names(text, names):
+    """Vocabulary entries that appear in text as whole words, longest first, without overlaps."""
+    found = []
+    for name in names:
+        pattern = rf"\b{re.escape(name)}\b"
+        if re.search(pattern, text):
+            found.append(name)
+            text = re.sub(pattern, " ", text)
+    return found
+
+
+def _find_name(text, names):
+    """Longest vocabulary entry that appears in text as whole words."""
+    found = _find_names(text, names)
+    return found[0] if found else None
+
+
+class Vocabulary:
+    """Lowercased skill and employee names from one snapshot, longest first."""
+
+    def __init__(self, df):
+        self.skills = self._names(df, "skill_name")
+        self.employees = self._names(df, "employee_name")
+        first_names = {}
+        for name in self.employees:
+            first_names.setdefault(name.split(" ")[0], []).append(name)
+        # A bare first name only identifies an employee when it is unique
+        self.first_names = {first: names[0] for first, names in first_names.items() if len(names) == 1}
+
+    @staticmethod
+    def _names(df, column):
+        if column not in df.columns:
+            return []
+        values = {str(v).strip().lower() for v in df[column].dropna().unique()}
+        return sorted((v for v in values if v), key=len, reverse=True)
+
+    def skill(self, text):
+        return _find_name(text, self.skills)
+
+    def employee(self, text):
+        found = self.employees_in(text)
+        return found[0] if found else None
+
+    def skills_in(self, text):
+        return _find_names(text, self.skills)
+
+    def employees_in(self, text):
+        found = _find_names(text, self.employees)
+        for name in found:
+            text = re.sub(rf"\b{re.escape(name)}\b", " ", text)
+        firsts = _find_names(text, sorted(self.first_names, key=len, reverse=True))
+        return found + [self.first_names[first] for first in firsts]
+
+
+def _understood(guarded, name, extra=()):
+    """True when every word left in the question is one the template understands."""
+    allowed = FILLER_WORDS | TEMPLATE_WORDS[name]
+    words = re.findall(r"\w+", guarded)
+    for word in extra:
+        if word in words:
+            words.remove(word)
+    return all(word in allowed for word in words)
+
+
+def match(question, vocabulary):
+    """Return the Intent for a question, or None when no template fits."""
+    text = normalize(question)
+    chart = bool(CHART_WORDS.search(text))
+    text = CHART_WORDS.sub(" ", text)
+    text = re.sub(r"\b(?:in|as|on|with|using) an? (?:bar\b)?", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+
+    if ALL_ROWS.search(text):
+        return Intent("all_rows", chart=chart)
+
+    # Strip matched names before the keyword guard so names like
+    # "Overlock" or "Anderson" don't trip it
+    skills = vocabulary.skills_in(text)
+    employees = vocabulary.employees_in(text)
+    if len(skills) > 1 or len(employees) > 1:
+        # "sewing and overlock", "John or Mary": no template takes two names
+        return None
+    skill = skills[0] if skills else None
+    employee = employees[0] if employees else None
+    guarded = text
+    for name in skills + employees:
+        guarded = re.sub(rf"\b{re.escape(name)}\b", " ", guarded)
+    for name in employees:
+        guarded = re.sub(rf"\b{re.escape(name.split(' ')[0])}\b", " ", guarded)
+    named = bool(skill or employee)
+
+    if RATE_DISTRIBUTION.search(text):
+        if named or not _understood(guarded, "skill_rate_distribution"):
+            return None
+        return Intent("skill_rate_distribution", chart=chart)
+    if NULL_RATES.search(text) and not named and _understood(guarded, "null_skill_rates"):
+        return Intent("null_skill_rates")
+    if UNSUPPORTED.search(guarded) or EXCLUSION.search(guarded):
+        return None
+
+    top = TOP_N.search(guarded)
+    if top:
+        n = top.group(1)
+        if employee or not _understood(guarded, "top_by_skill_rate", extra=[n] if n else []):
+            return None
+        n = DEFAULT_TOP_N if n is None else int(NUMBER_WORDS.get(n, n))
+        return Intent("top_by_skill_rate", {"n": n, "skill": skill}, chart=chart)
+    if COUNT_BY_SKILL.search(guarded):
+        if named or not _understood(guarded, "count_by_skill"):
+            return None
+        return Intent("count_by_skill", chart=chart)
+    if named and LIST_ROWS.search(guarded) and _understood(guarded, "list_rows"):
+        return Intent("list_rows", {"skill": skill, "employee": employee})
+    return None
+
+
+def _columns(df):
+    return [c for c in RESULT_COLUMNS if c in df.columns]
+
+
+def _equals(series, value):
+    return series.astype(str).str.strip().str.lower() == value
+
+
+def execute(intent, df):
+    """Run the prebuilt query for an intent against the snapshot DataFrame."""
+    slots = intent.slots
+    if intent.name == "all_rows":
+        return df[_columns(df)]
+    if intent.name == "skill_rate_distribution":
+        counts = df["skill_rate"].value_counts().sort_index()
+        return counts.rename_axis("skill_rate").reset_index(name="employee_count")
+    if intent.name == "null_skill_rates":
+        return df.loc[df["skill_rate"].isna(), _columns(df)]
+    if intent.name == "top_by_skill_rate":
+        rows = df.dropna(subset=["skill_rate"])
+        if slots.get("skill"):
+            rows = rows[_equals(rows["skill_name"], slots["skill"])]
+        return rows.nlargest(slots["n"], "skill_rate")[_columns(df)].reset_index(drop=True)
+    if intent.name == "count_by_skill":
+        key = "employee_id" if "employee_id" in df.columns else "employee_name"
+        counts = df.groupby("skill_name", observed=True)[key].nunique().sort_values(ascending=False)
+        return counts.reset_index(name="employee_count")
+    if intent.name == "list_rows":
+        rows = df
+        if slots.get("skill"):
+            rows = rows[_equals(rows["skill_name"], slots["skill"])]
+        if slots.get("employee"):
+            rows = rows[_equals(rows["employee_name"], slots["employee"])]
+        return rows.sort_values("skill_rate", ascending=False)[_columns(df)].reset_index(drop=True)
+    raise ValueError(f"Unknown intent: {intent.name}")
+
+
+RESULT_COLUMNS_SQL = ", ".join(RESULT_COLUMNS)
+# Intents whose result is small next to the view: filters, aggregates and top-N
+SQL_INTENTS = ("skill_rate_distribution", "null_skill_rates", "top_by_skill_rate", "count_by_skill", "list_rows")
+
+
+def build_sql(intent, view):
+    """Return (sql, params) computing the same result as execute() in MariaDB."""
+    slots = intent.slots
+    if intent.name == "skill_rate_distribution":
+        sql = (
+            f"SELECT skill_rate, COUNT(*) AS employee_count FROM {view} "
+            "WHERE skill_rate IS NOT NULL GROUP BY skill_rate ORDER BY skill_rate"
+        )
+        return sql, ()
+    if intent.name == "null_skill_rates":
+        return f"SELECT {RESULT_COLUMNS_SQL} FROM {view} WHERE skill_rate IS NULL", ()
+    if intent.name == "top_by_skill_rate":
+        where, params = ["skill_rate IS NOT NULL"], []
+        if slots.get("skill"):
+            where.append("LOWER(TRIM(skill_name)) = %s")
+            params.append(slots["skill"])
+        sql = (
+            f"SELECT {RESULT_COLUMNS_SQL} FROM {view} WHERE {' AND '.join(where)} "
+            "ORDER BY skill_rate DESC LIMIT %s"
+        )
+        return sql, tuple(params) + (slots["n"],)
+    if intent.name == "count_by_skill":
+        sql = (
+            f"SELECT skill_name, COUNT(DISTINCT employee_id) AS employee_count FROM {view} "
+            "WHERE skill_name IS NOT NULL GROUP BY skill_name ORDER BY employee_count DESC"
+        )
+        return sql, ()
+    if intent.name == "list_rows":
+        where, params = [], []
+        if slots.get("skill"):
+            where.append("LOWER(TRIM(skill_name)) = %s")
+            params.append(slots["skill"])
+        if slots.get("employee"):
+            where.append("LOWER(TRIM(employee_name)) = %s")
+            params.append(slots["employee"])
+        sql = (
+            f"SELECT {RESULT_COLUMNS_SQL} FROM {view} WHERE {' AND '.join(where)} "
+            "ORDER BY skill_rate DESC"
+        )
+        return sql, tuple(params)
+    raise ValueError(f"No SQL template for intent: {intent.name}")
+
+
+def render_chart(result, title, path):
+    """Save a bar chart of a fast-path result (label column vs. last column)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    label = "employee_name" if "employee_name" in result.columns else result.columns[0]
+    labels = result[label].astype(str)
+    if label == "employee_name" and "skill_name" in result.columns:
+        # Employees appear once per skill, so label bars with both
+        labels = labels + " (" + result["skill_name"].astype(str) + ")"
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        # Compacted snapshots hold nullable ints; matplotlib can't plot pd.NA
+        ax.bar(labels, result[result.columns[-1]].to_numpy(dtype=float, na_value=np.nan))
+        ax.set_xlabel(label)
+        ax.set_ylabel(result.columns[-1])
+        ax.set_title(title)
+        ax.tick_params(axis="x", labelrotation=45)
+        fig.tight_layout()
+        fig.savefig(path)
+    finally:
+        plt.close(fig)
+    return path
+
+
+class FastPathRouter:
+    """Routes questions to templates and counts fast-path coverage."""
+
+    def __init__(self):
+        self._vocabulary = None
+        self._version = None
+        self._hits = {}
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def vocabulary(self, snapshot):
+        with self._lock:
+            if self._version != snapshot.version:
+                self._vocabulary = Vocabulary(snapshot.df)
+                self._version = snapshot.version
+            return self._vocabulary
+
+    def route(self, question, snapshot):
+        intent = match(question, self.vocabulary(snapshot))
+        self.record(intent)
+        return intent
+
+    def record(self, intent):
+        """Count a routed question (intent None: left to the LLM)."""
+        with self._lock:
+            if intent is None:
+                self._misses += 1
+            else:
+                self._hits[intent.name] = self._hits.get(intent.name, 0) + 1
+
+    def coverage(self):
+        with self._lock:
+            hits = sum(self._hits.values())
+            total = hits + self._misses
+            return {
+                "questions": total,
+                "fast_path": hits,
+                "llm": self._misses,
+                "coverage": round(hits / total, 3) if total else 0.0,
+                "by_intent": dict(self._hits),
+            }
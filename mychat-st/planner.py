@@ -0,0 +1,148 @@
+"""Chooses between answering in memory and pushing a question down to MariaDB.
+
+Filter, aggregate and top-N questions the fast path recognizes (see
+intents.SQL_INTENTS) can be answered either from the view's in-memory
+snapshot or by running the equivalent SQL in MariaDB and reading only the
+small result. The planner picks per question:
+
+- in memory when the view's snapshot is already loaded and fresh, or when
+  the view has fewer than PUSHDOWN_MIN_ROWS rows (loading it once serves
+  many questions)
+- pushed down when the view is large and not in memory, so the question is
+  answered without pulling the whole view into pandas
+
+Row counts come from information_schema for tables and from COUNT(*) for
+views, refreshed every PLANNER_STATS_TTL_SECONDS. Questions no template
+fits still load the view for PandasAI.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+import intents
+
+PUSHDOWN_MIN_ROWS = int(os.getenv("PUSHDOWN_MIN_ROWS", 500000))
+PLANNER_STATS_TTL_SECONDS = float(os.getenv("PLANNER_STATS_TTL_SECONDS", 600))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Plan:
+    view: str
+    intent: intents.Intent
+    sql: str
+    params: tuple
+
+
+class Planner:
+    """Per-question choice between the in-memory fast path and SQL pushdown."""
+
+    def __init__(self, registry, router, read, min_rows=PUSHDOWN_MIN_ROWS, ttl=PLANNER_STATS_TTL_SECONDS):
+        self.registry = registry
+        self.router = router
+        # read(sql, params) -> DataFrame, e.g. a read on the DB stage
+        self._read = read
+        self.min_rows = min_rows
+        self.ttl = ttl
+        self._rows = {}  # view -> (rows, checked_at)
+        self._names = {}  # view -> (names DataFrame, Vocabulary, loaded_at)
+        self._lock = threading.Lock()
+        self.pushed_down = 0
+        self.in_memory = 0
+
+    def _count_rows(self, view):
+        estimate = self._read(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (view,),
+        )
+        if not estimate.empty and pd.notna(estimate.iloc[0, 0]):
+            return int(estimate.iloc[0, 0])
+        # Views have no row estimate
+        return int(self._read(f"SELECT COUNT(*) AS row_count FROM {view}", ()).iloc[0, 0])
+
+    def rows(self, view):
+        """Row count of a view, cached for the stats TTL; None if it can't be read."""
+        with self._lock:
+            cached = self._rows.get(view)
+        if cached is not None and time.time() - cached[1] < self.ttl:
+            return cached[0]
+        try:
+            rows = self._count_rows(view)
+        except Exception as e:
+            logger.warning("Row count of %s unavailable, answering in memory: %s", view, e)
+            return None
+        with self._lock:
+            self._rows[view] = (rows, time.time())
+        return rows
+
+    def _read_names(self, view):
+        with self._lock:
+            cached = self._names.get(view)
+        if cached is not None and time.time() - cached[2] < self.ttl:
+            return cached
+        names = pd.concat([
+            self._read(f"SELECT DISTINCT skill_name FROM {view}", ()),
+            self._read(f"SELECT DISTINCT employee_name FROM {view}", ()),
+        ], axis=1)
+        cached = (names, intents.Vocabulary(names), time.time())
+        with self._lock:
+            self._names[view] = cached
+        return cached
+
+    def names(self, view):
+        """Skill and employee names read from the database and when they were read, cached for the stats TTL."""
+        names, _, loaded_at = self._read_names(view)
+        return names, loaded_at
+
+    def vocabulary(self, view):
+        """intents.Vocabulary of the names read from the database."""
+        return self._read_names(view)[1]
+
+    def pushdown(self, view):
+        """True when questions on this view should run in MariaDB rather than in memory."""
+        if self.registry.loaded(view) is not None:
+            return False
+        shared = self.registry.shared
+        if shared is not None and shared.role == "reader":
+            # Attaching a published snapshot is cheap; use it
+            return False
+        rows = self.rows(view)
+        return rows is not None and rows >= self.min_rows
+
+    def match(self, question, view):
+        """The intent of a question if it can run as SQL, else None (also when the names can't be read)."""
+        try:
+            vocabulary = self.vocabulary(view)
+        except Exception as e:
+            logger.warning("Names in %s unavailable, answering in memory: %s", view, e)
+            return None
+        intent = intents.match(question, vocabulary)
+        return intent if intent is not None and intent.name in intents.SQL_INTENTS else None
+
+    def plan(self, question, view):
+        """A pushdown Plan for the question, or None to answer it in memory."""
+        intent = self.match(question, view) if self.pushdown(view) else None
+        if intent is None:
+            # Loaded for the in-memory fast path or PandasAI, which route it themselves
+            with self._lock:
+                self.in_memory += 1
+            return None
+        self.router.record(intent)
+        sql, params = intents.build_sql(intent, view)
+        with self._lock:
+            self.pushed_down += 1
+        return Plan(view, intent, sql, params)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "min_rows": self.min_rows,
+                "rows": {view: rows for view, (rows, _) in self._rows.items()},
+                "in_memory": self.in_memory,
+                "pushed_down": self.pushed_down,
+            }
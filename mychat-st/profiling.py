@@ -0,0 +1,160 @@
+"""Opt-in cProfile profiles of individual requests.
+
+A request is profiled when it asks for it (the "Profile my questions" box in
+the UI, or "profile": true in an API call) or, with PROFILE_SAMPLE_RATE set,
+at random. cProfile only sees the thread it runs in, so the stage executors
+profile their part of a profiled request in their own threads and the ASR
+worker process profiles Whisper itself; everything is merged into one
+profile per request ID under PROFILE_DIR:
+
+- <request id>.prof  the merged profile, for snakeviz or pstats
+- <request id>.txt   the PROFILE_TOP_N functions by cumulative time
+
+On Python 3.12+ cProfile hooks the whole interpreter, so the request's own
+profile already covers every thread (including other requests running at
+the same time) and the per-thread profiles step aside.
+
+Requests that aren't profiled only pay for a context variable lookup per
+stage call.
+"""
+import cProfile
+import contextvars
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("exports", "profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", 25))
+# Profiles listed in the status panel
+PROFILE_RECENT = 20
+
+logger = logging.getLogger(__name__)
+_active = contextvars.ContextVar("profile", default=None)
+_recent = deque(maxlen=PROFILE_RECENT)
+
+
+class RequestProfile:
+    """The profiles collected for one request, across threads and processes."""
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.profiles = []
+        self.files = []
+        self._lock = threading.Lock()
+
+    def path(self, suffix):
+        return os.path.join(PROFILE_DIR, f"{self.request_id}{suffix}")
+
+    def add(self, profile):
+        with self._lock:
+            self.profiles.append(profile)
+
+    def add_file(self, path):
+        with self._lock:
+            self.files.append(path)
+
+    def save(self, top_n=PROFILE_TOP_N):
+        """Merge everything collected, write the .prof and top-N .txt files."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        files = [path for path in self.files if os.path.exists(path)]
+        stats = pstats.Stats(*self.profiles, *files)
+        for path in files:
+            os.remove(path)
+        stats.dump_stats(self.path(".prof"))
+
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(top_n)
+        with open(self.path(".txt"), "w") as f:
+            f.write(out.getvalue())
+        _recent.appendleft({
+            "request_id": self.request_id,
+            "total_seconds": round(stats.total_tt, 3),
+            "profile": self.path(".prof"),
+            "summary": self.path(".txt"),
+        })
+        logger.info("Profile saved to %s", self.path(".prof"))
+
+
+def should_profile(requested=False):
+    return requested or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+
+def active():
+    """The RequestProfile being collected in this context, or None."""
+    return _active.get()
+
+
+def _enable(profile):
+    try:
+        profile.enable()
+        return True
+    except ValueError:
+        # Another profiler is already running in this thread
+        return False
+
+
+@contextmanager
+def profile(request_id, enabled):
+    """Profile the block as request_id when enabled; yields the RequestProfile or None."""
+    if not enabled:
+        yield None
+        return
+    request_profile = RequestProfile(request_id)
+    main = cProfile.Profile()
+    token = _active.set(request_profile)
+    running = _enable(main)
+    try:
+        yield request_profile
+    finally:
+        if running:
+            main.disable()
+            request_profile.add(main)
+        _active.reset(token)
+        if request_profile.profiles or request_profile.files:
+            try:
+                request_profile.save()
+            except Exception as e:
+                logger.warning("Could not save the profile of %s: %s", request_id, e)
+
+
+def call(fn, *args, **kwargs):
+    """fn(*args, **kwargs), profiled in this thread when its request is being profiled.
+
+    Stage threads run their tasks in a copy of the submitting context (see
+    stages.py), so the request's profile is found here like any other
+    context variable.
+    """
+    request_profile = _active.get()
+    if request_profile is None:
+        return fn(*args, **kwargs)
+    worker = cProfile.Profile()
+    if not _enable(worker):
+        return fn(*args, **kwargs)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        worker.disable()
+        request_profile.add(worker)
+
+
+def recent():
+    """The latest saved profiles, newest first."""
+    return list(_recent)
+
+
+def summary(request_id):
+    """The top-N text summary of a saved profile, or None."""
+    if request_id != os.path.basename(request_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{request_id}.txt")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read()
@@ -0,0 +1,132 @@
+"""Large DataFrame answers as a preview, pages and downloads.
+
+Rendering a whole result with `to_markdown()` is slow and makes megabyte chat
+messages. Tables up to TABLE_PREVIEW_ROWS rows are still shown in full; larger
+ones get a markdown preview of their first rows only, are saved as CSV and
+Parquet downloads, and can be browsed page by page in the result table below
+the chat, which reads the Parquet file. The downloads directory is bounded
+like the session store: the TABLE_MAX_EXPORTS most recently used exports are
+kept, none for longer than a session lives.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+TABLE_PREVIEW_ROWS = int(os.getenv("TABLE_PREVIEW_ROWS", 20))
+TABLE_PAGE_SIZE = int(os.getenv("TABLE_PAGE_SIZE", 50))
+# Parquet files kept open for paging
+TABLE_CACHE_SIZE = int(os.getenv("TABLE_CACHE_SIZE", 8))
+# Exports (CSV and Parquet pairs) kept on disk
+TABLE_MAX_EXPORTS = int(os.getenv("TABLE_MAX_EXPORTS", 500))
+
+
+def is_large(df, preview_rows=TABLE_PREVIEW_ROWS):
+    return len(df) > preview_rows
+
+
+def preview_markdown(df, preview_rows=TABLE_PREVIEW_ROWS):
+    """Markdown of the first rows only, with a note about the rest."""
+    return (
+        df.head(preview_rows).to_markdown()
+        + f"\n\n_Showing {preview_rows} of {len(df):,} rows × {len(df.columns)} columns."
+        + " Browse every page in the result table below, or download it._"
+    )
+
+
+def export(df, path_without_extension):
+    """Write CSV and Parquet copies of a result; returns their paths."""
+    csv_path = f"{path_without_extension}.csv"
+    parquet_path = f"{path_without_extension}.parquet"
+    df.to_csv(csv_path, index=False)
+    # Parquet needs string column names
+    df.rename(columns=str).to_parquet(parquet_path, index=False)
+    return [csv_path, parquet_path]
+
+
+class ExportDirectory:
+    """A directory of exported results, kept to the least recently used with a TTL.
+
+    File modification times are the clock, so exports left by earlier runs or
+    by other processes on the same disk expire too; paging through an export
+    counts as a use.
+    """
+
+    def __init__(self, directory, ttl, max_exports=TABLE_MAX_EXPORTS, prefix="table"):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_exports = max_exports
+        self.prefix = prefix
+        self._lock = threading.Lock()
+
+    def new_path(self):
+        """A fresh path without extension for export(), after expiring old exports."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.expire()
+        return os.path.join(self.directory, f"{self.prefix}_{uuid.uuid4().hex}")
+
+    def touch(self, path):
+        """Mark the export that path belongs to as used now."""
+        stem = os.path.splitext(path)[0]
+        for extension in (".csv", ".parquet"):
+            try:
+                os.utime(stem + extension)
+            except OSError:
+                pass
+
+    def expire(self):
+        """Delete exports older than the TTL and the least recently used beyond max_exports."""
+        with self._lock:
+            exports = {}
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.startswith(f"{self.prefix}_"):
+                        stem = os.path.splitext(entry.path)[0]
+                        files, used = exports.get(stem, ([], 0.0))
+                        exports[stem] = (files + [entry.path], max(used, entry.stat().st_mtime))
+            now = time.time()
+            newest_first = sorted(exports.values(), key=lambda export: export[1], reverse=True)
+            removed = 0
+            for i, (files, used) in enumerate(newest_first):
+                if i < self.max_exports and now - used < self.ttl:
+                    continue
+                for path in files:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                removed += 1
+        return removed
+
+
+class PageReader:
+    """Pages of exported Parquet results, keeping the last few loaded."""
+
+    def __init__(self, max_tables=TABLE_CACHE_SIZE):
+        self.max_tables = max_tables
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _table(self, path):
+        with self._lock:
+            df = self._tables.get(path)
+            if df is not None:
+                self._tables.move_to_end(path)
+                return df
+        df = pd.read_parquet(path)
+        with self._lock:
+            self._tables[path] = df
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+        return df
+
+    def page(self, path, number, page_size=TABLE_PAGE_SIZE):
+        """Rows of page `number` (1-based, clamped) and the page count."""
+        df = self._table(path)
+        pages = max(1, -(-len(df) // page_size))
+        number = min(max(int(number or 1), 1), pages)
+        start = (number - 1) * page_size
+        return df.iloc[start:start + page_size], number, pages
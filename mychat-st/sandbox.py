@@ -0,0 +1,334 @@
+"""Sandboxed execution of PandasAI-generated code in pre-forked worker processes.
+
+Generated code (PandasAI's own runs, its corrections, and code re-run from
+the code cache) executes in a small pool of worker processes instead of the
+Gradio process, each run under limits:
+
+- CPU time (SANDBOX_CPU_SECONDS, via RLIMIT_CPU)
+- extra memory (SANDBOX_MEMORY_MB, via RLIMIT_AS on top of what the worker
+  already uses)
+- wall-clock time (SANDBOX_TIMEOUT_SECONDS); a worker that overruns it is
+  killed and replaced
+
+so a pathological snippet (a huge cross join, an endless loop) fails on its
+own instead of stalling a shared worker thread and everyone queued behind
+it. Workers keep a copy of every view snapshot they were sent and get a new
+one only when the snapshot changes. CPU and memory limits need Linux (the
+resource module); elsewhere only the wall-clock limit applies.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import weakref
+from contextlib import contextmanager
+
+import pandas as pd
+from prometheus_client import Counter
+
+from code_cache import CodeExecutionError, execute_code, run_code
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", 4))
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", 10))
+SANDBOX_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", 30))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", 1024))
+
+RUNS = Counter("assistant_sandbox_runs_total", "Generated code runs in the sandbox by outcome", ["outcome"])
+
+logger = logging.getLogger(__name__)
+
+
+class SandboxLimitError(CodeExecutionError):
+    """Generated code hit a CPU, memory or wall-clock limit."""
+
+
+class _CpuLimit(Exception):
+    pass
+
+
+def _cpu_exceeded(signum, frame):
+    raise _CpuLimit()
+
+
+def _address_space():
+    """Bytes of address space this process uses, or None where unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _set_soft_limit(kind, soft):
+    _, hard = resource.getrlimit(kind)
+    if hard == resource.RLIM_INFINITY or soft <= hard:
+        resource.setrlimit(kind, (soft, hard))
+
+
+@contextmanager
+def _limits(cpu_seconds, memory_mb):
+    """Apply the per-run CPU and memory limits relative to current usage."""
+    if resource is None:
+        yield
+        return
+    saved = {kind: resource.getrlimit(kind) for kind in (resource.RLIMIT_CPU, resource.RLIMIT_AS)}
+    if cpu_seconds:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        _set_soft_limit(resource.RLIMIT_CPU, int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1)
+    used = _address_space() if memory_mb else None
+    if used is not None:
+        _set_soft_limit(resource.RLIMIT_AS, used + memory_mb * 2**20)
+    try:
+        yield
+    finally:
+        for kind, limits in saved.items():
+            resource.setrlimit(kind, limits)
+
+
+def _worker(conn, cpu_seconds, memory_mb):
+    """Worker process loop: run code against the cached frames, reply with the result."""
+    import matplotlib
+    matplotlib.use("Agg")
+
+    # Ctrl-C is for the parent; it shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _cpu_exceeded)
+    frames = {}
+    while True:
+        try:
+            code, keys, new_frames, stale, chart_path = conn.recv()
+        except (EOFError, OSError):
+            return
+        for key in stale:
+            frames.pop(key, None)
+        frames.update(new_frames)
+        try:
+            with _limits(cpu_seconds, memory_mb):
+                reply = ("ok", execute_code(code, [frames[key] for key in keys], chart_path))
+        except CodeExecutionError as e:
+            cause = e.__cause__
+            if isinstance(cause, _CpuLimit):
+                reply = ("cpu_limit", f"Generated code used more than {cpu_seconds}s of CPU time")
+            elif isinstance(cause, MemoryError):
+                reply = ("memory_limit", f"Generated code used more than {memory_mb} MB of memory")
+            else:
+                reply = ("error", str(e))
+        except _CpuLimit:
+            reply = ("cpu_limit", f"Generated code used more than {cpu_seconds}s of CPU time")
+        except MemoryError:
+            reply = ("memory_limit", f"Generated code used more than {memory_mb} MB of memory")
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # e.g. a result that can't be pickled
+            conn.send(("error", f"Result could not be returned: {e}"))
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        # Keys of the frames this worker holds
+        self.frames = set()
+
+
+class SandboxPool:
+    """Pre-forked worker processes that run generated code under limits."""
+
+    def __init__(self, workers=SANDBOX_WORKERS, cpu_seconds=SANDBOX_CPU_SECONDS,
+                 timeout_seconds=SANDBOX_TIMEOUT_SECONDS, memory_mb=SANDBOX_MEMORY_MB):
+        self.workers = workers
+        self.cpu_seconds = cpu_seconds
+        self.timeout_seconds = timeout_seconds
+        self.memory_mb = memory_mb
+        # Fork where available so workers don't re-import the Gradio app module
+        method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+        self._context = multiprocessing.get_context(method)
+        self._idle = queue.Queue()
+        self._all = []
+        # id(DataFrame) -> key, for DataFrames that are still alive
+        self._keys = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+        self.outcomes = {}
+        self.restarts = 0
+
+    def _spawn(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker,
+            args=(child_conn, self.cpu_seconds, self.memory_mb),
+            name="sandbox",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def start(self):
+        """Fork the workers. Call before the web server starts its threads."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for _ in range(self.workers):
+                worker = self._spawn()
+                self._all.append(worker)
+                self._idle.put(worker)
+
+    def _replace(self, worker):
+        worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+        replacement = self._spawn()
+        with self._lock:
+            self._all[self._all.index(worker)] = replacement
+            self.restarts += 1
+        return replacement
+
+    def _forget(self, df_id):
+        with self._lock:
+            self._keys.pop(df_id, None)
+
+    def _key(self, df):
+        """A stable key for a DataFrame while it is alive."""
+        with self._lock:
+            key = self._keys.get(id(df))
+            if key is None:
+                key = self._keys[id(df)] = next(self._counter)
+                weakref.finalize(df, self._forget, id(df))
+            return key
+
+    def _count(self, outcome):
+        RUNS.labels(outcome).inc()
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def execute(self, code, dfs, chart_path=None):
+        """Run code against dfs in a worker and return its `result` dict (see code_cache.execute_code)."""
+        self.start()
+        if isinstance(dfs, pd.DataFrame):
+            dfs = [dfs]
+        keys = [self._key(df) for df in dfs]
+        with self._lock:
+            live = set(self._keys.values())
+        worker = self._idle.get()
+        try:
+            new_frames = {key: df for key, df in zip(keys, dfs) if key not in worker.frames}
+            stale = worker.frames - live
+            try:
+                worker.conn.send((code, keys, new_frames, stale, chart_path))
+                worker.frames = (worker.frames - stale) | set(keys)
+                if not worker.conn.poll(self.timeout_seconds):
+                    worker = self._replace(worker)
+                    self._count("timeout")
+                    raise SandboxLimitError(f"Generated code ran longer than {self.timeout_seconds:g}s")
+                outcome, payload = worker.conn.recv()
+            except (EOFError, OSError):
+                # Killed outside our limits, e.g. by the OOM killer
+                worker = self._replace(worker)
+                self._count("crashed")
+                raise SandboxLimitError("Generated code crashed its sandbox worker")
+        finally:
+            self._idle.put(worker)
+        self._count(outcome)
+        if outcome == "ok":
+            return payload
+        if outcome.endswith("_limit"):
+            logger.warning("Generated code stopped: %s", payload)
+            raise SandboxLimitError(payload)
+        raise CodeExecutionError(payload)
+
+    def run_code(self, code, dfs, chart_path=None):
+        """code_cache.run_code in a worker."""
+        return run_code(code, dfs, chart_path, self.execute)
+
+    def stats(self):
+        with self._lock:
+            workers = list(self._all)
+            return {
+                "workers": len(workers),
+                "alive": sum(1 for worker in workers if worker.process.is_alive()),
+                "busy": len(workers) - self._idle.qsize(),
+                "runs": dict(self.outcomes),
+                "restarts": self.restarts,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._all = self._all, []
+            self._started = False
+        for worker in workers:
+            worker.process.kill()
+            worker.conn.close()
+
+
+class SandboxRoutingError(RuntimeError):
+    """The installed PandasAI can't be routed through the sandbox."""
+
+
+def _pandasai_code_execution():
+    try:
+        from pandasai.pipelines.chat.code_execution import CodeExecution
+    except ImportError as e:
+        raise SandboxRoutingError(
+            f"PandasAI's CodeExecution step was not found ({e}); the sandbox supports PandasAI 2.x "
+            "(see requirements.txt). Set SANDBOX_WORKERS=0 to run generated code in-process."
+        ) from e
+    return CodeExecution
+
+
+def check_pandasai():
+    """Raise SandboxRoutingError at startup if route_pandasai can't work with the installed PandasAI."""
+    _pandasai_code_execution()
+
+
+def _no_retry_on_limits(retry_run_code):
+    """Wrap a step's _retry_run_code so limit errors end the chat instead of asking the LLM for a fix."""
+    def retry(*args, **kwargs):
+        error = next((a for a in (*args, *kwargs.values()) if isinstance(a, BaseException)), None)
+        if isinstance(error, SandboxLimitError):
+            # Corrected code would most likely hit the same limit, at the
+            # price of another LLM call and another timeout
+            raise error
+        return retry_run_code(*args, **kwargs)
+    return retry
+
+
+def route_pandasai(smart_df, pool, dfs, chart_path=None):
+    """Run the code PandasAI generates for smart_df (and its corrections) in the pool.
+
+    PandasAI has no option for this, so the execute_code method of its code
+    execution step is replaced; its validation and result parsing stay as
+    they are. Errors from the sandbox's limits are not retried with LLM
+    corrections. Charts the code saves go to chart_path when given.
+
+    This relies on PandasAI 2.x internals (requirements.txt pins
+    pandasai<3); raises SandboxRoutingError when they are missing rather
+    than silently running generated code in-process.
+    """
+    CodeExecution = _pandasai_code_execution()
+    try:
+        steps = smart_df._agent.pipeline.code_execution_pipeline._steps
+    except AttributeError as e:
+        raise SandboxRoutingError(f"Can't reach PandasAI's code execution pipeline: {e}") from e
+    routed = False
+    for step in steps:
+        if isinstance(step, CodeExecution):
+            if not hasattr(step, "_retry_run_code"):
+                raise SandboxRoutingError("PandasAI's CodeExecution step has no _retry_run_code")
+            step.execute_code = lambda code, context: pool.execute(code, dfs, chart_path)
+            step._retry_run_code = _no_retry_on_limits(step._retry_run_code)
+            routed = True
+    if not routed:
+        raise SandboxRoutingError("PandasAI's pipeline has no CodeExecution step")
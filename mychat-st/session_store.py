@@ -0,0 +1,209 @@
+"""Per-session conversation state kept outside the Gradio process.
+
+History, chart references and the last table answer of each session live in
+a pluggable store, so any replica behind a load balancer can serve the next
+turn of a conversation. SESSION_STORE selects the backend:
+
+- "memory" (default): a bounded dict in this process, as before
+- "sqlite:///path/to/sessions.db": a SQLite file shared by processes on a host
+- "redis://host:6379/0": Redis (needs the `redis` package)
+
+Every backend implements the same get/setex/delete subset of the Redis API,
+with a TTL per key, so any object implementing it (e.g. `fakeredis.FakeRedis()`)
+can stand in for a real server. Shared backends store sessions as compressed
+JSON, and chart images and table downloads alongside them so a replica that
+didn't write a file can still serve it; the in-memory backend keeps the
+objects as they are.
+"""
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", 86400))
+# Only bounds the in-memory backend; the others expire by TTL
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", 500))
+
+
+@dataclass
+class SessionState:
+    history: list = field(default_factory=list)
+    chart_paths: list = field(default_factory=list)
+    last_result: object = None
+    # Questions folded into the collapsed-history note, see chat_history.py
+    collapsed: int = 0
+    # Parquet export of the last large table, browsed in the result table
+    result_path: str = None
+
+
+def serialize(state):
+    last_result = None
+    if isinstance(state.last_result, pd.DataFrame):
+        last_result = state.last_result.to_json(orient="split", index=False, date_format="iso")
+    payload = {"h": state.history, "c": state.chart_paths, "r": last_result, "n": state.collapsed,
+               "t": state.result_path}
+    return zlib.compress(json.dumps(payload, separators=(",", ":"), default=str).encode())
+
+
+def deserialize(data):
+    payload = json.loads(zlib.decompress(data))
+    # JSON turns the Chatbot's (None, path) and (path,) file messages into lists
+    history = [
+        [user, tuple(bot) if isinstance(bot, list) else bot]
+        for user, bot in payload["h"]
+    ]
+    last_result = None
+    if payload["r"] is not None:
+        last_result = pd.read_json(io.StringIO(payload["r"]), orient="split", convert_dates=False)
+    return SessionState(
+        history=history, chart_paths=payload["c"], last_result=last_result, collapsed=payload.get("n", 0),
+        result_path=payload.get("t"),
+    )
+
+
+class MemoryBackend:
+    """Bounded LRU of keys with expiry, local to this process."""
+
+    def __init__(self, max_entries=SESSION_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def setex(self, key, ttl, value):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteBackend:
+    """Keys with expiry in a SQLite file, shared by the processes on a host."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._con = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS session_store "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._con.execute("CREATE INDEX IF NOT EXISTS session_store_expiry ON session_store (expires_at)")
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            row = self._con.execute(
+                "SELECT value FROM session_store WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def setex(self, key, ttl, value):
+        now = time.time()
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO session_store (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), now + ttl),
+            )
+            self._con.execute("DELETE FROM session_store WHERE expires_at <= ?", (now,))
+
+    def delete(self, key):
+        with self._lock:
+            self._con.execute("DELETE FROM session_store WHERE key = ?", (key,))
+
+
+def connect(url=SESSION_STORE):
+    """Backend for a SESSION_STORE value."""
+    if url == "memory":
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://")):
+        import redis
+        return redis.Redis.from_url(url)
+    raise ValueError(f"Unknown SESSION_STORE: {url}")
+
+
+class SessionStore:
+    """Loads and saves SessionState by session id."""
+
+    def __init__(self, backend=None, ttl=SESSION_TTL_SECONDS):
+        self.backend = backend if backend is not None else connect()
+        self.ttl = ttl
+        # Other processes can serve the session: serialize it and copy its files
+        self.shared = not isinstance(self.backend, MemoryBackend)
+
+    def load(self, session_id):
+        """The session's state; a fresh one if it is unknown or expired."""
+        if session_id is None:
+            return SessionState()
+        data = self.backend.get(f"session:{session_id}")
+        if data is None:
+            return SessionState()
+        if not self.shared:
+            return data
+        state = deserialize(data)
+        self._restore_files(state)
+        return state
+
+    def save(self, session_id, state):
+        if session_id is None:
+            return
+        data = serialize(state) if self.shared else state
+        self.backend.setex(f"session:{session_id}", int(self.ttl), data)
+
+    def clear(self, session_id):
+        if session_id is not None:
+            self.backend.delete(f"session:{session_id}")
+
+    def save_file(self, path):
+        """Keep a chart or download next to the sessions so any replica can serve it."""
+        if not self.shared:
+            return
+        with open(path, "rb") as f:
+            self.backend.setex(f"file:{os.path.basename(path)}", int(self.ttl), f.read())
+
+    def _restore_files(self, state):
+        paths = list(state.chart_paths)
+        for _, bot in state.history:
+            if isinstance(bot, tuple):
+                paths += [p for p in bot if isinstance(p, str)]
+        # The Parquet file the result table pages through
+        if state.result_path:
+            paths.append(state.result_path)
+        for path in paths:
+            if os.path.exists(path):
+                continue
+            data = self.backend.get(f"file:{os.path.basename(path)}")
+            if data is not None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(data)
+        if state.result_path and not os.path.exists(state.result_path):
+            # Expired from the store: there is no table left to page
+            state.result_path = None
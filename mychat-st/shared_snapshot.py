@@ -0,0 +1,205 @@
+"""Views shared between worker processes as memory-mapped Arrow files.
+
+When the app runs as several worker processes, each one would otherwise read
+and hold its own copy of every view. Instead one process (the loader, or a
+worker with SNAPSHOT_ROLE=publisher) writes each view as an Arrow IPC file in
+SHARED_SNAPSHOT_DIR, ideally on tmpfs such as /dev/shm, and the workers with
+SNAPSHOT_ROLE=reader memory-map it. The mapped pages live in the page cache
+once for all processes; columns pandas can view directly (integers without
+NULLs) stay backed by them, the rest are converted once per version.
+
+Every publish writes a new file and then atomically replaces the view's
+manifest, so readers see either the old version or the new one, never a
+partial file. Old files are pruned after a few versions; on Linux a reader
+that still maps an unlinked file keeps a valid view of it.
+
+Run `python shared_snapshot.py` to publish all views every SNAPSHOT_TTL_SECONDS.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import pyarrow as pa
+
+SHARED_SNAPSHOT_DIR = os.getenv("SHARED_SNAPSHOT_DIR", "")
+SNAPSHOT_ROLE = os.getenv("SNAPSHOT_ROLE", "reader")
+# How often readers check the manifest for a newer version
+SHARED_SNAPSHOT_POLL_SECONDS = float(os.getenv("SHARED_SNAPSHOT_POLL_SECONDS", 5))
+SHARED_SNAPSHOT_KEEP = int(os.getenv("SHARED_SNAPSHOT_KEEP", 2))
+
+ROLES = ("publisher", "reader")
+
+logger = logging.getLogger(__name__)
+
+
+def _jsonable(value):
+    """Plain Python value for a stats entry (numpy scalars, pd.NA)."""
+    if hasattr(value, "item"):
+        value = value.item()
+    try:
+        if value != value:  # NaN
+            return None
+    except TypeError:  # pd.NA
+        return None
+    return value
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class SharedSnapshots:
+    """Publishes views to, and attaches views from, a shared directory."""
+
+    def __init__(self, directory, role=SNAPSHOT_ROLE, poll_seconds=SHARED_SNAPSHOT_POLL_SECONDS,
+                 keep=SHARED_SNAPSHOT_KEEP):
+        if role not in ROLES:
+            raise ValueError(f"Unknown snapshot role: {role}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.role = role
+        self.poll_seconds = poll_seconds
+        self.keep = max(keep, 1)
+        self._attached = {}  # name -> (version, DataFrame)
+        self._lock = threading.Lock()
+
+    def _manifest_path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    def manifest(self, name):
+        """The current manifest of a view, or None if it was never published."""
+        try:
+            with open(self._manifest_path(name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def publish(self, name, df, stats):
+        """Write df as the next version of a view and swap the manifest to it."""
+        version = time.time_ns()
+        filename = f"{name}-{version}.arrow"
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        def write_table(path):
+            with pa.OSFile(path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+        def write_manifest(path):
+            with open(path, "w") as f:
+                json.dump({
+                    "version": version,
+                    "file": filename,
+                    "published_at": time.time(),
+                    "stats": {key: _jsonable(value) for key, value in stats.items()},
+                }, f)
+
+        _write_atomic(os.path.join(self.directory, filename), write_table)
+        _write_atomic(self._manifest_path(name), write_manifest)
+        self._prune(name)
+        logger.info("Published %s version %s (%.2f MB)", name, version, table.nbytes / 2**20)
+        return version
+
+    def _prune(self, name):
+        prefix = f"{name}-"
+        files = sorted(
+            f for f in os.listdir(self.directory)
+            if f.startswith(prefix) and f.endswith(".arrow")
+        )
+        for filename in files[:-self.keep]:
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except FileNotFoundError:
+                pass
+
+    def attach(self, name):
+        """The latest published version of a view, or None if there is none.
+
+        Returns the same DataFrame object while the version is unchanged.
+        The published stats travel in df.attrs so readers don't recompute them.
+        """
+        for _ in range(3):
+            manifest = self.manifest(name)
+            if manifest is None:
+                return None
+            with self._lock:
+                attached = self._attached.get(name)
+            if attached and attached[0] == manifest["version"]:
+                return attached[1]
+            try:
+                source = pa.memory_map(os.path.join(self.directory, manifest["file"]), "r")
+            except FileNotFoundError:
+                # Pruned between reading the manifest and mapping it; re-read
+                continue
+            table = pa.ipc.open_file(source).read_all()
+            df = table.to_pandas(split_blocks=True)
+            df.attrs["published_stats"] = manifest["stats"]
+            df.attrs["raw_memory_bytes"] = manifest["stats"].get("raw_memory_bytes")
+            with self._lock:
+                self._attached[name] = (manifest["version"], df)
+            return df
+        return None
+
+    def stats(self):
+        with self._lock:
+            attached = {name: version for name, (version, _) in self._attached.items()}
+        return {"role": self.role, "directory": self.directory, "attached_versions": attached}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import mysql.connector
+    import pandas as pd
+    from dotenv import load_dotenv
+
+    import tracing
+    from snapshot import COMPACT_DTYPES, SNAPSHOT_TTL_SECONDS, compact_dtypes, compute_stats
+    from views import VIEWS
+
+    parser = argparse.ArgumentParser(description="Publish the views to SHARED_SNAPSHOT_DIR for the app workers")
+    parser.add_argument("--once", action="store_true", help="publish once and exit")
+    parser.add_argument("--interval", type=float, default=SNAPSHOT_TTL_SECONDS, help="seconds between publishes")
+    args = parser.parse_args()
+
+    load_dotenv()
+    tracing.configure_logging()
+    directory = os.getenv("SHARED_SNAPSHOT_DIR")
+    if not directory:
+        raise SystemExit("Set SHARED_SNAPSHOT_DIR, e.g. /dev/shm/kingslake-snapshots")
+    shared = SharedSnapshots(directory, role="publisher")
+
+    def read(query):
+        conn = mysql.connector.connect(
+            host=os.getenv("DB_HOST"),
+            database=os.getenv("DB_NAME"),
+            user=os.getenv("DB_USER"),
+            password=os.getenv("DB_PASSWORD"),
+        )
+        try:
+            return pd.read_sql(query, conn)
+        finally:
+            conn.close()
+
+    while True:
+        for spec in VIEWS:
+            try:
+                df = read(spec.query)
+                if COMPACT_DTYPES:
+                    raw = int(df.memory_usage(deep=True).sum())
+                    df = compact_dtypes(df)
+                    df.attrs["raw_memory_bytes"] = raw
+                shared.publish(spec.name, df, compute_stats(df))
+            except Exception as e:
+                logger.error("Could not publish %s: %s", spec.name, e)
+        if args.once:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,168 @@
+"""Cached data snapshots with precomputed summary statistics.
+
+The view is read once per snapshot and its summary statistics (row counts,
+NULL counts, skill rate range and distribution) are computed at load time,
+so diagnostics and the data-info panel are lookups instead of table scans.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+SNAPSHOT_TTL_SECONDS = float(os.getenv("SNAPSHOT_TTL_SECONDS", 300))
+COMPACT_DTYPES = os.getenv("COMPACT_DTYPES", "1") == "1"
+# Text columns become categoricals when distinct values are at most this share of rows
+CATEGORY_MAX_RATIO = float(os.getenv("CATEGORY_MAX_RATIO", 0.5))
+# Integer columns never go below this width, so arithmetic in generated code
+# (e.g. skill_rate * 10) doesn't silently overflow an int8
+COMPACT_MIN_INT_BITS = int(os.getenv("COMPACT_MIN_INT_BITS", 16))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Snapshot:
+    df: object
+    version: int
+    loaded_at: float
+    stats: dict = field(default_factory=dict)
+
+    def is_stale(self, ttl):
+        return time.time() - self.loaded_at >= ttl
+
+
+def compute_stats(df):
+    """Summary statistics for a view, computed once per snapshot.
+
+    Skill rate figures are included for views that have a skill_rate column.
+    Stats published alongside a shared snapshot are reused as they are.
+    """
+    published = df.attrs.get("published_stats")
+    if published is not None:
+        return dict(published)
+    memory_bytes = int(df.memory_usage(deep=True).sum())
+    stats = {
+        "total_rows": len(df),
+        "memory_bytes": memory_bytes,
+        # Footprint as read from the database, before compact_dtypes
+        "raw_memory_bytes": df.attrs.get("raw_memory_bytes", memory_bytes),
+    }
+    if "skill_rate" in df.columns:
+        rates = df["skill_rate"]
+        non_null = int(rates.notna().sum())
+        stats.update({
+            "rows_with_skill_rate": non_null,
+            "null_skill_rates": len(df) - non_null,
+            "unique_skill_rates": int(rates.nunique()),
+            "skill_rate_min": rates.min(),
+            "skill_rate_max": rates.max(),
+            "skill_rate_counts": rates.value_counts().head(10).to_string(),
+        })
+    return stats
+
+
+def _narrow_int(values, min_bits):
+    """Narrowest signed integer dtype name for values, at least min_bits wide."""
+    bits = max(pd.to_numeric(values, downcast="integer").dtype.itemsize * 8, min_bits)
+    return f"int{bits}"
+
+
+def compact_dtypes(df, category_max_ratio=CATEGORY_MAX_RATIO, min_int_bits=COMPACT_MIN_INT_BITS):
+    """Downcast a freshly read view to compact dtypes.
+
+    Repeated text columns (employee and skill names repeat once per
+    employee-skill row) become categoricals, integers take the narrowest
+    integer type (down to min_int_bits), and float columns that only hold
+    whole numbers plus NULLs (how `pd.read_sql` returns a nullable INT like
+    skill_rate) become the matching nullable integer type.
+    """
+    compact = {}
+    for column in df.columns:
+        series = df[column]
+        # object under pandas 2, StringDtype under pandas 3
+        if pd.api.types.is_string_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            non_null = series.dropna()
+            if len(non_null) and non_null.map(type).eq(str).all() and \
+                    series.nunique() <= category_max_ratio * len(series):
+                series = series.astype("category")
+        elif pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+            if len(series):
+                series = series.astype(_narrow_int(series, min_int_bits))
+        elif pd.api.types.is_float_dtype(series):
+            non_null = series.dropna()
+            if len(non_null) and (non_null % 1 == 0).all() and non_null.abs().max() < 2**63:
+                series = series.astype(_narrow_int(non_null.astype("int64"), min_int_bits).capitalize())
+        compact[column] = series
+    return pd.DataFrame(compact, index=df.index)
+
+
+def memory_report(name, before, after):
+    """Log how much a view shrank after compaction."""
+    saved = 100 * (1 - after / before) if before else 0.0
+    logger.info(
+        "%s: %.2f MB -> %.2f MB after compacting dtypes (%.0f%% smaller)",
+        name, before / 2**20, after / 2**20, saved,
+    )
+
+
+class SnapshotCache:
+    """Holds the current snapshot and reloads it when older than the TTL.
+
+    A TTL of 0 reloads on every call, matching a fresh read per request.
+    """
+
+    def __init__(self, loader, ttl=SNAPSHOT_TTL_SECONDS, stats=compute_stats, on_load=None):
+        self._loader = loader
+        self._stats = stats
+        # Called with each new version, under the cache lock; keep it quick
+        self._on_load = on_load
+        self.ttl = ttl
+        self._snapshot = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is not None and not snapshot.is_stale(self.ttl):
+            return snapshot
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.is_stale(self.ttl):
+                snapshot = self._load()
+            return snapshot
+
+    def refresh(self):
+        """Reload the snapshot now, regardless of its age."""
+        with self._lock:
+            return self._load()
+
+    def invalidate(self):
+        """Drop the snapshot so the next get() reloads it."""
+        with self._lock:
+            self._snapshot = None
+
+    def current(self):
+        """The loaded snapshot, or None, without triggering a load."""
+        return self._snapshot
+
+    def _load(self):
+        df = self._loader()
+        if self._snapshot is not None and df is self._snapshot.df:
+            # The loader handed back what we already have (e.g. the shared
+            # version is unchanged): keep the version, restart the TTL
+            self._snapshot.loaded_at = time.time()
+            return self._snapshot
+        self._version += 1
+        self._snapshot = Snapshot(
+            df=df,
+            version=self._version,
+            loaded_at=time.time(),
+            stats=self._stats(df),
+        )
+        if self._on_load is not None:
+            self._on_load(self._snapshot)
+        return self._snapshot
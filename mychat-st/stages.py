@@ -0,0 +1,178 @@
+"""Stage executors for the query pipeline.
+
+A turn is split into stages (speech recognition, database reads, LLM calls),
+each with its own executor and worker limit, so CPU-bound Whisper inference
+never competes with I/O-bound database and LLM calls for the same threads.
+Each stage also bounds its queue: a task submitted to a stage that already
+has <STAGE>_MAX_QUEUE tasks waiting is refused with admission.Busy, so a
+burst is turned away instead of queueing for minutes.
+"""
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from prometheus_client import Gauge
+
+import admission
+import profiling
+import tracing
+
+ASR_MODEL = os.getenv("ASR_MODEL", "openai/whisper-base")
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", 1))
+DB_WORKERS = int(os.getenv("DB_WORKERS", 8))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", 16))
+# Tasks allowed to wait for a worker, per stage (0: unbounded)
+ASR_MAX_QUEUE = int(os.getenv("ASR_MAX_QUEUE", 8))
+DB_MAX_QUEUE = int(os.getenv("DB_MAX_QUEUE", 32))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 32))
+
+STAGE_QUEUED = Gauge("assistant_stage_queued", "Tasks waiting for a stage worker", ["stage"])
+
+# Set inside each ASR worker process by _init_asr_worker
+_speech_pipe = None
+
+
+def _init_asr_worker(model):
+    """Load the Whisper pipeline once per ASR worker process."""
+    global _speech_pipe
+    from transformers import pipeline
+    _speech_pipe = pipeline("automatic-speech-recognition", model)
+
+
+def _transcribe(audio_path):
+    return _speech_pipe(audio_path)["text"]
+
+
+def _transcribe_profiled(audio_path, profile_path):
+    """_transcribe under cProfile, dumped to profile_path for the parent to merge."""
+    import cProfile
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        return _transcribe(audio_path)
+    finally:
+        profile.disable()
+        os.makedirs(os.path.dirname(profile_path) or ".", exist_ok=True)
+        profile.dump_stats(profile_path)
+
+
+def _ping():
+    return True
+
+
+class Stage:
+    """An executor with a fixed worker limit, a pending-task counter and a queue limit."""
+
+    def __init__(self, name, max_workers, make_executor, threads=True, max_queue=0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._make_executor = make_executor
+        # Tasks of thread stages run in the submitter's context (request ID,
+        # trace, profile); process stages can't carry it across
+        self.threads = threads
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._make_executor(self.max_workers)
+            return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        executor = self.executor
+        if self.threads:
+            fn, args = contextvars.copy_context().run, (profiling.call, fn) + args
+        with self._lock:
+            if self.max_queue and self._pending >= self.max_workers + self.max_queue:
+                raise admission.Busy(f"{self.name}_queue_full")
+            self._pending += 1
+            self._export_queued()
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._task_done(None)
+            raise
+        future.add_done_callback(self._task_done)
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn on this stage's executor and block until it finishes."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _task_done(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self._export_queued()
+
+    def _export_queued(self):
+        STAGE_QUEUED.labels(self.name).set(max(0, self._pending - self.max_workers))
+
+    def stats(self):
+        with self._lock:
+            pending = self._pending
+        return {
+            "workers": self.max_workers,
+            "in_flight": min(pending, self.max_workers),
+            "queued": max(0, pending - self.max_workers),
+            "max_queue": self.max_queue or None,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _asr_executor(max_workers):
+    # Fork where available so workers don't re-import the Gradio app module
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(method),
+        initializer=_init_asr_worker,
+        initargs=(ASR_MODEL,),
+    )
+
+
+def _thread_executor(name):
+    return lambda max_workers: ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+
+ASR = Stage("asr", ASR_WORKERS, _asr_executor, threads=False, max_queue=ASR_MAX_QUEUE)
+DB = Stage("db", DB_WORKERS, _thread_executor("db"), max_queue=DB_MAX_QUEUE)
+LLM = Stage("llm", LLM_WORKERS, _thread_executor("llm"), max_queue=LLM_MAX_QUEUE)
+
+STAGES = {stage.name: stage for stage in (ASR, DB, LLM)}
+
+
+def start():
+    """Start the ASR worker processes and load Whisper before serving.
+
+    Call this before the web server spins up its threads so the workers are
+    forked from a quiet parent process.
+    """
+    ASR.run(_ping)
+
+
+def transcribe(audio_path):
+    """Transcribe an audio file on the ASR process pool."""
+    request_profile = profiling.active()
+    with tracing.span("asr"):
+        if request_profile is None:
+            return ASR.run(_transcribe, audio_path)
+        # The worker process profiles Whisper and leaves the stats in a file
+        profile_path = os.path.abspath(request_profile.path(f".asr{len(request_profile.files)}.prof"))
+        request_profile.add_file(profile_path)
+        return ASR.run(_transcribe_profiled, audio_path, profile_path)
+
+
+def stage_stats():
+    """Return queue depth and in-flight counts for every stage."""
+    return {name: stage.stats() for name, stage in STAGES.items()}
@@ -0,0 +1,102 @@
+import pytest
+
+import admission
+from admission import Busy, CircuitBreaker, RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_rate_limiter_allows_a_burst_then_refills(clock):
+    limiter = RateLimiter(per_minute=60, burst=3)
+    for _ in range(3):
+        limiter.check("alice")
+    with pytest.raises(Busy) as busy:
+        limiter.check("alice")
+    assert busy.value.reason == "rate_limited" and busy.value.retry_after == 1
+    limiter.check("bob")
+
+    clock[0] += 1
+    limiter.check("alice")
+    with pytest.raises(Busy):
+        limiter.check("alice")
+
+
+def test_rate_limiter_disabled():
+    limiter = RateLimiter(per_minute=0, burst=1)
+    for _ in range(5):
+        limiter.check("alice")
+    RateLimiter(per_minute=60, burst=0).check(None)
+
+
+def test_rate_limiter_forgets_the_least_recent_users(clock):
+    limiter = RateLimiter(per_minute=60, burst=1, max_users=2)
+    for user in ["a", "b", "c"]:
+        limiter.check(user)
+    assert limiter.stats()["users"] == 2
+    limiter.check("a")
+
+
+def breaker(**kwargs):
+    options = dict(window=4, min_calls=4, error_rate=0.5, latency_seconds=10, cooldown_seconds=30)
+    return CircuitBreaker("test", **{**options, **kwargs})
+
+
+def test_circuit_opens_on_error_rate(clock):
+    circuit = breaker()
+    for ok in [True, False, True]:
+        circuit.check()
+        circuit.record(1, ok)
+    assert circuit.stats()["state"] == "closed"
+    circuit.record(1, False)
+    assert circuit.stats()["state"] == "open"
+    with pytest.raises(Busy) as busy:
+        circuit.check()
+    assert busy.value.reason == "circuit_open" and busy.value.retry_after == 30
+
+
+def test_circuit_opens_on_slow_calls(clock):
+    circuit = breaker()
+    for _ in range(4):
+        circuit.record(12, True)
+    assert circuit.stats()["state"] == "open"
+
+
+def test_half_open_trial_closes_or_reopens(clock):
+    circuit = breaker()
+    for _ in range(4):
+        circuit.record(1, False)
+    clock[0] += 30
+
+    circuit.check()
+    with pytest.raises(Busy):
+        circuit.check()
+    circuit.record(1, False)
+    assert circuit.stats()["state"] == "open" and circuit.opened == 2
+
+    clock[0] += 30
+    circuit.check()
+    circuit.record(1, True)
+    assert circuit.stats()["state"] == "closed"
+    circuit.check()
+
+
+def test_cancelled_trial_lets_another_through(clock):
+    circuit = breaker()
+    for _ in range(4):
+        circuit.record(1, False)
+    clock[0] += 30
+    circuit.check()
+    circuit.cancel()
+    circuit.check()
+
+
+def test_busy_message():
+    busy = Busy("llm_queue_full", 2.1)
+    assert busy.retry_after == 3
+    assert busy.message == admission.BUSY_MESSAGE.format(seconds=3)
+    assert "try again in 1 seconds" in Busy("rate_limited", 0).message
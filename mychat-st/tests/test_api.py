@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import admission  # noqa: E402
+from api import create_api  # noqa: E402
+
+
+def make_client(admit=lambda session_id, client: None):
+    transcribed = []
+
+    def answer(question, session_id, profile, client):
+        return {"type": "text", "content": f"answer to {question}"}
+
+    def transcribe(path):
+        transcribed.append(path)
+        return "transcribed question"
+
+    api = create_api(answer, transcribe, lambda: {}, [], admit=admit)
+    return TestClient(api), transcribed
+
+
+def test_query():
+    client, _ = make_client()
+    body = client.post("/api/v1/query", json={"question": "top employees"}).json()
+    assert body["text"] == "answer to top employees"
+
+
+def test_rate_limited_audio_is_never_transcribed():
+    def admit(session_id, client):
+        raise admission.Busy("rate_limited", 7)
+
+    client, transcribed = make_client(admit)
+    response = client.post("/api/v1/query/audio", files={"audio": ("q.wav", b"RIFF", "audio/wav")})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert transcribed == []
+
+
+def test_websocket_survives_a_malformed_frame():
+    client, _ = make_client()
+    with client.websocket_connect("/api/v1/ws") as ws:
+        ws.send_text("{not json")
+        assert ws.receive_json()["event"] == "error"
+        ws.send_text('["a list"]')
+        assert ws.receive_json()["event"] == "error"
+        ws.send_json({"question": "count by skill"})
+        assert ws.receive_json()["event"] == "started"
+        result = ws.receive_json()
+        assert result["event"] == "result" and result["text"] == "answer to count by skill"
+
+
+def test_view_refresh_needs_the_admin_token(monkeypatch):
+    refreshed = []
+
+    def refresh(view):
+        if view == "missing":
+            raise KeyError(view)
+        refreshed.append(view)
+        return [view or "employee_skill_view"]
+
+    api = create_api(lambda *args: {}, lambda path: "", lambda: {}, [], refresh=refresh)
+    client = TestClient(api)
+    monkeypatch.setattr("api.ADMIN_TOKEN", "")
+    assert client.post("/api/v1/views/refresh").status_code == 403
+
+    monkeypatch.setattr("api.ADMIN_TOKEN", "secret")
+    assert client.post("/api/v1/views/refresh", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    admin = {"Authorization": "Bearer secret"}
+    assert client.post("/api/v1/views/refresh", headers=admin).json() == {"refreshed": ["employee_skill_view"]}
+    assert client.post("/api/v1/views/refresh", json={"view": "missing"}, headers=admin).status_code == 404
+    assert refreshed == [None]
@@ -0,0 +1,42 @@
+from chat_history import PayloadStats, compact, payload_bytes, preview, split_turns
+
+LONG = "\n".join(f"| row {i} |" for i in range(400))
+
+
+def history(turns):
+    return [(f"question {i}", f"answer {i}") for i in range(turns)]
+
+
+def test_split_turns_keeps_follow_on_messages_with_their_question():
+    turns = split_turns([("q1", "a1"), ("", "chart note"), ("q2", "a2")])
+    assert turns == [[("q1", "a1"), ("", "chart note")], [("q2", "a2")]]
+
+
+def test_old_turns_collapse_into_one_note():
+    compacted, collapsed = compact(history(5), max_turns=2, full_turns=2)
+    assert collapsed == 3
+    assert compacted[0][0] is None and "3 earlier questions collapsed" in compacted[0][1]
+    assert compacted[1:] == [("question 3", "answer 3"), ("question 4", "answer 4")]
+
+
+def test_collapsed_count_carries_over():
+    compacted, collapsed = compact(history(5), max_turns=2, full_turns=2)
+    compacted, collapsed = compact(compacted + [("question 5", "answer 5")], collapsed, max_turns=2, full_turns=2)
+    assert collapsed == 4
+    assert "4 earlier questions collapsed" in compacted[0][1]
+    assert [user for user, _ in compacted[1:]] == ["question 4", "question 5"]
+
+
+def test_long_messages_outside_the_full_window_are_previewed():
+    compacted, _ = compact([("q1", LONG), ("q2", LONG)], max_turns=5, full_turns=1)
+    assert compacted[0][1] == preview(LONG)
+    assert "392 more lines hidden" in compacted[0][1]
+    assert compacted[1][1] == LONG
+
+
+def test_payload_stats():
+    stats = PayloadStats()
+    assert payload_bytes("abc") == len(b'["abc"]')
+    stats.record(payload_bytes("abc"))
+    stats.record(100)
+    assert stats.stats() == {"turns": 2, "avg_bytes": 53, "max_bytes": 100, "last_bytes": 100}
@@ -0,0 +1,56 @@
+import os
+
+import pandas as pd
+import pytest
+
+from code_cache import CodeCache, CodeExecutionError, retarget_chart, run_code
+
+DF = pd.DataFrame({"skill_name": ["Sewing", "Cutting", "Sewing"], "skill_rate": [5, 3, 4]})
+
+COUNT_CODE = 'result = {"type": "number", "value": len(dfs[0])}'
+CHART_CODE = """
+dfs[0].groupby("skill_name")["skill_rate"].mean().plot(kind="bar")
+plt.savefig("/tmp/exports/charts/temp_chart.png")
+result = {"type": "plot", "value": "/tmp/exports/charts/temp_chart.png"}
+"""
+
+
+def test_run_code_returns_the_result_value():
+    assert run_code(COUNT_CODE, DF) == 3
+    assert run_code("def analyze_data(dfs):\n    return {'type': 'number', 'value': 7}", [DF]) == 7
+
+
+def test_generated_code_cannot_modify_the_snapshot():
+    run_code('dfs[0]["skill_rate"] = 0\nresult = {"type": "number", "value": 0}', DF)
+    assert list(DF["skill_rate"]) == [5, 3, 4]
+
+
+@pytest.mark.parametrize("code", ["raise ValueError('boom')", "x = 1", 'result = {"type": "plot", "value": "/nope.png"}'])
+def test_unusable_code_raises(code):
+    with pytest.raises(CodeExecutionError):
+        run_code(code, DF)
+
+
+def test_charts_are_saved_at_the_requested_path(tmp_path):
+    path = str(tmp_path / "chart.png")
+    assert retarget_chart(CHART_CODE, path).count(path) == 2
+    assert run_code(CHART_CODE, DF, path) == path
+    assert os.path.exists(path)
+
+
+def test_cache_reruns_code_and_drops_code_that_fails():
+    cache = CodeCache(max_size=2)
+    cache.put("How many rows?", COUNT_CODE)
+    assert "how many rows" in cache
+    assert cache.run("how many rows", DF) == 3
+    cache.put("broken", "raise ValueError('boom')")
+    assert cache.run("broken", DF) is None
+    assert "broken" not in cache
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 0, "failures": 1}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = CodeCache(max_size=2)
+    for question in ("a", "b", "c"):
+        cache.put(question, COUNT_CODE)
+    assert "a" not in cache and "b" in cache and "c" in cache
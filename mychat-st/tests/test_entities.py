@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from entities import EntityCorrector, EntityIndex, soundex
+
+DF = pd.DataFrame({
+    "employee_name": ["John Smith", "Mary Jones", "Peter Brown", None],
+    "skill_name": ["Sewing", "Overlock", "Cutting", " Sewing "],
+})
+INDEX = EntityIndex.from_frame(DF)
+
+
+@pytest.mark.parametrize("word, code", [("Robert", "R163"), ("Rupert", "R163"), ("Ashcraft", "A261"), ("Smyth", "S530"), ("", "")])
+def test_soundex(word, code):
+    assert soundex(word) == code
+
+
+@pytest.mark.parametrize("heard, fixed", [
+    ("show jon smyth over lock rates", "show John Smith Overlock rates"),
+    ("employees with sewin skill", "employees with Sewing skill"),
+    ("what skills does marry have", "what skills does Mary have"),
+])
+def test_mangled_names_are_corrected(heard, fixed):
+    assert INDEX.correct(heard)[0] == fixed
+
+
+def test_question_words_and_exact_names_are_untouched():
+    text = "Show the top 5 employees by skill rate for Sewing"
+    corrected, corrections = INDEX.correct(text)
+    assert corrected == text and corrections == []
+
+
+def test_corrections_report_what_was_heard():
+    _, corrections = INDEX.correct("jon smyth")
+    assert [(c.heard, c.name, c.kind) for c in corrections] == [("jon smyth", "John Smith", "employee")]
+
+
+def test_corrector_rebuilds_the_index_per_version():
+    corrector = EntityCorrector()
+    first = corrector.index(1, DF)
+    assert corrector.index(1, DF) is first
+    assert corrector.index(2, DF.head(1)) is not first
+
+    assert corrector.correct("jon smyth skills", 2, DF.head(1)) == "John Smith skills"
+    corrector.correct("count by skill", 2, DF.head(1))
+    stats = corrector.stats()
+    assert stats["transcripts"] == 2 and stats["corrected"] == 1
+    assert stats["names"] == 3  # John Smith, John, Sewing
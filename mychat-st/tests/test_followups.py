@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+import followups
+
+RESULT = pd.DataFrame({
+    "employee_name": ["Ann Lee", "John Smith", "Mary Jones", "Peter Brown"],
+    "skill_name": ["Sewing", "Overlock", "Sewing", "Cutting"],
+    "skill_rate": [3.0, 5.0, 4.0, None],
+})
+
+
+def answer(question, df=RESULT):
+    followup = followups.match(question, df)
+    return followup, (followups.apply(followup, df) if followup else None)
+
+
+def test_filter_and_exclude():
+    _, rows = answer("now only the Sewing ones")
+    assert list(rows["employee_name"]) == ["Ann Lee", "Mary Jones"]
+    _, rows = answer("exclude sewing")
+    assert list(rows["employee_name"]) == ["John Smith", "Peter Brown"]
+
+
+def test_filter_needs_a_value_from_the_result():
+    assert followups.match("only the Knitting ones", RESULT) is None
+
+
+def test_sort():
+    followup, rows = answer("sort that by rate descending")
+    assert followup.args["column"] == "skill_rate"
+    assert list(rows["skill_rate"][:3]) == [5.0, 4.0, 3.0]
+
+
+def test_top_ranks_by_rate():
+    _, rows = answer("top 2 of those")
+    assert list(rows["employee_name"]) == ["John Smith", "Mary Jones"]
+    _, rows = answer("bottom 1 of them")
+    assert list(rows["employee_name"]) == ["Ann Lee"]
+
+
+def test_first_keeps_the_current_order():
+    _, rows = answer("first two of those")
+    assert list(rows["employee_name"]) == ["Ann Lee", "John Smith"]
+
+
+@pytest.mark.parametrize("question", [
+    "now show the top 5 employees by skill rate",
+    "and how many employees have sewing skill",
+    "so sort employees by skill rate",
+])
+def test_a_leading_conjunction_alone_is_a_new_question(question):
+    assert followups.match(question, RESULT) is None
+
+
+def test_chart_of_the_previous_result():
+    followup = followups.match("plot that as a bar chart", RESULT)
+    assert followup.action == "chart"
+
+
+def test_result_to_keep():
+    assert followups.result_to_keep(RESULT, None) is RESULT
+    assert followups.result_to_keep("text answer", RESULT) is RESULT
+    assert followups.result_to_keep(RESULT.iloc[:0], RESULT) is None
+    assert followups.result_to_keep(RESULT, None, max_rows=2) is None
+
+
+@pytest.mark.parametrize("dtype", [object, "string", "category"])
+def test_filter_matches_any_text_dtype(dtype):
+    df = RESULT.astype({"skill_name": dtype, "employee_name": dtype})
+    _, rows = answer("just the cutting rows", df)
+    assert list(rows["employee_name"]) == ["Peter Brown"]
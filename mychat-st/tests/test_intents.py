@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+import intents
+
+DF = pd.DataFrame({
+    "employee_id": [1, 1, 2, 3],
+    "employee_name": ["John Smith", "John Smith", "Mary Jones", "Peter Brown "],
+    "skill_name": ["Sewing", "Overlock", "Sewing", " Cutting"],
+    "skill_rate": [5.0, 3.0, 4.0, None],
+})
+VOCABULARY = intents.Vocabulary(DF)
+
+
+def match(question):
+    return intents.match(question, VOCABULARY)
+
+
+@pytest.mark.parametrize("question, name, slots", [
+    ("Show the top 5 employees by skill rate", "top_by_skill_rate", {"n": 5, "skill": None}),
+    ("top ten sewing operators by rating", "top_by_skill_rate", {"n": 10, "skill": "sewing"}),
+    ("Count employees by skill", "count_by_skill", {}),
+    ("Show employees with Sewing skill", "list_rows", {"skill": "sewing", "employee": None}),
+    ("What skills does John have?", "list_rows", {"skill": None, "employee": "john smith"}),
+    ("Which employees have no skill rate", "null_skill_rates", {}),
+    ("skill rate distribution", "skill_rate_distribution", {}),
+])
+def test_match(question, name, slots):
+    intent = match(question)
+    assert intent is not None and intent.name == name
+    assert intent.slots == slots
+
+
+@pytest.mark.parametrize("question", [
+    "show employees with no sewing skill",
+    "who has never done overlock",
+    "show me Sewing employees with rate 5",
+    "list sewing operators rated above 4",
+    "how many skills does John have",
+    "average skill rate for sewing",
+    "what is the weather today",
+    "top 5 employees by skill rate excluding cutting",
+    "top 5 employees by skill rate for John",
+    "show employees with sewing skill and overlock skill",
+    "count employees by skill for sewing",
+    "skill rate distribution for sewing",
+    "top 5 employees by skill rate in 2023",
+    "show sewing employees hired last year",
+    "show only women with sewing skill",
+    "top 5 employees by skill rate ascending",
+])
+def test_partly_understood_questions_go_to_the_llm(question):
+    assert match(question) is None
+
+
+def test_chart_words_set_chart():
+    intent = match("plot the top 3 employees by skill rate as a bar chart")
+    assert intent.chart and intent.slots == {"n": 3, "skill": None}
+
+
+def test_execute_matches_names_case_and_space_insensitively():
+    result = intents.execute(match("who has cutting skill"), DF)
+    assert list(result["employee_name"]) == ["Peter Brown "]
+    top = intents.execute(match("top 2 employees by skill rate"), DF)
+    assert list(top["skill_rate"]) == [5.0, 4.0]
+
+
+def test_build_sql_is_parameterized():
+    sql, params = intents.build_sql(match("top 3 sewing employees by skill rate"), "employee_skill_view")
+    assert "LOWER(TRIM(skill_name)) = %s" in sql
+    assert params == ("sewing", 3)
+
+
+def test_render_chart_plots_nullable_ints(tmp_path):
+    pytest.importorskip("matplotlib")
+    result = pd.DataFrame({
+        "employee_name": ["John Smith", "Mary Jones"],
+        "skill_name": ["Sewing", "Sewing"],
+        "skill_rate": pd.array([5, pd.NA], dtype="Int16"),
+    })
+    path = intents.render_chart(result, "those", str(tmp_path / "chart.png"))
+    assert (tmp_path / "chart.png").stat().st_size > 0 and path.endswith("chart.png")
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pandas as pd
+
+import intents
+from planner import Planner
+
+NAMES = {
+    "skill_name": pd.DataFrame({"skill_name": ["Sewing", "Overlock"]}),
+    "employee_name": pd.DataFrame({"employee_name": ["John Smith", "Mary Jones"]}),
+}
+
+
+class FakeDB:
+    """read(sql, params) over canned results, recording the queries."""
+
+    def __init__(self, table_rows=None, view_rows=0):
+        self.table_rows = table_rows
+        self.view_rows = view_rows
+        self.queries = []
+
+    def __call__(self, sql, params):
+        self.queries.append(sql)
+        if "information_schema" in sql:
+            return pd.DataFrame({"TABLE_ROWS": [self.table_rows]})
+        if "COUNT(*)" in sql:
+            return pd.DataFrame({"row_count": [self.view_rows]})
+        return NAMES["skill_name" if "skill_name" in sql else "employee_name"]
+
+
+def planner(db, loaded=None, shared=None):
+    registry = SimpleNamespace(loaded=lambda view: loaded, shared=shared)
+    return Planner(registry, intents.FastPathRouter(), db, min_rows=1000, ttl=60)
+
+
+def test_large_view_questions_are_pushed_down():
+    plan = planner(FakeDB(view_rows=5000)).plan("Show the top 5 employees by skill rate", "employee_skills")
+    assert plan is not None and plan.intent.name == "top_by_skill_rate"
+    assert plan.view == "employee_skills" and "LIMIT" in plan.sql.upper()
+
+
+def test_names_come_from_the_database():
+    plan = planner(FakeDB(table_rows=5000)).plan("Show employees with Sewing skill", "employee_skills")
+    assert plan.intent.name == "list_rows" and plan.intent.slots["skill"] == "sewing"
+
+
+def test_small_loaded_or_shared_views_stay_in_memory():
+    question = "Count employees by skill"
+    assert planner(FakeDB(view_rows=10)).plan(question, "employee_skills") is None
+    assert planner(FakeDB(view_rows=5000), loaded=object()).plan(question, "employee_skills") is None
+    reader = SimpleNamespace(role="reader")
+    assert planner(FakeDB(view_rows=5000), shared=reader).plan(question, "employee_skills") is None
+
+
+def test_questions_without_a_template_stay_in_memory():
+    plan = planner(FakeDB(view_rows=5000))
+    assert plan.plan("Why are sewing rates dropping this year?", "employee_skills") is None
+    assert plan.stats()["in_memory"] == 1 and plan.stats()["pushed_down"] == 0
+
+
+def test_row_counts_are_cached_and_failures_fall_back():
+    db = FakeDB(view_rows=5000)
+    plan = planner(db)
+    assert plan.rows("employee_skills") == plan.rows("employee_skills") == 5000
+    assert sum("COUNT(*)" in sql for sql in db.queries) == 1
+
+    def broken(sql, params):
+        raise ConnectionError("db down")
+
+    assert planner(broken).rows("employee_skills") is None
+    assert not planner(broken).pushdown("employee_skills")
+
+
+def test_unreadable_names_fall_back_to_memory():
+    db = FakeDB(view_rows=5000)
+
+    def flaky(sql, params):
+        if "DISTINCT" in sql:
+            raise ConnectionError("db down")
+        return db(sql, params)
+
+    plan = planner(flaky)
+    assert plan.plan("Count employees by skill", "employee_skills") is None
+    assert plan.stats()["in_memory"] == 1
@@ -0,0 +1,72 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from result_pages import ExportDirectory, PageReader, export, is_large, preview_markdown
+
+DF = pd.DataFrame({"employee": [f"E{i}" for i in range(120)], "skill_rate": range(120)})
+
+
+def test_is_large():
+    assert is_large(DF, preview_rows=20)
+    assert not is_large(DF.head(20), preview_rows=20)
+
+
+def test_preview_markdown_shows_the_first_rows_only():
+    pytest.importorskip("tabulate")
+    text = preview_markdown(DF, preview_rows=5)
+    assert "E4" in text and "E5" not in text
+    assert "Showing 5 of 120 rows × 2 columns" in text
+
+
+def test_export_writes_csv_and_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    csv_path, parquet_path = export(DF.rename(columns={"skill_rate": 1}), str(tmp_path / "result"))
+    assert csv_path.endswith(".csv") and parquet_path.endswith(".parquet")
+    assert len(pd.read_csv(csv_path)) == 120
+    assert list(pd.read_parquet(parquet_path).columns) == ["employee", "1"]
+
+
+def test_pages_are_clamped(tmp_path):
+    pytest.importorskip("pyarrow")
+    _, parquet_path = export(DF, str(tmp_path / "result"))
+    reader = PageReader(max_tables=1)
+
+    rows, number, pages = reader.page(parquet_path, 2, page_size=50)
+    assert (number, pages) == (2, 3)
+    assert list(rows["employee"])[0] == "E50" and len(rows) == 50
+
+    rows, number, _ = reader.page(parquet_path, 99, page_size=50)
+    assert number == 3 and len(rows) == 20
+    assert reader.page(parquet_path, None, page_size=50)[1] == 1
+    assert reader.page(parquet_path, -4, page_size=50)[1] == 1
+
+
+def test_export_directory_keeps_recent_exports_only(tmp_path):
+    exports = ExportDirectory(str(tmp_path), ttl=3600, max_exports=2)
+    paths = []
+    for age in (30, 20, 10):
+        base = exports.new_path()
+        for extension in (".csv", ".parquet"):
+            (tmp_path / f"{os.path.basename(base)}{extension}").write_text("x")
+            os.utime(base + extension, (time.time() - age, time.time() - age))
+        paths.append(base)
+    # Paging the oldest export makes it the most recently used
+    exports.touch(paths[0] + ".parquet")
+
+    assert exports.expire() == 1
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(p) + e for p in (paths[0], paths[2]) for e in (".csv", ".parquet")
+    )
+
+
+def test_export_directory_expires_by_ttl(tmp_path):
+    exports = ExportDirectory(str(tmp_path), ttl=60)
+    old = exports.new_path() + ".csv"
+    open(old, "w").close()
+    os.utime(old, (time.time() - 120, time.time() - 120))
+    (tmp_path / "unrelated.txt").write_text("kept")
+    exports.new_path()
+    assert os.listdir(tmp_path) == ["unrelated.txt"]
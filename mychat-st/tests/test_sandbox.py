@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from code_cache import CodeExecutionError
+from sandbox import SandboxLimitError, SandboxPool, _no_retry_on_limits
+
+DF = pd.DataFrame({"skill_name": ["Sewing", "Cutting"], "skill_rate": [5, 3]})
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(workers=1, cpu_seconds=5, timeout_seconds=2, memory_mb=256)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_code_against_the_frames(pool):
+    assert pool.run_code('result = {"type": "number", "value": int(dfs[0]["skill_rate"].sum())}', DF) == 8
+
+
+def test_errors_come_back_as_code_execution_errors(pool):
+    with pytest.raises(CodeExecutionError) as error:
+        pool.run_code("raise ValueError('boom')", DF)
+    assert not isinstance(error.value, SandboxLimitError)
+
+
+def test_runaway_code_is_stopped_and_the_worker_replaced(pool):
+    restarts = pool.stats()["restarts"]
+    with pytest.raises(SandboxLimitError):
+        pool.run_code("while True:\n    pass", DF)
+    assert pool.run_code('result = {"type": "number", "value": 1}', DF) == 1
+    assert pool.stats()["alive"] == 1
+    # The 2s wall-clock limit comes before the 5s CPU limit
+    assert pool.stats()["restarts"] == restarts + 1
+
+
+def test_limit_errors_are_not_retried_with_llm_corrections():
+    corrections = []
+
+    def retry_run_code(code, context, logger, e):
+        corrections.append(e)
+        return "fixed code"
+
+    retry = _no_retry_on_limits(retry_run_code)
+    assert retry("code", None, None, CodeExecutionError("typo")) == "fixed code"
+    with pytest.raises(SandboxLimitError):
+        retry("code", None, None, SandboxLimitError("too slow"))
+    assert len(corrections) == 1
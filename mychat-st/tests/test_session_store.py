@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+
+from session_store import MemoryBackend, SessionState, SessionStore, SQLiteBackend, deserialize, serialize
+
+
+def test_serialize_round_trip():
+    state = SessionState(
+        history=[["show sewing", "| table |"], ["plot it", (None, "/tmp/chart.png")]],
+        chart_paths=["/tmp/chart.png"],
+        last_result=pd.DataFrame({"skill_name": ["Sewing"], "skill_rate": [5]}),
+        collapsed=3,
+        result_path="/tmp/table.parquet",
+    )
+    restored = deserialize(serialize(state))
+    assert restored.history == [["show sewing", "| table |"], ["plot it", (None, "/tmp/chart.png")]]
+    assert restored.last_result.equals(state.last_result)
+    assert (restored.collapsed, restored.result_path) == (3, "/tmp/table.parquet")
+
+
+def test_memory_backend_keeps_objects_and_evicts():
+    store = SessionStore(MemoryBackend(max_entries=1))
+    state = SessionState(collapsed=1)
+    store.save("a", state)
+    assert store.load("a") is state
+    store.save("b", SessionState())
+    assert store.load("a").collapsed == 0
+
+
+def test_shared_store_restores_charts_and_the_paged_table(tmp_path):
+    store = SessionStore(SQLiteBackend(str(tmp_path / "sessions.db")))
+    chart, table = tmp_path / "exports" / "chart.png", tmp_path / "exports" / "table.parquet"
+    chart.parent.mkdir()
+    chart.write_bytes(b"png")
+    table.write_bytes(b"parquet")
+    for path in (chart, table):
+        store.save_file(str(path))
+    store.save("s", SessionState(chart_paths=[str(chart)], result_path=str(table)))
+
+    # Another replica, without the files
+    os.remove(chart)
+    os.remove(table)
+    state = store.load("s")
+    assert chart.read_bytes() == b"png"
+    assert table.read_bytes() == b"parquet"
+    assert state.result_path == str(table)
+
+
+def test_shared_store_drops_a_table_that_expired(tmp_path):
+    store = SessionStore(SQLiteBackend(str(tmp_path / "sessions.db")))
+    store.save("s", SessionState(result_path=str(tmp_path / "gone.parquet")))
+    assert store.load("s").result_path is None
@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from shared_snapshot import SharedSnapshots  # noqa: E402
+
+
+def test_readers_attach_the_latest_published_version(tmp_path):
+    publisher = SharedSnapshots(str(tmp_path), role="publisher", keep=1)
+    reader = SharedSnapshots(str(tmp_path), role="reader")
+    assert reader.attach("employee_skill_view") is None
+
+    df = pd.DataFrame({"employee_id": [1, 2], "skill_name": ["Sewing", "Cutting"]})
+    publisher.publish("employee_skill_view", df, {"total_rows": 2})
+    attached = reader.attach("employee_skill_view")
+    assert attached.equals(df)
+    assert attached.attrs["published_stats"] == {"total_rows": 2}
+    # Unchanged versions come back as the same object
+    assert reader.attach("employee_skill_view") is attached
+
+    publisher.publish("employee_skill_view", df.head(1), {"total_rows": 1})
+    assert len(reader.attach("employee_skill_view")) == 1
+    assert len(list(tmp_path.glob("*.arrow"))) == 1
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_run():
+    flight = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def slow(value):
+        runs.append(value)
+        started.set()
+        release.wait(5)
+        return value * 2
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("q", slow, 21)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("q", slow, 21))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.stats()["waiting"] < 3:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert runs == [21]
+    assert sorted(results) == [(42, False), (42, True), (42, True), (42, True)]
+    assert flight.stats() == {"in_flight": 0, "waiting": 0, "calls": 1, "coalesced": 3}
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight("test")
+    assert flight.do("q", lambda: 1) == (1, False)
+    assert flight.do("q", lambda: 2) == (2, False)
+    assert flight.stats()["calls"] == 2
+
+
+def test_errors_are_raised_and_not_kept():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("q", fail)
+    assert flight.do("q", lambda: "ok") == ("ok", False)
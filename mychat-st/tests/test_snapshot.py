@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from snapshot import SnapshotCache, compact_dtypes, compute_stats
+
+
+def view(text_dtype):
+    return pd.DataFrame({
+        "employee_id": pd.Series([1, 1, 2, 2], dtype="int64"),
+        "employee_name": pd.Series(["John", "John", "Mary", "Mary"], dtype=text_dtype),
+        "skill_name": pd.Series(["Sewing", "Cutting", "Sewing", "Cutting"], dtype=text_dtype),
+        "skill_rate": [5.0, None, 4.0, 3.0],
+        "note": pd.Series(["a", "b", "c", "d"], dtype=text_dtype),
+    })
+
+
+@pytest.mark.parametrize("text_dtype", [object, "string"])
+def test_compact_dtypes(text_dtype):
+    compact = compact_dtypes(view(text_dtype))
+    assert isinstance(compact["employee_name"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact["skill_name"].dtype, pd.CategoricalDtype)
+    # Distinct on every row: a categorical would only add overhead
+    assert not isinstance(compact["note"].dtype, pd.CategoricalDtype)
+    assert compact["employee_id"].dtype == "int16"
+    assert compact["skill_rate"].dtype == "Int16"
+    assert compact["skill_rate"].isna().sum() == 1
+
+
+def test_compute_stats():
+    stats = compute_stats(view(object))
+    assert stats["total_rows"] == 4
+    assert stats["null_skill_rates"] == 1
+    assert (stats["skill_rate_min"], stats["skill_rate_max"]) == (3.0, 5.0)
+
+
+def test_cache_reloads_when_stale_and_keeps_unchanged_versions():
+    frames = [view(object)]
+    cache = SnapshotCache(lambda: frames[-1], ttl=0)
+    first = cache.get()
+    assert cache.get().version == first.version
+    frames.append(view(object))
+    assert cache.get().version == first.version + 1
@@ -0,0 +1,45 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+import stages
+import tracing
+
+
+def make_stage():
+    return stages.Stage("test", 2, lambda workers: ThreadPoolExecutor(workers))
+
+
+def worker_span():
+    with tracing.span("worker"):
+        return tracing.current()
+
+
+def test_thread_stages_run_in_the_request_context():
+    stage = make_stage()
+    with tracing.request("test", request_id="req-1") as trace:
+        seen = stage.run(worker_span)
+    assert seen is trace
+    assert [name for name, _ in trace.spans] == ["worker"]
+    assert stage.run(tracing.current) is None
+
+
+def test_worker_log_lines_carry_the_request_id():
+    def log_record():
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", (), None)
+        tracing.RequestIdFilter().filter(record)
+        return record.request_id
+
+    stage = make_stage()
+    with tracing.request("test", request_id="req-2"):
+        assert stage.run(log_record) == "req-2"
+    assert stage.run(log_record) == "-"
+
+
+def test_profiled_requests_profile_their_stage_work(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    stage = make_stage()
+    with profiling.profile("req-3", True) as request_profile:
+        active = stage.run(profiling.active)
+    assert active is request_profile
+    assert stage.run(profiling.active) is None
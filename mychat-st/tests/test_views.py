@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+from views import ViewRegistry, ViewSpec
+
+SPEC = ViewSpec(
+    name="employee_skill_view",
+    description="Employee skills",
+    columns={"employee_name": "VARCHAR", "skill_name": "VARCHAR"},
+    keywords=("employee", "skill"),
+    policy="ttl",
+    ttl=300,
+    default=True,
+)
+
+
+def frame():
+    return pd.DataFrame({"employee_name": ["John", "Mary"], "skill_name": ["Sewing", "Sewing"]})
+
+
+class Reader:
+    """A shared-snapshot reader whose manifest is published on demand."""
+
+    role = "reader"
+    poll_seconds = 0
+
+    def __init__(self):
+        self.published = None
+
+    def attach(self, name):
+        return self.published
+
+
+def test_views_load_once_and_notify_listeners():
+    loads, loaded = [], []
+    registry = ViewRegistry(lambda spec: loads.append(spec.name) or frame(), specs=[SPEC])
+    registry.on_load(lambda name, snapshot: loaded.append((name, snapshot.version)))
+    assert registry.loaded("employee_skill_view") is None
+    registry.get("employee_skill_view")
+    registry.get("employee_skill_view")
+    assert loads == ["employee_skill_view"]
+    assert loaded == [("employee_skill_view", 1)]
+    assert registry.loaded("employee_skill_view") is not None
+
+
+def test_reader_polls_the_manifest_but_not_the_database():
+    loads = []
+    reader = Reader()
+    registry = ViewRegistry(lambda spec: loads.append(spec.name) or frame(), specs=[SPEC], shared=reader)
+    first = registry.get("employee_skill_view")
+    for _ in range(5):
+        assert registry.get("employee_skill_view").version == first.version
+    assert len(loads) == 1
+    # Once a snapshot is published the reader switches to it
+    reader.published = frame()
+    assert registry.get("employee_skill_view").df is reader.published
+    assert len(loads) == 1
+
+
+@pytest.mark.parametrize("question, views", [
+    ("top employees by skill rate", ["employee_skill_view"]),
+    ("what is the weather", ["employee_skill_view"]),
+])
+def test_views_for_defaults_to_the_default_view(question, views):
+    registry = ViewRegistry(lambda spec: frame(), specs=[SPEC])
+    assert registry.views_for(question) == views
+
+
+def test_refresh_reloads_eager_views_now_and_others_on_next_use():
+    eager = ViewSpec(name="eager_view", description="", columns={}, policy="eager")
+    lazy = ViewSpec(name="lazy_view", description="", columns={}, policy="lazy")
+    loads = []
+    registry = ViewRegistry(lambda spec: loads.append(spec.name) or frame(), specs=[eager, lazy])
+    registry.load_eager()
+    registry.get("lazy_view")
+    assert registry.refresh() == ["eager_view", "lazy_view"]
+    assert loads == ["eager_view", "lazy_view", "eager_view"]
+    assert registry.loaded("eager_view").version == 2
+    assert registry.loaded("lazy_view") is None
+    registry.get("lazy_view")
+    assert loads[-1] == "lazy_view"
+    with pytest.raises(KeyError):
+        registry.refresh("missing_view")
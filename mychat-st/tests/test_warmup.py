@@ -0,0 +1,38 @@
+import pytest
+
+from warmup import QuestionLog, Warmer
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = QuestionLog(str(tmp_path / "questions.db"))
+    for key, question, times in (("top 5", "Top 5?", 3), ("count", "Count", 2), ("chart", "Chart", 1)):
+        for _ in range(times):
+            log.record(key, question)
+    return log
+
+
+def test_log_ranks_by_frequency(log):
+    assert log.top(2) == [("Top 5?", 3), ("Count", 2)]
+    assert log.stats() == {"questions": 3, "asked": 6}
+
+
+def test_llm_questions_are_capped_and_paid_for_once(log):
+    asked = []
+    warmer = Warmer(log, asked.append, needs_llm=lambda q: q != "Count", top_k=3, llm_budget=1)
+    assert warmer.warm()["llm_calls"] == 1
+    assert asked == ["Top 5?", "Count"]
+    second = warmer.warm()
+    assert second["llm_calls"] == 1 and second["skipped_budget"] == 1
+    assert asked[2:] == ["Count", "Chart"]
+
+
+def test_round_stops_when_the_pipeline_is_busy(log):
+    class Busy(Exception):
+        pass
+
+    def answer(question):
+        raise Busy()
+
+    summary = Warmer(log, answer, needs_llm=lambda q: True, stop_on=(Busy,)).warm()
+    assert summary["warmed"] == 0 and summary["failed"] == 0
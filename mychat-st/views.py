@@ -0,0 +1,251 @@
+"""Registry of the database views the assistant can answer questions about.
+
+Each view has its own load policy, memory budget and column metadata. A
+question is routed to the views it mentions, and only those are loaded
+before PandasAI sees them:
+
+- "eager": loaded at startup and kept until refreshed
+- "lazy": loaded on first use and kept until refreshed
+- "ttl": loaded on use and reloaded once older than its TTL
+
+Eager and lazy views are refreshed through refresh(), which the API's
+POST /api/v1/views/refresh calls (see api.py).
+"""
+import logging
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from snapshot import (
+    COMPACT_DTYPES,
+    SNAPSHOT_TTL_SECONDS,
+    SnapshotCache,
+    compact_dtypes,
+    compute_stats,
+    memory_report,
+)
+
+POLICIES = ("eager", "lazy", "ttl")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ViewSpec:
+    name: str
+    description: str
+    columns: dict
+    keywords: tuple = ()
+    policy: str = "lazy"
+    ttl: float = SNAPSHOT_TTL_SECONDS
+    memory_budget_mb: float = None
+    default: bool = False
+    query: str = None
+
+    def __post_init__(self):
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown load policy for {self.name}: {self.policy}")
+        if self.query is None:
+            self.query = f"SELECT * FROM {self.name}"
+
+
+VIEWS = [
+    ViewSpec(
+        name="employee_skill_view",
+        description="Contains details about employee skills.",
+        columns={
+            "employee_id": "INT, the unique identifier for an employee",
+            "employee_name": "VARCHAR, the name of the employee",
+            "skill_id": "INT, the unique identifier for a skill",
+            "skill_name": "VARCHAR, the name of the skill (e.g., 'Sewing', 'Cutting')",
+            "skill_rate": "INT, a rating of the employee's proficiency in that skill",
+        },
+        keywords=("employee", "skill", "rate", "rating", "proficiency"),
+        policy="ttl",
+        default=True,
+    ),
+    # ViewSpec(
+    #     name="line_efficiency_view",
+    #     description="Production line efficiency per line and day.",
+    #     columns={"line_id": "INT", "line_name": "VARCHAR", "efficiency": "DECIMAL"},
+    #     keywords=("line", "efficiency", "output", "target"),
+    #     policy="lazy",
+    #     memory_budget_mb=256,
+    # ),
+]
+
+
+class ViewRegistry:
+    """Loads views on demand according to their policy and routes questions to them."""
+
+    def __init__(self, load, specs=VIEWS, shared=None):
+        # load(spec) -> DataFrame, e.g. a read on the DB stage
+        self._load = load
+        # Optional SharedSnapshots: readers attach published views instead
+        # of loading them, publishers publish every view they load
+        self.shared = shared
+        self.specs = {spec.name: spec for spec in specs}
+        self._caches = {}
+        self._pinned = {}
+        # Readers: view -> (DataFrame, loaded_at) read from the database
+        # while no shared snapshot is published
+        self._fallbacks = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ttl(spec):
+        return spec.ttl if spec.policy == "ttl" else math.inf
+
+    def _read(self, spec):
+        reader = self.shared is not None and self.shared.role == "reader"
+        if reader:
+            df = self.shared.attach(spec.name)
+            if df is not None:
+                self._fallbacks.pop(spec.name, None)
+                return df
+            fallback = self._fallbacks.get(spec.name)
+            if fallback is not None and time.time() - fallback[1] < self._ttl(spec):
+                # Only the manifest is polled at the short interval; the
+                # database copy is kept for the view's usual TTL
+                return fallback[0]
+            logger.info("No shared snapshot of %s published yet; reading it from the database", spec.name)
+        df = self._load(spec)
+        if COMPACT_DTYPES:
+            before = int(df.memory_usage(deep=True).sum())
+            df = compact_dtypes(df)
+            df.attrs["raw_memory_bytes"] = before
+            memory_report(spec.name, before, int(df.memory_usage(deep=True).sum()))
+        if self.shared is not None and self.shared.role == "publisher":
+            stats = compute_stats(df)
+            self.shared.publish(spec.name, df, stats)
+            df.attrs["published_stats"] = stats
+        if reader:
+            self._fallbacks[spec.name] = (df, time.time())
+        return df
+
+    def _cache(self, spec):
+        with self._lock:
+            cache = self._caches.get(spec.name)
+            if cache is None:
+                ttl = self._ttl(spec)
+                if self.shared is not None and self.shared.role == "reader":
+                    # Unchanged versions come back as the same DataFrame, so
+                    # polling the manifest is cheap
+                    ttl = min(ttl, self.shared.poll_seconds)
+                cache = SnapshotCache(
+                    lambda: self._read(spec),
+                    ttl=ttl,
+                    stats=compute_stats,
+                    on_load=lambda snapshot: self._loaded(spec.name, snapshot),
+                )
+                self._caches[spec.name] = cache
+            return cache
+
+    def on_load(self, callback):
+        """Call callback(name, snapshot) whenever a new version of a view is loaded.
+
+        It runs in the loading thread while the view's cache is locked, so it
+        should only hand the work off (e.g. set an event).
+        """
+        self._listeners.append(callback)
+
+    def _loaded(self, name, snapshot):
+        for callback in self._listeners:
+            try:
+                callback(name, snapshot)
+            except Exception:
+                logger.exception("on_load callback failed for %s", name)
+
+    def get(self, name):
+        """Return the snapshot of a view, loading it if its policy requires."""
+        pinned = self._pinned.get(name)
+        if pinned is not None:
+            return pinned
+        spec = self.specs[name]
+        cache = self._cache(spec)
+        snapshot = cache.get()
+        if spec.memory_budget_mb is not None:
+            size_mb = snapshot.stats["memory_bytes"] / 2**20
+            if size_mb > spec.memory_budget_mb:
+                # Too big to keep resident: serve this request, then drop it
+                logger.warning("%s uses %.1f MB, over its %s MB budget; not caching it", name, size_mb, spec.memory_budget_mb)
+                cache.invalidate()
+        return snapshot
+
+    def loaded(self, name):
+        """The current snapshot of a view if it is in memory and fresh, without loading it."""
+        pinned = self._pinned.get(name)
+        if pinned is not None:
+            return pinned
+        with self._lock:
+            cache = self._caches.get(name)
+        snapshot = cache.current() if cache is not None else None
+        if snapshot is None or snapshot.is_stale(cache.ttl):
+            return None
+        return snapshot
+
+    def refresh(self, name=None):
+        """Reload one view (or all of them): eager views now, the others on next use.
+
+        Returns the names of the views refreshed; raises KeyError for an unknown view.
+        """
+        if name is not None and name not in self.specs:
+            raise KeyError(name)
+        with self._lock:
+            caches = {view: cache for view, cache in self._caches.items() if name in (None, view)}
+        for view, cache in caches.items():
+            self._fallbacks.pop(view, None)
+            if self.specs[view].policy == "eager":
+                cache.refresh()
+            else:
+                cache.invalidate()
+        return list(caches)
+
+    def pin(self, names=None):
+        """Serve one snapshot of these views (all by default) until unpin()."""
+        for name in names or list(self.specs):
+            self._pinned[name] = self.get(name)
+
+    def unpin(self):
+        self._pinned.clear()
+
+    def load_eager(self):
+        """Load the views whose policy is "eager"."""
+        for spec in self.specs.values():
+            if spec.policy == "eager":
+                self.get(spec.name)
+
+    def views_for(self, question):
+        """Names of the views a question needs, falling back to the default views."""
+        words = set(re.findall(r"[a-z]+", question.lower()))
+        words |= {w.rstrip("s") for w in words}
+        needed = []
+        for spec in self.specs.values():
+            vocabulary = set(spec.keywords)
+            for column in spec.columns:
+                vocabulary.update(column.split("_"))
+            vocabulary -= {"id", "name"}
+            if words & vocabulary:
+                needed.append(spec.name)
+        return needed or [spec.name for spec in self.specs.values() if spec.default]
+
+    def stats(self):
+        """Load state and footprint of every registered view."""
+        with self._lock:
+            caches = dict(self._caches)
+        report = {}
+        for name, spec in self.specs.items():
+            snapshot = caches[name].current() if name in caches else None
+            entry = {"policy": spec.policy, "loaded": snapshot is not None}
+            if snapshot is not None:
+                entry.update({
+                    "version": snapshot.version,
+                    "rows": snapshot.stats.get("total_rows"),
+                    "memory_mb": round(snapshot.stats["memory_bytes"] / 2**20, 2),
+                    "raw_memory_mb": round(snapshot.stats["raw_memory_bytes"] / 2**20, 2),
+                })
+            report[name] = entry
+        return report
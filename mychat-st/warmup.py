@@ -0,0 +1,173 @@
+"""Cache warmup from the questions people ask most.
+
+Every question answered by the pipeline is logged, normalized, with how
+often and when it was last asked (QUESTION_LOG, a SQLite file shared by the
+processes on a host). At startup and whenever a view snapshot is reloaded,
+a background thread re-asks the WARMUP_TOP_K most frequent questions of the
+last QUESTION_LOG_DAYS days, so the first users after a deploy or refresh
+find the generated code, fast-path vocabulary and sandbox copies of the
+snapshot ready instead of paying for them.
+
+Questions answered by the fast path, by SQL pushdown or by cached code cost
+no LLM call. The rest are capped: at most WARMUP_LLM_BUDGET LLM-backed
+questions per round, and each of those at most once per process, so a
+question that never produces reusable code isn't paid for on every refresh.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from prometheus_client import Counter
+
+QUESTION_LOG = os.getenv("QUESTION_LOG", "data/question_log.db")
+QUESTION_LOG_DAYS = float(os.getenv("QUESTION_LOG_DAYS", 30))
+WARMUP_TOP_K = int(os.getenv("WARMUP_TOP_K", 20))
+WARMUP_LLM_BUDGET = int(os.getenv("WARMUP_LLM_BUDGET", 10))
+
+WARMED = Counter("assistant_warmup_questions_total", "Questions re-asked to warm caches, by outcome", ["outcome"])
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionLog:
+    """Normalized questions with their frequency, in a SQLite file."""
+
+    def __init__(self, path=QUESTION_LOG):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._con = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS question_log "
+            "(key TEXT PRIMARY KEY, question TEXT NOT NULL, asked INTEGER NOT NULL, last_asked REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def record(self, key, question):
+        """Count one asking of a question; key is its normalized form."""
+        try:
+            with self._lock:
+                self._con.execute(
+                    "INSERT INTO question_log (key, question, asked, last_asked) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET question = excluded.question, "
+                    "asked = asked + 1, last_asked = excluded.last_asked",
+                    (key, question, time.time()),
+                )
+        except sqlite3.Error as e:
+            # Losing a log entry must never fail the question
+            logger.warning("Could not log question: %s", e)
+
+    def top(self, k=WARMUP_TOP_K, days=QUESTION_LOG_DAYS):
+        """The k most asked questions of the last `days` days, as (question, asked), latest wording."""
+        with self._lock:
+            return self._con.execute(
+                "SELECT question, asked FROM question_log WHERE last_asked >= ? "
+                "ORDER BY asked DESC, last_asked DESC LIMIT ?",
+                (time.time() - days * 86400, k),
+            ).fetchall()
+
+    def stats(self):
+        with self._lock:
+            questions, asked = self._con.execute("SELECT COUNT(*), COALESCE(SUM(asked), 0) FROM question_log").fetchone()
+        return {"questions": questions, "asked": asked}
+
+
+class Warmer:
+    """Re-asks the top logged questions in a background thread when triggered."""
+
+    def __init__(self, log, answer, needs_llm, top_k=WARMUP_TOP_K, llm_budget=WARMUP_LLM_BUDGET,
+                 stop_on=()):
+        self.log = log
+        # answer(question) runs the pipeline; needs_llm(question) tells
+        # whether that would call the LLM right now
+        self._answer = answer
+        self._needs_llm = needs_llm
+        self.top_k = top_k
+        self.llm_budget = llm_budget
+        # Exceptions that end a round early (e.g. the pipeline is saturated)
+        self._stop_on = tuple(stop_on)
+        self._event = threading.Event()
+        self._reasons = []
+        self._thread = None
+        self._llm_spent = set()
+        self._lock = threading.Lock()
+        self.rounds = 0
+        self.last_round = None
+
+    def trigger(self, reason):
+        """Schedule a round; rounds triggered while one runs are merged into the next."""
+        if self.top_k <= 0 or threading.current_thread() is self._thread:
+            # A view reloaded by the running round is warmed by the rest of it
+            return
+        with self._lock:
+            self._reasons.append(reason)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="warmup", daemon=True)
+                self._thread.start()
+        self._event.set()
+
+    def _loop(self):
+        while True:
+            self._event.wait()
+            self._event.clear()
+            with self._lock:
+                reasons, self._reasons = self._reasons, []
+            try:
+                self.warm(reasons)
+            except Exception:
+                logger.exception("Cache warmup failed")
+
+    def warm(self, reasons=()):
+        """Run one round now; returns its summary."""
+        started = time.perf_counter()
+        counts = {"warmed": 0, "llm_calls": 0, "skipped_budget": 0, "failed": 0}
+        for question, _ in self.log.top(self.top_k):
+            if self._needs_llm(question):
+                with self._lock:
+                    spent = question in self._llm_spent
+                if spent or counts["llm_calls"] >= self.llm_budget:
+                    counts["skipped_budget"] += 1
+                    WARMED.labels("skipped_budget").inc()
+                    continue
+                with self._lock:
+                    self._llm_spent.add(question)
+                counts["llm_calls"] += 1
+            try:
+                self._answer(question)
+            except self._stop_on as e:
+                with self._lock:
+                    self._llm_spent.discard(question)
+                logger.info("Cache warmup stopped early: %s", e)
+                break
+            except Exception as e:
+                counts["failed"] += 1
+                WARMED.labels("failed").inc()
+                logger.warning("Warmup question %r failed: %s", question, e)
+                continue
+            counts["warmed"] += 1
+            WARMED.labels("warmed").inc()
+        summary = {
+            "reasons": sorted(set(reasons)),
+            **counts,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        logger.info("Cache warmup: %s", summary)
+        with self._lock:
+            self.rounds += 1
+            self.last_round = summary
+        return summary
+
+    def stats(self):
+        with self._lock:
+            return {
+                "top_k": self.top_k,
+                "llm_budget": self.llm_budget,
+                "rounds": self.rounds,
+                "last_round": self.last_round,
+                "llm_questions_warmed": len(self._llm_spent),
+                "log": self.log.stats(),
+            }
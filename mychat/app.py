@@ -89,8 +89,9 @@ with gr.Blocks() as demo:
         outputs=[text_input, chat_output, history_state]
     )
 
-demo.launch(
-    server_name="0.0.0.0",
-    server_port=7860,
-    share=False
-)
\ No newline at end of file
+if __name__ == "__main__":
+    demo.launch(
+        server_name="0.0.0.0",
+        server_port=7860,
+        share=False
+    )